@@ -1 +1,5 @@
-from .main import Neo4jSpatialQuery
+from .main import Neo4jSpatialQuery, get_neo4j_query
+from .spatial_index import SpatialGridIndex
+from .landmark_resolver import LandmarkResolver
+from .async_query import AsyncNeo4jSpatialQuery, get_async_neo4j_query, get_background_loop
+from .query_cache import SpatialQueryCache
@@ -0,0 +1,306 @@
+"""
+Async Neo4j access layer (AsyncGraphDatabase)
+
+Cho phép nhiều truy vấn spatial của cùng 1 request (VD: các nhóm category
+trong plan_itinerary) chạy đồng thời trên connection pool, cùng Cypher và
+cùng format kết quả với Neo4jSpatialQuery.
+"""
+
+from neo4j import AsyncGraphDatabase, Query
+from concurrent.futures import Future
+from typing import Awaitable, Dict, List, Optional
+import asyncio
+import threading
+
+from .main import (
+    URI, AUTH, DATABASE, MAX_POOL_SIZE, ACQUISITION_TIMEOUT, QUERY_TIMEOUT,
+    FIND_BY_CATEGORY_QUERY, FIND_CANDIDATES_BY_CATEGORY_QUERY, FIND_BY_CATEGORY_GROUPS_QUERY,
+    FIND_NEARBY_RESOLVED_LANDMARK_QUERY, FIND_IN_DISTRICT_QUERY,
+    place_from_record, group_names_of
+)
+from .spatial_index import SpatialGridIndex
+from .landmark_resolver import LandmarkResolver
+from .query_cache import SpatialQueryCache
+
+
+class AsyncNeo4jSpatialQuery:
+    """Async version của Neo4jSpatialQuery"""
+
+    def __init__(
+        self,
+        uri=URI,
+        auth=AUTH,
+        spatial_index: Optional[SpatialGridIndex] = None,
+        landmark_resolver: Optional[LandmarkResolver] = None,
+        result_cache: Optional[SpatialQueryCache] = None,
+        max_pool_size: int = MAX_POOL_SIZE,
+        acquisition_timeout: float = ACQUISITION_TIMEOUT,
+        query_timeout: Optional[float] = QUERY_TIMEOUT,
+        database: str = DATABASE
+    ):
+        """
+        Args:
+            uri: Neo4j bolt URI
+            auth: (user, password)
+            spatial_index: Grid index in-process (optional), dùng chung với bản sync
+            landmark_resolver: Landmark resolver (optional), dùng chung với bản sync
+            result_cache: Result cache (optional), dùng chung với bản sync
+            max_pool_size: Số connection tối đa trong pool
+            acquisition_timeout: Thời gian tối đa chờ lấy connection (giây)
+            query_timeout: Timeout cho mỗi transaction phía server (giây)
+            database: Tên database
+        """
+        self.driver = AsyncGraphDatabase.driver(
+            uri,
+            auth=auth,
+            max_connection_pool_size=max_pool_size,
+            connection_acquisition_timeout=acquisition_timeout
+        )
+        self.query_timeout = query_timeout
+        self.database = database
+        self.spatial_index = spatial_index
+        self.landmark_resolver = landmark_resolver
+        self.result_cache = result_cache
+
+    async def close(self):
+        """Đóng kết nối"""
+        await self.driver.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def _run(self, text: str, **params) -> List:
+        async with self.driver.session(database=self.database) as session:
+            result = await session.run(Query(text, timeout=self.query_timeout), **params)
+            return [record async for record in result]
+
+    async def _cached(self, lookup, **fetchers):
+        """
+        Gọi hàm lookup (sync) của result_cache trên worker thread; các hàm fetch
+        nhận vào là coroutine factory, được chạy lại trên event loop này
+        """
+        loop = asyncio.get_running_loop()
+
+        def blocking(fetch):
+            return lambda *args: asyncio.run_coroutine_threadsafe(fetch(*args), loop).result()
+
+        return await asyncio.to_thread(lookup, **{name: blocking(fetch) for name, fetch in fetchers.items()})
+
+    async def find_places_by_category(
+        self,
+        lat: float,
+        lon: float,
+        categories: List[str],
+        radius_meters: int = 1000,
+        limit: int = 20
+    ) -> List[Dict]:
+        """Tìm địa điểm theo category xung quanh tọa độ"""
+        if self.spatial_index is not None:
+            return self.spatial_index.find_places_by_category(
+                lat, lon, categories, radius_meters, limit
+            )
+
+        if self.result_cache is not None:
+            async def fetch_candidates(c_lat, c_lon, c_radius, c_limit):
+                records = await self._run(
+                    FIND_CANDIDATES_BY_CATEGORY_QUERY,
+                    lat=c_lat,
+                    lon=c_lon,
+                    radius=c_radius,
+                    categories=categories,
+                    limit=c_limit
+                )
+                return [dict(record) for record in records]
+
+            return await self._cached(
+                lambda **fetchers: self.result_cache.find_places_by_category(
+                    lat, lon, categories, radius_meters, limit, **fetchers
+                ),
+                fetch_candidates=fetch_candidates,
+                fetch_exact=lambda: self._find_places_by_category_uncached(
+                    lat, lon, categories, radius_meters, limit
+                )
+            )
+
+        return await self._find_places_by_category_uncached(lat, lon, categories, radius_meters, limit)
+
+    async def _find_places_by_category_uncached(
+        self,
+        lat: float,
+        lon: float,
+        categories: List[str],
+        radius_meters: int,
+        limit: int
+    ) -> List[Dict]:
+        records = await self._run(
+            FIND_BY_CATEGORY_QUERY,
+            lat=lat,
+            lon=lon,
+            radius=radius_meters,
+            categories=categories,
+            limit=limit
+        )
+        return [place_from_record(record) for record in records]
+
+    async def find_places_by_multiple_categories(
+        self,
+        lat: float,
+        lon: float,
+        category_groups: List[List[str]],
+        radius_meters: int = 1000,
+        limit: int = 20,
+        concurrent: bool = True
+    ) -> Dict[str, List[Dict]]:
+        """
+        Tìm địa điểm theo nhiều nhóm category
+
+        Args:
+            concurrent: True = mỗi nhóm 1 query chạy đồng thời (asyncio.gather),
+                False = 1 câu Cypher batched cho tất cả nhóm
+        """
+        group_names = group_names_of(category_groups)
+
+        if concurrent or self.spatial_index is not None or self.result_cache is not None:
+            groups_places = await asyncio.gather(*[
+                self.find_places_by_category(lat, lon, group, radius_meters, limit)
+                for group in category_groups
+            ])
+            return dict(zip(group_names, groups_places))
+
+        results = {name: [] for name in group_names}
+        records = await self._run(
+            FIND_BY_CATEGORY_GROUPS_QUERY,
+            lat=lat,
+            lon=lon,
+            radius=radius_meters,
+            groups=category_groups,
+            limit=limit
+        )
+        for record in records:
+            results[group_names[record['group_index']]] = [dict(place) for place in record['places']]
+        return results
+
+    async def find_places_nearby_landmark(
+        self,
+        landmark_name: str,
+        categories: List[str],
+        radius_meters: int = 1000,
+        limit: int = 20
+    ) -> Dict:
+        """Tìm địa điểm xung quanh landmark (cần landmark_resolver)"""
+        if self.landmark_resolver is None:
+            raise ValueError("AsyncNeo4jSpatialQuery.find_places_nearby_landmark cần landmark_resolver")
+
+        # resolve() có thể fallback sang full-text (sync driver) nên chạy ngoài event loop
+        landmark = await asyncio.to_thread(self.landmark_resolver.resolve, landmark_name)
+        if landmark is None:
+            return {'landmark': None, 'nearby_places': []}
+
+        landmark_info = {
+            'name': landmark['name'],
+            'address': landmark['address']
+        }
+
+        if self.spatial_index is not None:
+            places = self.spatial_index.find_places_by_category(
+                landmark['lat'], landmark['lon'], categories, radius_meters, limit + 1
+            )
+            places = [p for p in places if p['place_id'] != landmark['place_id']][:limit]
+            return {'landmark': landmark_info, 'nearby_places': places}
+
+        records = await self._run(
+            FIND_NEARBY_RESOLVED_LANDMARK_QUERY,
+            lat=landmark['lat'],
+            lon=landmark['lon'],
+            landmark_id=landmark['place_id'],
+            categories=categories,
+            radius=radius_meters,
+            limit=limit
+        )
+        return {
+            'landmark': landmark_info,
+            'nearby_places': [place_from_record(record) for record in records]
+        }
+
+    async def find_places_in_district(
+        self,
+        district_code: str,
+        categories: List[str],
+        limit: int = 20
+    ) -> List[Dict]:
+        """Tìm địa điểm theo category trong 1 quận/huyện"""
+        async def fetch(fetch_limit: int) -> List[Dict]:
+            records = await self._run(
+                FIND_IN_DISTRICT_QUERY,
+                district_code=district_code,
+                categories=categories,
+                limit=fetch_limit
+            )
+            return [place_from_record(record) for record in records]
+
+        if self.result_cache is not None:
+            return await self._cached(
+                lambda **fetchers: self.result_cache.find_places_in_district(
+                    district_code, categories, limit, **fetchers
+                ),
+                fetch=fetch
+            )
+        return await fetch(limit)
+
+
+class BackgroundEventLoop:
+    """
+    Event loop chạy trên 1 daemon thread riêng, để code sync (Flask) gọi
+    được AsyncNeo4jSpatialQuery (và các client async khác, VD embedding) mà
+    driver/pool vẫn sống qua nhiều request
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self._thread.start()
+
+    def submit(self, coro: Awaitable) -> Future:
+        """Đưa coroutine lên background loop, không chờ (cancel() hủy cả task đang chạy)"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Awaitable, timeout: Optional[float] = None):
+        """Chạy coroutine trên background loop và chờ kết quả"""
+        return self.submit(coro).result(timeout)
+
+
+# Singleton instances
+_background_loop = None
+_async_neo4j_query = None
+_lock = threading.Lock()
+
+
+def get_background_loop() -> BackgroundEventLoop:
+    """Get singleton BackgroundEventLoop dùng chung cho các client async"""
+    global _background_loop
+    with _lock:
+        if _background_loop is None:
+            _background_loop = BackgroundEventLoop()
+    return _background_loop
+
+
+def get_async_neo4j_query(**kwargs):
+    """
+    Get singleton (AsyncNeo4jSpatialQuery, BackgroundEventLoop)
+
+    Returns:
+        Tuple (query, loop) - dùng loop.run(query.method(...)) từ code sync
+    """
+    global _async_neo4j_query
+    background_loop = get_background_loop()
+    with _lock:
+        if _async_neo4j_query is None:
+            # Tạo driver ngay trong background loop - loop duy nhất sẽ dùng nó
+            async def _create():
+                return AsyncNeo4jSpatialQuery(**kwargs)
+
+            _async_neo4j_query = background_loop.run(_create())
+    return _async_neo4j_query, background_loop
@@ -0,0 +1,289 @@
+"""
+Landmark resolver đứng trước find_places_nearby_landmark
+
+Thay cho `toLower(name) CONTAINS ...` (full scan mỗi request):
+1. Trie in-process không phân biệt dấu, build từ name/alt_names trong CSV
+2. Fallback: Neo4j full-text index (analyzer standard-folding)
+Chỉ chấp nhận kết quả khớp đủ tin cậy (cả trie lẫn full-text, không tin cậy
+thì trả None): tên/alias bằng đúng tên đã chuẩn hóa,
+hoặc bắt đầu bằng nó và tên hỏi chiếm >= MIN_WORD_COVERAGE số từ; tên có dấu
+phải xuất hiện nguyên văn (có dấu) trong tên/alias ("Lăng Bác" không khớp
+"Lẩu Hơi Lãng Bạc", "Hồ Gươm" không khớp "Daksh Yoga Studio Hồ Gươm").
+Chỉ kết quả tin cậy được cache LRU+TTL theo tên đã chuẩn hóa (lowercase, gộp
+khoảng trắng, giữ dấu để "Văn Miếu" và "Văn Miêu" không dùng chung kết quả).
+"""
+
+from typing import Dict, List, Optional
+import bisect
+import re
+
+import pandas as pd
+from neo4j.exceptions import Neo4jError
+
+from app.utils import TTLCache, MISSING, normalize_name, strip_accents
+
+FULLTEXT_INDEX_NAME = "place_name_fulltext"
+
+CREATE_FULLTEXT_INDEX_QUERY = f"""
+CREATE FULLTEXT INDEX {FULLTEXT_INDEX_NAME} IF NOT EXISTS
+FOR (p:Place) ON EACH [p.name, p.alt_names]
+OPTIONS {{indexConfig: {{`fulltext.analyzer`: 'standard-folding'}}}}
+"""
+
+FULLTEXT_RESOLVE_QUERY = f"""
+CALL db.index.fulltext.queryNodes('{FULLTEXT_INDEX_NAME}', $search) YIELD node, score
+WHERE node.location IS NOT NULL
+RETURN
+    node.place_id AS place_id,
+    node.name AS name,
+    node.address AS address,
+    node.location.latitude AS lat,
+    node.location.longitude AS lon,
+    node.alt_names AS alt_names
+ORDER BY score DESC, size(node.name) ASC
+LIMIT $limit
+"""
+
+# Tên hỏi phải chiếm ít nhất chừng này phần số từ của tên khớp prefix
+# ("Hoàng Thành" -> "Hoàng thành Thăng Long": 2/4)
+MIN_WORD_COVERAGE = 0.5
+
+# Ký tự đặc biệt của cú pháp Lucene
+_LUCENE_SPECIAL = re.compile(r'([+\-&|!(){}\[\]^"~*?:\\/])')
+
+
+def create_fulltext_index(driver, database: str = "neo4j"):
+    """Tạo full-text index trên Place.name/alt_names (nếu chưa có)"""
+    with driver.session(database=database) as session:
+        session.run(CREATE_FULLTEXT_INDEX_QUERY)
+
+
+class LandmarkResolver:
+    """Resolve tên landmark -> Place (place_id, name, address, lat, lon)"""
+
+    # Số ứng viên giữ lại ở mỗi node của trie
+    TOP_CANDIDATES = 8
+
+    def __init__(
+        self,
+        driver=None,
+        cache_size: int = 1024,
+        ttl_seconds: float = 3600,
+        database: str = "neo4j"
+    ):
+        """
+        Args:
+            driver: Neo4j driver cho fallback full-text (optional)
+            cache_size: Số landmark tối đa trong cache
+            ttl_seconds: Thời gian sống của 1 kết quả resolve
+            database: Tên database
+        """
+        self.driver = driver
+        self.database = database
+        self.cache = TTLCache(maxsize=cache_size, ttl_seconds=ttl_seconds)
+
+        self._trie: Dict = {}
+        self._landmarks: List[Dict] = []
+        self._labels: List[List[str]] = []
+        self._fulltext_ready = None
+
+    # ==================== MATCH CONFIDENCE ====================
+
+    @staticmethod
+    def is_confident_match(landmark_name: str, labels: List[str]) -> bool:
+        """
+        Tên landmark khớp đủ tin cậy với 1 trong các tên/alias của Place
+
+        Args:
+            landmark_name: Tên người dùng hỏi
+            labels: name + alt_names của Place
+        """
+        normalized = normalize_name(landmark_name)
+        query = ' '.join(landmark_name.lower().split())
+        has_accents = strip_accents(query) != query
+        query_words = len(normalized.split())
+
+        for label in labels:
+            folded = normalize_name(label)
+            if folded != normalized:
+                if not folded.startswith(normalized + ' '):
+                    continue
+                if query_words / len(folded.split()) < MIN_WORD_COVERAGE:
+                    continue
+            # Gõ có dấu thì dấu phải khớp: "Lăng Bác" != "Lãng Bạc"
+            if has_accents and query not in ' '.join(label.lower().split()):
+                continue
+            return True
+        return False
+
+    # ==================== TRIE ====================
+
+    def add_landmark(self, place_id: str, name: str, address: Optional[str],
+                     lat: float, lon: float, alt_names: Optional[List[str]] = None):
+        """Thêm 1 landmark vào trie (key = tên chuẩn hóa + các hậu tố theo từ)"""
+        entry_id = len(self._landmarks)
+        labels = [name] + [alt.strip() for alt in alt_names or [] if alt.strip()]
+        self._landmarks.append({
+            'place_id': place_id,
+            'name': name,
+            'address': address,
+            'lat': lat,
+            'lon': lon
+        })
+        self._labels.append([' '.join(label.lower().split()) for label in labels])
+
+        for label in labels:
+            words = normalize_name(label).split()
+            for offset in range(len(words)):
+                # Ưu tiên: khớp từ đầu tên > khớp giữa tên, sau đó tên ngắn hơn
+                rank = (offset > 0, len(words), entry_id)
+                self._insert(' '.join(words[offset:]), rank, entry_id)
+
+    @staticmethod
+    def _keep_best(candidates: Optional[list], rank: tuple, entry_id: int, size: int) -> list:
+        if candidates is None:
+            return [(rank, entry_id)]
+
+        for i, (existing_rank, existing_id) in enumerate(candidates):
+            if existing_id == entry_id:
+                if existing_rank <= rank:
+                    return candidates
+                del candidates[i]
+                break
+
+        if len(candidates) >= size and rank >= candidates[-1][0]:
+            return candidates
+        bisect.insort(candidates, (rank, entry_id))
+        del candidates[size:]
+        return candidates
+
+    def _insert(self, key: str, rank: tuple, entry_id: int):
+        node = self._trie
+        for ch in key:
+            node = node.setdefault(ch, {})
+            # Mỗi node giữ vài ứng viên tốt nhất trong subtree -> lookup O(len(query))
+            node['#'] = self._keep_best(node.get('#'), rank, entry_id, self.TOP_CANDIDATES)
+
+        node['$'] = self._keep_best(node.get('$'), rank, entry_id, self.TOP_CANDIDATES)
+
+    def _lookup_trie(self, landmark_name: str, normalized: str) -> Optional[Dict]:
+        if not normalized or not self._trie:
+            return None
+
+        node = self._trie
+        for ch in normalized:
+            node = node.get(ch)
+            if node is None:
+                return None
+
+        # Khớp chính xác cả tên được ưu tiên hơn khớp prefix
+        candidates = node.get('$') or node.get('#')
+        if not candidates:
+            return None
+
+        # Prefix/hậu tố theo từ chỉ là ứng viên: giữ những Place khớp tin cậy
+        # (rank đã ưu tiên khớp từ đầu tên, tên ngắn hơn)
+        for _, entry_id in sorted(candidates):
+            if self.is_confident_match(landmark_name, self._labels[entry_id]):
+                return dict(self._landmarks[entry_id])
+        return None
+
+    @classmethod
+    def from_csv(cls, csv_path: str, **kwargs) -> 'LandmarkResolver':
+        """
+        Build trie từ CSV cùng schema với hanoi_places_osm_filtered_full_row.csv
+
+        Args:
+            csv_path: Đường dẫn file CSV
+            **kwargs: Tham số cho LandmarkResolver (driver, cache_size, ...)
+        """
+        resolver = cls(**kwargs)
+        df = pd.read_csv(csv_path)
+        df = df[df['lat'].notna() & df['lon'].notna() & df['name'].notna()]
+
+        for row in df.itertuples(index=False):
+            alt_names = getattr(row, 'alt_names', None)
+            address = getattr(row, 'address', None)
+            resolver.add_landmark(
+                place_id=str(row.place_id),
+                name=str(row.name),
+                address=str(address) if pd.notna(address) else None,
+                lat=float(row.lat),
+                lon=float(row.lon),
+                alt_names=str(alt_names).split(';') if pd.notna(alt_names) else None
+            )
+
+        return resolver
+
+    # ==================== RESOLVE ====================
+
+    def ensure_fulltext_index(self) -> bool:
+        """
+        Tạo full-text index nếu chưa có (DB import bằng importer cũ không có)
+        Returns: True nếu dùng được fallback full-text
+        """
+        if self.driver is None:
+            return False
+        try:
+            create_fulltext_index(self.driver, self.database)
+            self._fulltext_ready = True
+        except Neo4jError as e:
+            print(f"Landmark resolver: full-text index unavailable ({e}), trie only")
+            self._fulltext_ready = False
+        return self._fulltext_ready
+
+    def _lookup_fulltext(self, landmark_name: str, normalized: str) -> Optional[Dict]:
+        if self.driver is None or self._fulltext_ready is False:
+            return None
+
+        search = '"' + _LUCENE_SPECIAL.sub(r'\\\1', normalized) + '"'
+        try:
+            with self.driver.session(database=self.database) as session:
+                records = list(session.run(
+                    FULLTEXT_RESOLVE_QUERY, search=search, limit=self.TOP_CANDIDATES
+                ))
+        except Neo4jError as e:
+            print(f"Landmark resolver: full-text lookup failed: {e}")
+            return None
+
+        # Score full-text chỉ là ứng viên (khớp 1 phần tên vẫn điểm cao): giữ Place khớp tin cậy
+        for record in records:
+            landmark = dict(record)
+            alt_names = landmark.pop('alt_names', None)
+            if isinstance(alt_names, str):
+                alt_names = alt_names.split(';')
+            if self.is_confident_match(landmark_name, [landmark['name']] + list(alt_names or [])):
+                return landmark
+        return None
+
+    def resolve(self, landmark_name: str) -> Optional[Dict]:
+        """
+        Tìm Place tương ứng với tên landmark
+
+        Args:
+            landmark_name: Tên landmark (VD: "Hồ Gươm", "ho guom")
+
+        Returns:
+            Dict {place_id, name, address, lat, lon} hoặc None
+        """
+        normalized = normalize_name(landmark_name)
+        if not normalized:
+            return None
+
+        cache_key = ' '.join(landmark_name.lower().split())
+        cached = self.cache.get(cache_key, MISSING)
+        if cached is not MISSING:
+            return dict(cached) if cached else None
+
+        landmark = self._lookup_trie(landmark_name, normalized)
+        if landmark is None:
+            landmark = self._lookup_fulltext(landmark_name, normalized)
+        if landmark is None:
+            return None
+
+        self.cache.set(cache_key, landmark)
+        return dict(landmark)
+
+    def invalidate(self):
+        """Xóa cache resolve (VD: sau khi import lại dữ liệu)"""
+        self.cache.clear()
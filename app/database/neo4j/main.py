@@ -1,19 +1,249 @@
-from neo4j import GraphDatabase
+from neo4j import GraphDatabase, Query
 from typing import List, Dict, Optional
 import json
 import os
+import threading
+
+from .spatial_index import SpatialGridIndex
+from .landmark_resolver import LandmarkResolver
+from .query_cache import SpatialQueryCache
 
 URI = os.getenv("NEO4J_URI", "bolt://localhost:7687")
 AUTH_USER = os.getenv("NEO4J_USER", "neo4j")
 AUTH_PASSWORD = os.getenv("NEO4J_PASSWORD", "12345678")
 AUTH = (AUTH_USER, AUTH_PASSWORD)
+DATABASE = os.getenv("NEO4J_DATABASE", "neo4j")
+
+# Connection pool & timeout (giây)
+MAX_POOL_SIZE = int(os.getenv("NEO4J_MAX_POOL_SIZE", 50))
+ACQUISITION_TIMEOUT = float(os.getenv("NEO4J_ACQUISITION_TIMEOUT", 10))
+QUERY_TIMEOUT = float(os.getenv("NEO4J_QUERY_TIMEOUT", 15))
+
+
+# ==================== CYPHER QUERIES ====================
+
+FIND_BY_CATEGORY_QUERY = """
+        WITH point({latitude: $lat, longitude: $lon}) AS myLocation
+        
+        MATCH (p:Place)-[:HAS_CATEGORY]->(c:Category)
+        WHERE p.location IS NOT NULL 
+          AND point.distance(p.location, myLocation) <= $radius
+          AND c.name IN $categories
+        
+        WITH DISTINCT p, myLocation,
+             collect(DISTINCT c.name) AS matched_categories,
+             round(point.distance(p.location, myLocation)) AS distance
+        
+        RETURN 
+            p.place_id AS place_id,
+            p.name AS name,
+            p.address AS address,
+            matched_categories AS categories,
+            distance
+        ORDER BY distance ASC
+        LIMIT $limit
+        """
+
+# Như FIND_BY_CATEGORY_QUERY nhưng trả thêm tọa độ để SpatialQueryCache re-rank
+FIND_CANDIDATES_BY_CATEGORY_QUERY = """
+        WITH point({latitude: $lat, longitude: $lon}) AS myLocation
+        
+        MATCH (p:Place)-[:HAS_CATEGORY]->(c:Category)
+        WHERE p.location IS NOT NULL 
+          AND point.distance(p.location, myLocation) <= $radius
+          AND c.name IN $categories
+        
+        WITH DISTINCT p, myLocation,
+             collect(DISTINCT c.name) AS matched_categories,
+             point.distance(p.location, myLocation) AS distance
+        
+        RETURN 
+            p.place_id AS place_id,
+            p.name AS name,
+            p.address AS address,
+            matched_categories AS categories,
+            p.location.latitude AS lat,
+            p.location.longitude AS lon
+        ORDER BY distance ASC
+        LIMIT $limit
+        """
+
+FIND_BY_CATEGORY_GROUPS_QUERY = """
+        WITH point({latitude: $lat, longitude: $lon}) AS myLocation
+        
+        MATCH (p:Place)
+        WHERE p.location IS NOT NULL
+          AND point.distance(p.location, myLocation) <= $radius
+        
+        WITH p, round(point.distance(p.location, myLocation)) AS distance
+        MATCH (p)-[:HAS_CATEGORY]->(c:Category)
+        WITH p, distance, collect(DISTINCT c.name) AS place_categories
+        
+        UNWIND range(0, size($groups) - 1) AS group_index
+        WITH group_index, p, distance,
+             [name IN place_categories WHERE name IN $groups[group_index]] AS matched_categories
+        WHERE size(matched_categories) > 0
+        
+        WITH group_index, p, distance, matched_categories
+        ORDER BY distance ASC
+        
+        WITH group_index, collect({
+            place_id: p.place_id,
+            name: p.name,
+            address: p.address,
+            categories: matched_categories,
+            distance_meters: distance
+        })[..$limit] AS places
+        
+        RETURN group_index, places
+        """
+
+FIND_NEARBY_LANDMARK_QUERY = """
+        // Tìm landmark
+        MATCH (landmark:Place)
+        WHERE toLower(landmark.name) CONTAINS toLower($landmark_name)
+          AND landmark.location IS NOT NULL
+        
+        WITH landmark
+        LIMIT 1
+        
+        // Tìm địa điểm xung quanh landmark
+        MATCH (p:Place)-[:HAS_CATEGORY]->(c:Category)
+        WHERE p.location IS NOT NULL
+          AND point.distance(p.location, landmark.location) <= $radius
+          AND c.name IN $categories
+          AND p.place_id <> landmark.place_id
+        
+        WITH DISTINCT p, landmark,
+             collect(DISTINCT c.name) AS matched_categories,
+             round(point.distance(p.location, landmark.location)) AS distance
+        
+        RETURN 
+            landmark.name AS landmark_name,
+            landmark.address AS landmark_address,
+            p.place_id AS place_id,
+            p.name AS name,
+            p.address AS address,
+            matched_categories AS categories,
+            distance
+        ORDER BY distance ASC
+        LIMIT $limit
+        """
+
+FIND_NEARBY_RESOLVED_LANDMARK_QUERY = """
+        WITH point({latitude: $lat, longitude: $lon}) AS landmarkLocation
+        
+        MATCH (p:Place)-[:HAS_CATEGORY]->(c:Category)
+        WHERE p.location IS NOT NULL
+          AND point.distance(p.location, landmarkLocation) <= $radius
+          AND c.name IN $categories
+          AND p.place_id <> $landmark_id
+        
+        WITH DISTINCT p, landmarkLocation,
+             collect(DISTINCT c.name) AS matched_categories,
+             round(point.distance(p.location, landmarkLocation)) AS distance
+        
+        RETURN 
+            p.place_id AS place_id,
+            p.name AS name,
+            p.address AS address,
+            matched_categories AS categories,
+            distance
+        ORDER BY distance ASC
+        LIMIT $limit
+        """
+
+FIND_IN_DISTRICT_QUERY = """
+        MATCH (p:Place)-[:IN_DISTRICT]->(d:District {code: $district_code})
+        MATCH (p)-[:HAS_CATEGORY]->(c:Category)
+        WHERE c.name IN $categories
+        
+        WITH DISTINCT p,
+             collect(DISTINCT c.name) AS matched_categories
+        
+        RETURN 
+            p.place_id AS place_id,
+            p.name AS name,
+            p.address AS address,
+            matched_categories AS categories
+        ORDER BY p.name ASC
+        LIMIT $limit
+        """
+
+# Version dữ liệu, được import_to_neo4j.py tăng mỗi lần nạp lại
+DATASET_VERSION_QUERY = """
+        OPTIONAL MATCH (m:DatasetMeta {key: 'places'})
+        RETURN m.version AS version
+        """
+
+AVAILABLE_CATEGORIES_QUERY = """
+        MATCH (c:Category)<-[:HAS_CATEGORY]-(p:Place)
+        RETURN 
+            c.name AS category,
+            count(p) AS place_count
+        ORDER BY place_count DESC
+        LIMIT $limit
+        """
+
+
+def place_from_record(record) -> Dict:
+    """Record Neo4j -> dict địa điểm (place_id, name, address, categories, distance_meters)"""
+    place = {
+        'place_id': record['place_id'],
+        'name': record['name'],
+        'address': record['address'],
+        'categories': record['categories']
+    }
+    if 'distance' in record.keys():
+        place['distance_meters'] = record['distance']
+    return place
+
+
+def group_names_of(category_groups: List[List[str]]) -> List[str]:
+    """Tên nhóm dùng làm key cho find_places_by_multiple_categories"""
+    return ['_'.join(group[:2]) for group in category_groups]
 
 
 class Neo4jSpatialQuery:
     """Class quản lý các truy vấn spatial trên Neo4j"""
     
-    def __init__(self, uri=URI, auth=AUTH):
-        self.driver = GraphDatabase.driver(uri, auth=auth)
+    def __init__(
+        self,
+        uri=URI,
+        auth=AUTH,
+        spatial_index: Optional[SpatialGridIndex] = None,
+        landmark_resolver: Optional[LandmarkResolver] = None,
+        result_cache: Optional[SpatialQueryCache] = None,
+        max_pool_size: int = MAX_POOL_SIZE,
+        acquisition_timeout: float = ACQUISITION_TIMEOUT,
+        query_timeout: Optional[float] = QUERY_TIMEOUT,
+        database: str = DATABASE
+    ):
+        """
+        Args:
+            uri: Neo4j bolt URI
+            auth: (user, password)
+            spatial_index: Grid index in-process (optional). Nếu có,
+                find_places_by_category trả lời từ index thay vì Neo4j
+            landmark_resolver: Resolver cho find_places_nearby_landmark (optional).
+                Nếu có, landmark được resolve trước thay vì CONTAINS scan
+            result_cache: Cache kết quả theo tọa độ lượng tử hóa (optional)
+            max_pool_size: Số connection tối đa trong pool của driver
+            acquisition_timeout: Thời gian tối đa chờ lấy connection từ pool (giây)
+            query_timeout: Timeout cho mỗi transaction phía server (giây, None = không giới hạn)
+            database: Tên database
+        """
+        self.driver = GraphDatabase.driver(
+            uri,
+            auth=auth,
+            max_connection_pool_size=max_pool_size,
+            connection_acquisition_timeout=acquisition_timeout
+        )
+        self.query_timeout = query_timeout
+        self.database = database
+        self.spatial_index = spatial_index
+        self.landmark_resolver = landmark_resolver
+        self.result_cache = result_cache
     
     def close(self):
         """Đóng kết nối"""
@@ -25,6 +255,66 @@ class Neo4jSpatialQuery:
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.close()
 
+    def _query(self, text: str) -> Query:
+        return Query(text, timeout=self.query_timeout)
+
+    def _run(self, text: str, **params) -> List:
+        """Chạy query với timeout và trả về toàn bộ record"""
+        with self.driver.session(database=self.database) as session:
+            return list(session.run(self._query(text), **params))
+
+    def enable_spatial_index(self, spatial_index: Optional[SpatialGridIndex] = None) -> SpatialGridIndex:
+        """Bật grid index; nếu không truyền vào thì dump toàn bộ Place từ Neo4j"""
+        if spatial_index is None:
+            spatial_index = SpatialGridIndex.from_neo4j(self.driver, database=self.database)
+        self.spatial_index = spatial_index
+        return spatial_index
+
+    def enable_landmark_resolver(self, landmark_resolver: Optional[LandmarkResolver] = None) -> LandmarkResolver:
+        """Bật landmark resolver; mặc định chỉ dùng full-text index của Neo4j"""
+        if landmark_resolver is None:
+            landmark_resolver = LandmarkResolver(database=self.database)
+        if landmark_resolver.driver is None:
+            landmark_resolver.driver = self.driver
+        landmark_resolver.ensure_fulltext_index()
+        self.landmark_resolver = landmark_resolver
+        return landmark_resolver
+
+    def enable_result_cache(self, result_cache: Optional[SpatialQueryCache] = None) -> SpatialQueryCache:
+        """Bật result cache; mặc định tự xóa cache khi version dữ liệu trong Neo4j thay đổi"""
+        if result_cache is None:
+            result_cache = SpatialQueryCache(version_fetcher=self.get_dataset_version)
+        self.result_cache = result_cache
+        return result_cache
+
+    def get_dataset_version(self):
+        """Version dữ liệu hiện tại (None nếu chưa import bằng bản importer mới)"""
+        records = self._run(DATASET_VERSION_QUERY)
+        return records[0]['version'] if records else None
+
+    def invalidate_caches(self):
+        """Xóa result cache và cache landmark (gọi sau khi nạp lại dữ liệu)"""
+        if self.result_cache is not None:
+            self.result_cache.invalidate()
+        if self.landmark_resolver is not None:
+            self.landmark_resolver.invalidate()
+
+    def refresh_spatial_index(self, place_ids: Optional[List[str]] = None) -> int:
+        """
+        Đồng bộ lại grid index từ Neo4j
+
+        Args:
+            place_ids: Chỉ refresh các place này (None = toàn bộ)
+
+        Returns:
+            Số place đã được cập nhật
+        """
+        if self.spatial_index is None:
+            return 0
+        return self.spatial_index.refresh_from_neo4j(
+            self.driver, place_ids=place_ids, database=self.database
+        )
+
 
     def find_places_by_category(
         self, 
@@ -47,49 +337,49 @@ class Neo4jSpatialQuery:
         Returns:
             List các địa điểm với thông tin: name, address, distance, categories
         """
-        query = """
-        WITH point({latitude: $lat, longitude: $lon}) AS myLocation
-        
-        MATCH (p:Place)-[:HAS_CATEGORY]->(c:Category)
-        WHERE p.location IS NOT NULL 
-          AND point.distance(p.location, myLocation) <= $radius
-          AND c.name IN $categories
-        
-        WITH DISTINCT p, myLocation,
-             collect(DISTINCT c.name) AS matched_categories,
-             round(point.distance(p.location, myLocation)) AS distance
-        
-        RETURN 
-            p.place_id AS place_id,
-            p.name AS name,
-            p.address AS address,
-            matched_categories AS categories,
-            distance
-        ORDER BY distance ASC
-        LIMIT $limit
-        """
-        
-        with self.driver.session(database="neo4j") as session:
-            result = session.run(
-                query,
-                lat=lat,
-                lon=lon,
-                radius=radius_meters,
-                categories=categories,
-                limit=limit
+        if self.spatial_index is not None:
+            return self.spatial_index.find_places_by_category(
+                lat, lon, categories, radius_meters, limit
             )
-            
-            places = []
-            for record in result:
-                places.append({
-                    'place_id': record['place_id'],
-                    'name': record['name'],
-                    'address': record['address'],
-                    'categories': record['categories'],
-                    'distance_meters': record['distance']
-                })
-            
-            return places
+
+        if self.result_cache is not None:
+            return self.result_cache.find_places_by_category(
+                lat, lon, categories, radius_meters, limit,
+                fetch_candidates=lambda c_lat, c_lon, c_radius, c_limit: [
+                    dict(record) for record in self._run(
+                        FIND_CANDIDATES_BY_CATEGORY_QUERY,
+                        lat=c_lat,
+                        lon=c_lon,
+                        radius=c_radius,
+                        categories=categories,
+                        limit=c_limit
+                    )
+                ],
+                fetch_exact=lambda: self._find_places_by_category_uncached(
+                    lat, lon, categories, radius_meters, limit
+                )
+            )
+
+        return self._find_places_by_category_uncached(lat, lon, categories, radius_meters, limit)
+
+
+    def _find_places_by_category_uncached(
+        self,
+        lat: float,
+        lon: float,
+        categories: List[str],
+        radius_meters: int,
+        limit: int
+    ) -> List[Dict]:
+        records = self._run(
+            FIND_BY_CATEGORY_QUERY,
+            lat=lat,
+            lon=lon,
+            radius=radius_meters,
+            categories=categories,
+            limit=limit
+        )
+        return [place_from_record(record) for record in records]
 
 
     def find_places_by_multiple_categories(
@@ -98,7 +388,8 @@ class Neo4jSpatialQuery:
         lon: float,
         category_groups: List[List[str]],
         radius_meters: int = 1000,
-        limit: int = 20
+        limit: int = 20,
+        batched: bool = True
     ) -> Dict[str, List[Dict]]:
         """
         Tìm địa điểm theo NHIỀU nhóm category cùng lúc
@@ -110,14 +401,22 @@ class Neo4jSpatialQuery:
                 VD: [['restaurant', 'cafe'], ['museum', 'gallery'], ['hotel']]
             radius_meters: Bán kính
             limit: Số kết quả mỗi nhóm
+            batched: Gửi tất cả nhóm trong 1 câu Cypher (1 round-trip)
+                thay vì 1 query cho mỗi nhóm
             
         Returns:
             Dictionary với key là tên nhóm, value là list địa điểm
         """
+        # Grid index trả lời in-process nên không cần gộp query; result cache
+        # cache theo từng nhóm nên đi qua find_places_by_category
+        if batched and self.spatial_index is None and self.result_cache is None and category_groups:
+            return self._find_places_by_category_groups(
+                lat, lon, category_groups, radius_meters, limit
+            )
+
         results = {}
         
-        for group in category_groups:
-            group_name = '_'.join(group[:2])  # Tạo tên nhóm
+        for group_name, group in zip(group_names_of(category_groups), category_groups):
             places = self.find_places_by_category(
                 lat, lon, group, radius_meters, limit
             )
@@ -126,6 +425,37 @@ class Neo4jSpatialQuery:
         return results
 
 
+    def _find_places_by_category_groups(
+        self,
+        lat: float,
+        lon: float,
+        category_groups: List[List[str]],
+        radius_meters: int,
+        limit: int
+    ) -> Dict[str, List[Dict]]:
+        """
+        Batched version của find_places_by_multiple_categories: lọc các Place
+        trong bán kính 1 lần, tính distance 1 lần cho mỗi Place, sau đó
+        UNWIND qua các nhóm và cắt LIMIT riêng cho từng nhóm
+        """
+        group_names = group_names_of(category_groups)
+        results = {name: [] for name in group_names}
+        
+        records = self._run(
+            FIND_BY_CATEGORY_GROUPS_QUERY,
+            lat=lat,
+            lon=lon,
+            radius=radius_meters,
+            groups=category_groups,
+            limit=limit
+        )
+        for record in records:
+            places = [dict(place) for place in record['places']]
+            results[group_names[record['group_index']]] = places
+        
+        return results
+
+
     def find_places_nearby_landmark(
         self,
         landmark_name: str,
@@ -146,69 +476,75 @@ class Neo4jSpatialQuery:
         Returns:
             Dict với landmark info và list địa điểm
         """
-        query = """
-        // Tìm landmark
-        MATCH (landmark:Place)
-        WHERE toLower(landmark.name) CONTAINS toLower($landmark_name)
-          AND landmark.location IS NOT NULL
-        
-        WITH landmark
-        LIMIT 1
-        
-        // Tìm địa điểm xung quanh landmark
-        MATCH (p:Place)-[:HAS_CATEGORY]->(c:Category)
-        WHERE p.location IS NOT NULL
-          AND point.distance(p.location, landmark.location) <= $radius
-          AND c.name IN $categories
-          AND p.place_id <> landmark.place_id
+        if self.landmark_resolver is not None:
+            return self._find_places_nearby_resolved_landmark(
+                landmark_name, categories, radius_meters, limit
+            )
+
+        records = self._run(
+            FIND_NEARBY_LANDMARK_QUERY,
+            landmark_name=landmark_name,
+            categories=categories,
+            radius=radius_meters,
+            limit=limit
+        )
         
-        WITH DISTINCT p, landmark,
-             collect(DISTINCT c.name) AS matched_categories,
-             round(point.distance(p.location, landmark.location)) AS distance
+        places = []
+        landmark_info = None
         
-        RETURN 
-            landmark.name AS landmark_name,
-            landmark.address AS landmark_address,
-            p.place_id AS place_id,
-            p.name AS name,
-            p.address AS address,
-            matched_categories AS categories,
-            distance
-        ORDER BY distance ASC
-        LIMIT $limit
-        """
+        for record in records:
+            if landmark_info is None:
+                landmark_info = {
+                    'name': record['landmark_name'],
+                    'address': record['landmark_address']
+                }
+            
+            places.append(place_from_record(record))
         
-        with self.driver.session(database="neo4j") as session:
-            result = session.run(
-                query,
-                landmark_name=landmark_name,
-                categories=categories,
-                radius=radius_meters,
-                limit=limit
+        return {
+            'landmark': landmark_info,
+            'nearby_places': places
+        }
+
+
+    def _find_places_nearby_resolved_landmark(
+        self,
+        landmark_name: str,
+        categories: List[str],
+        radius_meters: int,
+        limit: int
+    ) -> Dict:
+        """find_places_nearby_landmark khi landmark đã được resolve sẵn ra tọa độ"""
+        landmark = self.landmark_resolver.resolve(landmark_name)
+        if landmark is None:
+            return {'landmark': None, 'nearby_places': []}
+
+        landmark_info = {
+            'name': landmark['name'],
+            'address': landmark['address']
+        }
+
+        if self.spatial_index is not None:
+            places = self.spatial_index.find_places_by_category(
+                landmark['lat'], landmark['lon'], categories, radius_meters, limit + 1
             )
-            
-            places = []
-            landmark_info = None
-            
-            for record in result:
-                if landmark_info is None:
-                    landmark_info = {
-                        'name': record['landmark_name'],
-                        'address': record['landmark_address']
-                    }
-                
-                places.append({
-                    'place_id': record['place_id'],
-                    'name': record['name'],
-                    'address': record['address'],
-                    'categories': record['categories'],
-                    'distance_meters': record['distance']
-                })
-            
-            return {
-                'landmark': landmark_info,
-                'nearby_places': places
-            }
+            places = [p for p in places if p['place_id'] != landmark['place_id']][:limit]
+            return {'landmark': landmark_info, 'nearby_places': places}
+
+        records = self._run(
+            FIND_NEARBY_RESOLVED_LANDMARK_QUERY,
+            lat=landmark['lat'],
+            lon=landmark['lon'],
+            landmark_id=landmark['place_id'],
+            categories=categories,
+            radius=radius_meters,
+            limit=limit
+        )
+        
+        return {
+            'landmark': landmark_info,
+            'nearby_places': [place_from_record(record) for record in records]
+        }
 
 
     def find_places_in_district(
@@ -228,41 +564,20 @@ class Neo4jSpatialQuery:
         Returns:
             List địa điểm
         """
-        query = """
-        MATCH (p:Place)-[:IN_DISTRICT]->(d:District {code: $district_code})
-        MATCH (p)-[:HAS_CATEGORY]->(c:Category)
-        WHERE c.name IN $categories
-        
-        WITH DISTINCT p,
-             collect(DISTINCT c.name) AS matched_categories
-        
-        RETURN 
-            p.place_id AS place_id,
-            p.name AS name,
-            p.address AS address,
-            matched_categories AS categories
-        ORDER BY p.name ASC
-        LIMIT $limit
-        """
-        
-        with self.driver.session(database="neo4j") as session:
-            result = session.run(
-                query,
+        def fetch(fetch_limit: int) -> List[Dict]:
+            records = self._run(
+                FIND_IN_DISTRICT_QUERY,
                 district_code=district_code,
                 categories=categories,
-                limit=limit
+                limit=fetch_limit
             )
-            
-            places = []
-            for record in result:
-                places.append({
-                    'place_id': record['place_id'],
-                    'name': record['name'],
-                    'address': record['address'],
-                    'categories': record['categories']
-                })
-            
-            return places
+            return [place_from_record(record) for record in records]
+
+        if self.result_cache is not None:
+            return self.result_cache.find_places_in_district(
+                district_code, categories, limit, fetch
+            )
+        return fetch(limit)
 
 
     def get_available_categories(self, limit: int = 50) -> List[Dict]:
@@ -272,26 +587,15 @@ class Neo4jSpatialQuery:
         Returns:
             List categories với số lượng địa điểm
         """
-        query = """
-        MATCH (c:Category)<-[:HAS_CATEGORY]-(p:Place)
-        RETURN 
-            c.name AS category,
-            count(p) AS place_count
-        ORDER BY place_count DESC
-        LIMIT $limit
-        """
+        records = self._run(AVAILABLE_CATEGORIES_QUERY, limit=limit)
         
-        with self.driver.session(database="neo4j") as session:
-            result = session.run(query, limit=limit)
-            
-            categories = []
-            for record in result:
-                categories.append({
-                    'category': record['category'],
-                    'place_count': record['place_count']
-                })
-            
-            return categories
+        return [
+            {
+                'category': record['category'],
+                'place_count': record['place_count']
+            }
+            for record in records
+        ]
 
 
     def print_places(self, places: List[Dict], title: str = "KẾT QUẢ TÌM KIẾM"):
@@ -321,6 +625,19 @@ class Neo4jSpatialQuery:
             print("-" * 80)
 
 
+# Singleton instance - 1 driver / connection pool cho cả app
+_neo4j_query = None
+_lock = threading.Lock()
+
+def get_neo4j_query() -> Neo4jSpatialQuery:
+    """Get singleton Neo4jSpatialQuery instance"""
+    global _neo4j_query
+    with _lock:
+        if _neo4j_query is None:
+            _neo4j_query = Neo4jSpatialQuery()
+    return _neo4j_query
+
+
 # ==================== DEMO USAGE ====================
 
 def demo_basic_search(lat=21.0285, lon=105.8542,categories=['restaurant', 'cafe'],radius_meters=1000,limit=10):
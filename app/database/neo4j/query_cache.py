@@ -0,0 +1,220 @@
+"""
+Result cache cho find_places_by_category / find_places_in_district
+
+Client mobile gửi lat/lon lệch nhau vài mét cho cùng 1 truy vấn. Cache key
+theo ô lưới đã lượng tử hóa + tập category đã sort + bucket bán kính; mỗi
+entry giữ tập ứng viên (kèm tọa độ) lấy từ tâm ô với bán kính nới thêm nửa
+đường chéo ô, sau đó re-rank theo khoảng cách chính xác tới tọa độ thật.
+"""
+
+from typing import Callable, Dict, List, Optional
+import bisect
+import math
+import threading
+import time
+
+from app.utils import TTLCache
+from .spatial_index import METERS_PER_DEGREE_LAT, haversine_meters, cypher_round
+
+DEFAULT_RADIUS_BUCKETS = (250, 500, 1000, 2000, 3000, 5000, 10000)
+
+
+class SpatialQueryCache:
+    """Cache kết quả spatial search theo ô lưới lượng tử hóa"""
+
+    def __init__(
+        self,
+        maxsize: int = 2048,
+        ttl_seconds: float = 300,
+        cell_size_meters: float = 150.0,
+        radius_buckets=DEFAULT_RADIUS_BUCKETS,
+        min_fetch_limit: int = 100,
+        version_fetcher: Optional[Callable[[], object]] = None,
+        version_check_interval: float = 30.0,
+        reference_lat: float = 21.0285
+    ):
+        """
+        Args:
+            maxsize: Số entry tối đa (LRU eviction)
+            ttl_seconds: Thời gian sống của 1 entry
+            cell_size_meters: Cạnh ô lưới dùng để lượng tử hóa tọa độ
+            radius_buckets: Các mốc bán kính; bán kính truy vấn được làm tròn lên mốc gần nhất
+            min_fetch_limit: Số ứng viên tối thiểu lấy về cho mỗi entry
+            version_fetcher: Hàm trả về version dữ liệu hiện tại (VD: đọc từ Neo4j).
+                Khi version đổi (import lại dữ liệu) toàn bộ cache bị xóa
+            version_check_interval: Khoảng thời gian tối thiểu giữa 2 lần kiểm tra version (giây)
+            reference_lat: Vĩ độ tham chiếu để quy đổi mét -> độ kinh tuyến
+        """
+        self.cache = TTLCache(maxsize=maxsize, ttl_seconds=ttl_seconds)
+        self.cell_size_meters = cell_size_meters
+        self.radius_buckets = tuple(sorted(radius_buckets))
+        self.min_fetch_limit = min_fetch_limit
+        self.lat_step = cell_size_meters / METERS_PER_DEGREE_LAT
+        self.lon_step = cell_size_meters / (METERS_PER_DEGREE_LAT * math.cos(math.radians(reference_lat)))
+        # Khoảng cách xa nhất từ 1 điểm trong ô tới tâm ô
+        self.margin_meters = cell_size_meters * math.sqrt(2) / 2 * 1.01
+
+        self.version_fetcher = version_fetcher
+        self.version_check_interval = version_check_interval
+        self._version = None
+        self._version_known = False
+        self._version_checked_at = 0.0
+        self._lock = threading.Lock()
+
+        self.fallbacks = 0
+        self.invalidations = 0
+
+    # ==================== KEYS ====================
+
+    def _radius_bucket(self, radius_meters: float) -> float:
+        i = bisect.bisect_left(self.radius_buckets, radius_meters)
+        if i < len(self.radius_buckets):
+            return self.radius_buckets[i]
+        # Lớn hơn mốc cuối: làm tròn lên bội số của mốc cuối
+        step = self.radius_buckets[-1]
+        return math.ceil(radius_meters / step) * step
+
+    def _limit_bucket(self, limit: int) -> int:
+        # Lũy thừa của 2 để các limit gần nhau dùng chung entry
+        return max(self.min_fetch_limit, 1 << max(0, limit - 1).bit_length())
+
+    def _cell_center(self, lat: float, lon: float):
+        i = math.floor(lat / self.lat_step)
+        j = math.floor(lon / self.lon_step)
+        return (i, j), ((i + 0.5) * self.lat_step, (j + 0.5) * self.lon_step)
+
+    # ==================== INVALIDATION ====================
+
+    def invalidate(self):
+        """Xóa toàn bộ cache (VD: sau khi import_to_neo4j.py nạp lại dữ liệu)"""
+        self.cache.clear()
+        self.invalidations += 1
+
+    def _check_version(self):
+        if self.version_fetcher is None:
+            return
+
+        now = time.monotonic()
+        with self._lock:
+            if now - self._version_checked_at < self.version_check_interval:
+                return
+            self._version_checked_at = now
+
+        try:
+            version = self.version_fetcher()
+        except Exception as e:
+            print(f"Error checking dataset version: {e}")
+            return
+
+        with self._lock:
+            # None -> v1 cũng là đổi version (lần đầu chạy importer mới trên DB nạp bằng bản cũ)
+            changed = self._version_known and version != self._version
+            self._version = version
+            self._version_known = True
+        if changed:
+            self.invalidate()
+
+    # ==================== QUERIES ====================
+
+    def find_places_by_category(
+        self,
+        lat: float,
+        lon: float,
+        categories: List[str],
+        radius_meters: int,
+        limit: int,
+        fetch_candidates: Callable[[float, float, float, int], List[Dict]],
+        fetch_exact: Callable[[], List[Dict]]
+    ) -> List[Dict]:
+        """
+        Args:
+            lat, lon, categories, radius_meters, limit: Tham số truy vấn gốc
+            fetch_candidates: (center_lat, center_lon, radius, limit) -> list place
+                có thêm 'lat'/'lon', sắp xếp theo khoảng cách tới tâm
+            fetch_exact: Truy vấn trực tiếp khi tập ứng viên không đủ đảm bảo kết quả đúng
+
+        Returns:
+            List địa điểm cùng format với Neo4jSpatialQuery.find_places_by_category
+        """
+        self._check_version()
+
+        cell, (center_lat, center_lon) = self._cell_center(lat, lon)
+        radius_bucket = self._radius_bucket(radius_meters)
+        limit_bucket = self._limit_bucket(limit)
+        key = ('category', cell, tuple(sorted(set(categories))), radius_bucket, limit_bucket)
+
+        entry = self.cache.get(key)
+        if entry is None:
+            fetch_radius = radius_bucket + self.margin_meters
+            candidates = fetch_candidates(center_lat, center_lon, fetch_radius, limit_bucket)
+            truncated = len(candidates) >= limit_bucket
+            if truncated:
+                # Chỉ các điểm cách tâm < covered_radius chắc chắn có trong tập ứng viên
+                covered_radius = max(
+                    haversine_meters(center_lat, center_lon, c['lat'], c['lon']) for c in candidates
+                )
+            else:
+                covered_radius = fetch_radius
+            entry = {'candidates': candidates, 'truncated': truncated, 'covered_radius': covered_radius}
+            self.cache.set(key, entry)
+
+        ranked = []
+        for place in entry['candidates']:
+            distance = haversine_meters(lat, lon, place['lat'], place['lon'])
+            if distance <= radius_meters:
+                ranked.append((distance, place))
+        ranked.sort(key=lambda item: item[0])
+        ranked = ranked[:limit]
+
+        if entry['truncated']:
+            # Kết quả chỉ chắc chắn đúng nếu toàn bộ vùng cần xét nằm trong safe_radius
+            safe_radius = entry['covered_radius'] - self.margin_meters
+            boundary = ranked[-1][0] if ranked and len(ranked) == limit else radius_meters
+            if boundary >= safe_radius:
+                self.fallbacks += 1
+                return fetch_exact()
+
+        return [
+            {
+                'place_id': place['place_id'],
+                'name': place['name'],
+                'address': place['address'],
+                'categories': list(place['categories']),
+                'distance_meters': cypher_round(distance)
+            }
+            for distance, place in ranked
+        ]
+
+    def find_places_in_district(
+        self,
+        district_code: str,
+        categories: List[str],
+        limit: int,
+        fetch: Callable[[int], List[Dict]]
+    ) -> List[Dict]:
+        """
+        Args:
+            district_code, categories, limit: Tham số truy vấn gốc
+            fetch: (limit) -> list place sắp xếp theo tên
+        """
+        self._check_version()
+
+        limit_bucket = self._limit_bucket(limit)
+        key = ('district', district_code, tuple(sorted(set(categories))), limit_bucket)
+
+        places = self.cache.get(key)
+        if places is None:
+            places = fetch(limit_bucket)
+            self.cache.set(key, places)
+
+        return [dict(place) for place in places[:limit]]
+
+    def stats(self) -> Dict:
+        """Thống kê cache: hit/miss, số lần fallback, số lần invalidate"""
+        stats = self.cache.stats()
+        stats.update({
+            'fallbacks': self.fallbacks,
+            'invalidations': self.invalidations,
+            'dataset_version': self._version
+        })
+        return stats
@@ -0,0 +1,269 @@
+"""
+Spatial grid index in-process cho các truy vấn radius + category
+
+Chia mặt phẳng lat/lon thành các ô lưới đều nhau (mặc định ~250m), mỗi
+category giữ danh sách place theo ô. Truy vấn chỉ duyệt các ô giao với
+bounding box của bán kính rồi tính khoảng cách chính xác, không cần
+round-trip tới Neo4j.
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+import math
+import threading
+
+import pandas as pd
+
+# Neo4j tính point.distance (WGS-84 2D) bằng haversine với bán kính này
+EARTH_RADIUS_METERS = 6378140.0
+METERS_PER_DEGREE_LAT = math.pi * EARTH_RADIUS_METERS / 180.0
+
+DUMP_PLACES_QUERY = """
+MATCH (p:Place)
+WHERE p.location IS NOT NULL
+  AND ($place_ids IS NULL OR p.place_id IN $place_ids)
+OPTIONAL MATCH (p)-[:HAS_CATEGORY]->(c:Category)
+RETURN
+    p.place_id AS place_id,
+    p.name AS name,
+    p.address AS address,
+    p.location.latitude AS lat,
+    p.location.longitude AS lon,
+    collect(DISTINCT c.name) AS categories
+"""
+
+
+def haversine_meters(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Khoảng cách haversine (mét), khớp với point.distance của Neo4j"""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_METERS * math.asin(min(1.0, math.sqrt(a)))
+
+
+def cypher_round(value: float) -> float:
+    """round() của Cypher: làm tròn half-up và trả về float"""
+    return float(math.floor(value + 0.5))
+
+
+def split_categories(value) -> List[str]:
+    """Tách categories/subcategories giống Neo4jImporter để index khớp với graph"""
+    if value is None or (isinstance(value, float) and math.isnan(value)) or not value:
+        return []
+    return [c.strip() for c in str(value).split(',') if c.strip()]
+
+
+class SpatialGridIndex:
+    """Uniform grid index cho Place, trả về cùng format với Neo4jSpatialQuery"""
+
+    def __init__(self, cell_size_meters: float = 250.0, reference_lat: float = 21.0285):
+        """
+        Args:
+            cell_size_meters: Kích thước cạnh ô lưới (mét)
+            reference_lat: Vĩ độ tham chiếu để quy đổi mét -> độ kinh tuyến
+        """
+        self.cell_size_meters = cell_size_meters
+        self.lat_step = cell_size_meters / METERS_PER_DEGREE_LAT
+        self.lon_step = cell_size_meters / (METERS_PER_DEGREE_LAT * math.cos(math.radians(reference_lat)))
+
+        self._lock = threading.RLock()
+        self._places: Dict[str, Dict] = {}
+        # category -> cell -> set(place_id)
+        self._cells: Dict[str, Dict[Tuple[int, int], set]] = {}
+
+    def __len__(self):
+        return len(self._places)
+
+    def _cell_of(self, lat: float, lon: float) -> Tuple[int, int]:
+        return (math.floor(lat / self.lat_step), math.floor(lon / self.lon_step))
+
+    # ==================== BUILD / UPDATE ====================
+
+    def upsert_place(
+        self,
+        place_id: str,
+        name: str,
+        address: Optional[str],
+        lat: float,
+        lon: float,
+        categories: Iterable[str]
+    ):
+        """Thêm hoặc cập nhật 1 place trong index"""
+        if lat is None or lon is None or math.isnan(lat) or math.isnan(lon):
+            self.remove_place(place_id)
+            return
+
+        place = {
+            'place_id': place_id,
+            'name': name,
+            'address': address,
+            'lat': float(lat),
+            'lon': float(lon),
+            'categories': list(dict.fromkeys(categories)),
+            'cell': self._cell_of(lat, lon)
+        }
+
+        with self._lock:
+            self.remove_place(place_id)
+            self._places[place_id] = place
+            for category in place['categories']:
+                cells = self._cells.setdefault(category, {})
+                cells.setdefault(place['cell'], set()).add(place_id)
+
+    def remove_place(self, place_id: str):
+        """Xóa 1 place khỏi index (nếu có)"""
+        with self._lock:
+            place = self._places.pop(place_id, None)
+            if place is None:
+                return
+
+            for category in place['categories']:
+                cells = self._cells.get(category)
+                if not cells:
+                    continue
+                members = cells.get(place['cell'])
+                if members is not None:
+                    members.discard(place_id)
+                    if not members:
+                        del cells[place['cell']]
+                if not cells:
+                    del self._cells[category]
+
+    def clear(self):
+        with self._lock:
+            self._places = {}
+            self._cells = {}
+
+    @classmethod
+    def from_csv(cls, csv_path: str, **kwargs) -> 'SpatialGridIndex':
+        """
+        Build index từ CSV cùng schema với hanoi_places_osm_filtered_full_row.csv
+
+        Args:
+            csv_path: Đường dẫn file CSV
+            **kwargs: Tham số cho SpatialGridIndex (cell_size_meters, ...)
+        """
+        index = cls(**kwargs)
+        df = pd.read_csv(csv_path)
+
+        for row in df.itertuples(index=False):
+            categories = split_categories(getattr(row, 'categories', None))
+            categories += split_categories(getattr(row, 'subcategories', None))
+            address = getattr(row, 'address', None)
+
+            index.upsert_place(
+                place_id=str(row.place_id),
+                name=str(row.name),
+                address=str(address) if pd.notna(address) else None,
+                lat=float(row.lat),
+                lon=float(row.lon),
+                categories=categories
+            )
+
+        return index
+
+    @classmethod
+    def from_neo4j(cls, driver, database: str = "neo4j", **kwargs) -> 'SpatialGridIndex':
+        """Build index từ dump toàn bộ Place trong Neo4j"""
+        index = cls(**kwargs)
+        index.refresh_from_neo4j(driver, database=database)
+        return index
+
+    def refresh_from_neo4j(
+        self,
+        driver,
+        place_ids: Optional[List[str]] = None,
+        database: str = "neo4j"
+    ) -> int:
+        """
+        Đồng bộ index với Neo4j
+
+        Args:
+            driver: Neo4j driver
+            place_ids: Chỉ refresh các place này (None = toàn bộ).
+                Place không còn trong Neo4j sẽ bị xóa khỏi index.
+            database: Tên database
+
+        Returns:
+            Số place đã được cập nhật
+        """
+        with driver.session(database=database) as session:
+            records = list(session.run(DUMP_PLACES_QUERY, place_ids=place_ids))
+
+        seen = set()
+        with self._lock:
+            for record in records:
+                seen.add(record['place_id'])
+                self.upsert_place(
+                    place_id=record['place_id'],
+                    name=record['name'],
+                    address=record['address'],
+                    lat=record['lat'],
+                    lon=record['lon'],
+                    categories=record['categories']
+                )
+
+            stale = set(self._places) if place_ids is None else set(place_ids)
+            for place_id in stale - seen:
+                self.remove_place(place_id)
+
+        return len(seen)
+
+    # ==================== QUERY ====================
+
+    def find_places_by_category(
+        self,
+        lat: float,
+        lon: float,
+        categories: List[str],
+        radius_meters: int = 1000,
+        limit: int = 20
+    ) -> List[Dict]:
+        """
+        Tìm địa điểm theo category xung quanh tọa độ, cùng format với
+        Neo4jSpatialQuery.find_places_by_category
+        """
+        lat_span = radius_meters / METERS_PER_DEGREE_LAT
+        cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+        lon_span = lat_span / cos_lat
+
+        min_cell = self._cell_of(lat - lat_span, lon - lon_span)
+        max_cell = self._cell_of(lat + lat_span, lon + lon_span)
+
+        matches = []
+        with self._lock:
+            candidates = set()
+            for category in set(categories):
+                cells = self._cells.get(category)
+                if not cells:
+                    continue
+                for i in range(min_cell[0], max_cell[0] + 1):
+                    for j in range(min_cell[1], max_cell[1] + 1):
+                        members = cells.get((i, j))
+                        if members:
+                            candidates.update(members)
+
+            for place_id in candidates:
+                place = self._places[place_id]
+                # Loại nhanh các điểm nằm ngoài bounding box trước khi tính haversine
+                if abs(place['lat'] - lat) > lat_span or abs(place['lon'] - lon) > lon_span:
+                    continue
+                distance = haversine_meters(lat, lon, place['lat'], place['lon'])
+                if distance > radius_meters:
+                    continue
+                matches.append((distance, place))
+
+        matches.sort(key=lambda item: item[0])
+
+        wanted = set(categories)
+        return [
+            {
+                'place_id': place['place_id'],
+                'name': place['name'],
+                'address': place['address'],
+                'categories': [c for c in place['categories'] if c in wanted],
+                'distance_meters': cypher_round(distance)
+            }
+            for distance, place in matches[:limit]
+        ]
@@ -1 +1,7 @@
-from .main import QdrantPlaceSearch
\ No newline at end of file
+from .main import QdrantPlaceSearch
+from .collection import create_collection, ensure_payload_indexes, update_collection, search_params
+from .embedding_cache import EmbeddingCache, get_embedding_cache
+from .embedding_client import (
+    EmbeddingClient, AsyncEmbeddingClient, EmbeddingServiceUnavailable,
+    get_embedding_client, get_async_embedding_client
+)
@@ -0,0 +1,144 @@
+"""
+Quản lý collection Qdrant (map_assistant_v2)
+
+Tạo collection với HNSW đã tune + scalar quantization int8 (rescore bằng
+vector gốc lúc search) và payload index cho mọi field được filter/group.
+Dùng chung cho save_to_qdrant.py (lúc ingest) và QdrantPlaceSearch (search params).
+"""
+
+from typing import Dict, Optional
+import os
+
+from qdrant_client import QdrantClient
+from qdrant_client.models import (
+    Distance, VectorParams, HnswConfigDiff, OptimizersConfigDiff,
+    ScalarQuantization, ScalarQuantizationConfig, ScalarType, Disabled,
+    PayloadSchemaType, SearchParams, QuantizationSearchParams
+)
+
+COLLECTION_NAME = os.getenv("QDRANT_COLLECTION", "map_assistant_v2")
+VECTOR_SIZE = 1024
+
+# HNSW / quantization: giá trị khởi điểm thông dụng (m=16 như mặc định Qdrant,
+# ef_construct/ef nới rộng hơn cho 1024 chiều), CHƯA đo trên dữ liệu này -
+# chạy resource/benchmark/bench_qdrant_recall.py để chọn lại theo recall/latency
+HNSW_M = int(os.getenv("QDRANT_HNSW_M", 16))
+HNSW_EF_CONSTRUCT = int(os.getenv("QDRANT_HNSW_EF_CONSTRUCT", 200))
+HNSW_EF = int(os.getenv("QDRANT_HNSW_EF", 128))
+QUANTIZATION = os.getenv("QDRANT_QUANTIZATION", "int8").lower()
+RESCORE_OVERSAMPLING = float(os.getenv("QDRANT_RESCORE_OVERSAMPLING", 2.0))
+
+# Field -> kiểu index cho mọi field dùng trong filter / search_groups
+PAYLOAD_INDEXES: Dict[str, PayloadSchemaType] = {
+    "document_id": PayloadSchemaType.KEYWORD,
+    "place_id": PayloadSchemaType.KEYWORD,
+    "title": PayloadSchemaType.KEYWORD,
+    "categories": PayloadSchemaType.KEYWORD,
+    "has_images": PayloadSchemaType.BOOL,
+    "location": PayloadSchemaType.GEO,
+}
+
+
+def quantization_config(kind: str = QUANTIZATION) -> Optional[ScalarQuantization]:
+    """int8 scalar quantization (giữ vector quantized trong RAM), 'none' = tắt"""
+    if kind in ("", "none", "off"):
+        return None
+    if kind != "int8":
+        raise ValueError(f"Unsupported quantization '{kind}', expected 'int8' or 'none'")
+    return ScalarQuantization(
+        scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True)
+    )
+
+
+def create_collection(
+    client: QdrantClient,
+    collection_name: str = COLLECTION_NAME,
+    hnsw_m: int = HNSW_M,
+    hnsw_ef_construct: int = HNSW_EF_CONSTRUCT,
+    quantization: str = QUANTIZATION,
+    on_disk: bool = False,
+    recreate: bool = False
+) -> bool:
+    """
+    Tạo collection nếu chưa có (hoặc tạo lại nếu recreate=True) và build payload index
+
+    Args:
+        client: QdrantClient
+        collection_name: Tên collection
+        hnsw_m: Số cạnh mỗi node HNSW
+        hnsw_ef_construct: Độ rộng tìm kiếm lúc build index
+        quantization: 'int8' | 'none'
+        on_disk: Lưu vector gốc trên disk (vector quantized vẫn ở RAM)
+        recreate: Xóa và tạo lại collection
+
+    Returns:
+        True nếu collection được tạo mới
+    """
+    existing = [c.name for c in client.get_collections().collections]
+    created = False
+
+    if recreate or collection_name not in existing:
+        params = dict(
+            collection_name=collection_name,
+            vectors_config=VectorParams(size=VECTOR_SIZE, distance=Distance.COSINE, on_disk=on_disk),
+            hnsw_config=HnswConfigDiff(m=hnsw_m, ef_construct=hnsw_ef_construct),
+            optimizers_config=OptimizersConfigDiff(default_segment_number=2),
+            quantization_config=quantization_config(quantization)
+        )
+        if recreate:
+            client.recreate_collection(**params)
+        else:
+            client.create_collection(**params)
+        created = True
+
+    ensure_payload_indexes(client, collection_name)
+    return created
+
+
+def ensure_payload_indexes(client: QdrantClient, collection_name: str = COLLECTION_NAME):
+    """Tạo payload index cho các field trong PAYLOAD_INDEXES (bỏ qua field đã có index)"""
+    info = client.get_collection(collection_name)
+    indexed = set((info.payload_schema or {}).keys())
+    for field_name, schema in PAYLOAD_INDEXES.items():
+        if field_name in indexed:
+            continue
+        client.create_payload_index(
+            collection_name=collection_name,
+            field_name=field_name,
+            field_schema=schema,
+            wait=True
+        )
+
+
+def update_collection(
+    client: QdrantClient,
+    collection_name: str = COLLECTION_NAME,
+    hnsw_m: int = HNSW_M,
+    hnsw_ef_construct: int = HNSW_EF_CONSTRUCT,
+    quantization: str = QUANTIZATION
+):
+    """Áp dụng HNSW/quantization mới cho collection đã có (Qdrant build lại index ở background)"""
+    client.update_collection(
+        collection_name=collection_name,
+        hnsw_config=HnswConfigDiff(m=hnsw_m, ef_construct=hnsw_ef_construct),
+        # None nghĩa là "giữ nguyên" với update -> tắt quantization phải gửi Disabled
+        quantization_config=quantization_config(quantization) or Disabled.DISABLED
+    )
+    ensure_payload_indexes(client, collection_name)
+
+
+def search_params(
+    hnsw_ef: int = HNSW_EF,
+    rescore: bool = True,
+    oversampling: float = RESCORE_OVERSAMPLING,
+    exact: bool = False
+) -> SearchParams:
+    """
+    Search params: lấy oversampling x limit ứng viên trên vector int8 rồi
+    rescore bằng vector gốc
+    """
+    return SearchParams(
+        hnsw_ef=hnsw_ef,
+        exact=exact,
+        quantization=QuantizationSearchParams(rescore=rescore, oversampling=oversampling)
+    )
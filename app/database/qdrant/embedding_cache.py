@@ -0,0 +1,115 @@
+"""
+Cache embedding của query đứng trước embedding service
+
+Key = tên model + text đã chuẩn hóa (NFC, gộp khoảng trắng). Tầng 1 là LRU
+in-memory, tầng 2 (optional) là SQLite để các tên hay hỏi ("Hồ Gươm",
+"Lăng Bác") không phải embed lại sau khi restart.
+"""
+
+from array import array
+from typing import Dict, List, Optional
+import hashlib
+import os
+
+from app.utils import TTLCache, MISSING, SQLiteStore, normalize_text
+
+DEFAULT_MODEL_NAME = "AITeamVN/Vietnamese_Embedding"
+
+
+class EmbeddingCache:
+    """LRU in-memory + SQLite persistent cho vector embedding"""
+
+    def __init__(
+        self,
+        maxsize: int = 10000,
+        sqlite_path: Optional[str] = None,
+        model_name: str = DEFAULT_MODEL_NAME
+    ):
+        """
+        Args:
+            maxsize: Số vector tối đa giữ trong memory (LRU eviction)
+            sqlite_path: File SQLite cho tầng persistent (None = chỉ dùng memory)
+            model_name: Tên model embedding, nằm trong key để đổi model không dùng nhầm vector cũ
+        """
+        self.model_name = model_name
+        self.memory = TTLCache(maxsize=maxsize, ttl_seconds=None)
+        self.store = SQLiteStore(sqlite_path, table="embeddings") if sqlite_path else None
+        self.disk_hits = 0
+
+    def _key(self, text: str) -> str:
+        raw = f"{self.model_name}\x00{normalize_text(text)}"
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def get(self, text: str) -> Optional[List[float]]:
+        """Vector đã cache của text, None nếu chưa có"""
+        key = self._key(text)
+        vector = self.memory.get(key, MISSING)
+        if vector is not MISSING:
+            return list(vector)
+
+        if self.store is not None:
+            blob = self.store.get(key)
+            if blob is not MISSING:
+                # float32 giống output của model nên không mất độ chính xác
+                vector = array('f')
+                vector.frombytes(blob)
+                self.memory.set(key, vector)
+                self.disk_hits += 1
+                return vector.tolist()
+
+        return None
+
+    def set(self, text: str, vector: List[float]):
+        """Lưu vector của text vào cả 2 tầng"""
+        key = self._key(text)
+        packed = array('f', vector)
+        self.memory.set(key, packed)
+        if self.store is not None:
+            self.store.set(key, packed.tobytes())
+
+    def clear(self):
+        self.memory.clear()
+        if self.store is not None:
+            self.store.clear()
+
+    def stats(self) -> Dict:
+        """Hit rate tổng (memory + disk) và thống kê từng tầng"""
+        memory = self.memory.stats()
+        # Miss ở memory nhưng hit ở disk vẫn tính là hit
+        hits = memory['hits'] + self.disk_hits
+        total = memory['hits'] + memory['misses']
+        return {
+            'model_name': self.model_name,
+            'hits': hits,
+            'misses': total - hits,
+            'hit_rate': round(hits / total, 4) if total else 0.0,
+            'memory': memory,
+            'disk': {
+                'path': self.store.path,
+                'size': len(self.store),
+                'hits': self.disk_hits
+            } if self.store is not None else None
+        }
+
+
+# Singleton - dùng chung giữa main_service và agent_service
+_embedding_cache = None
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """
+    Get singleton EmbeddingCache cấu hình từ env:
+    EMBEDDING_CACHE_SIZE (0 = tắt), EMBEDDING_CACHE_PATH (trống = chỉ memory),
+    EMBEDDING_MODEL_NAME
+    """
+    global _embedding_cache
+    if _embedding_cache is None:
+        maxsize = int(os.getenv("EMBEDDING_CACHE_SIZE", 10000))
+        if maxsize <= 0:
+            return None
+        _embedding_cache = EmbeddingCache(
+            maxsize=maxsize,
+            sqlite_path=os.getenv("EMBEDDING_CACHE_PATH") or None,
+            model_name=os.getenv("EMBEDDING_MODEL_NAME", DEFAULT_MODEL_NAME)
+        )
+    return _embedding_cache
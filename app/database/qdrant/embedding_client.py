@@ -0,0 +1,347 @@
+"""
+HTTP client cho embedding service (serve/embed_service.py)
+
+- EmbeddingClient: requests.Session dùng chung connection pool keep-alive,
+  retry có backoff cho lỗi kết nối / 5xx, circuit breaker để request không
+  treo hết timeout khi service chết
+- AsyncEmbeddingClient: bản asyncio trên httpx.AsyncClient, cùng retry và
+  circuit breaker, để overlap thời gian embedding với I/O khác
+Cả 2 ghi lại latency (p50/p95/p99) và số request/lỗi cho /metrics.
+"""
+
+from collections import deque
+from typing import Dict, List, Optional
+import asyncio
+import os
+import threading
+import time
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+RETRY_STATUSES = (502, 503, 504)
+
+
+class EmbeddingServiceUnavailable(RuntimeError):
+    """Circuit breaker đang mở hoặc embedding service lỗi sau khi đã retry"""
+
+
+class CircuitBreaker:
+    """
+    Mở sau `failure_threshold` lỗi liên tiếp; trong `reset_seconds` mọi
+    request bị từ chối ngay. Hết thời gian đó cho 1 request thử (half-open):
+    thành công -> đóng lại, lỗi -> mở tiếp
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_seconds:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._probing:
+                self._probing = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+    def record_cancelled(self):
+        """Request bị hủy giữa chừng: không tính lỗi, chỉ nhả lượt thử half-open"""
+        with self._lock:
+            self._probing = False
+
+
+class LatencyStats:
+    """Latency của các request gần nhất + counters"""
+
+    def __init__(self, window: int = 1000):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.failures = 0
+        self.retries = 0
+
+    def record(self, latency_ms: float, ok: bool):
+        with self._lock:
+            self.requests += 1
+            if ok:
+                self._samples.append(latency_ms)
+            else:
+                self.failures += 1
+
+    def record_retries(self, count: int):
+        with self._lock:
+            self.retries += count
+
+    def stats(self) -> Dict:
+        with self._lock:
+            samples = sorted(self._samples)
+            requests_count, failures, retries = self.requests, self.failures, self.retries
+
+        def pick(q):
+            return round(samples[min(len(samples) - 1, int(len(samples) * q))], 2) if samples else None
+
+        return {
+            'requests': requests_count,
+            'failures': failures,
+            'retries': retries,
+            'latency_ms': {'p50': pick(0.5), 'p95': pick(0.95), 'p99': pick(0.99)}
+        }
+
+
+class EmbeddingClient:
+    """Client đồng bộ, dùng chung 1 Session (keep-alive) giữa các thread"""
+
+    def __init__(
+        self,
+        url: str,
+        connect_timeout: float = 2.0,
+        read_timeout: float = 10.0,
+        max_retries: int = 2,
+        backoff_factor: float = 0.2,
+        pool_size: int = 20,
+        failure_threshold: int = 5,
+        reset_seconds: float = 30.0
+    ):
+        """
+        Args:
+            url: Endpoint /embed
+            connect_timeout: Timeout mở kết nối (giây)
+            read_timeout: Timeout chờ response (giây)
+            max_retries: Số lần retry khi lỗi kết nối hoặc 502/503/504
+            backoff_factor: Backoff giữa các lần retry (giây, tăng theo lũy thừa 2)
+            pool_size: Số connection keep-alive tối đa
+            failure_threshold: Số lỗi liên tiếp trước khi mở circuit breaker
+            reset_seconds: Thời gian circuit breaker mở trước khi thử lại
+        """
+        self.url = url
+        self.timeout = (connect_timeout, read_timeout)
+        self.breaker = CircuitBreaker(failure_threshold, reset_seconds)
+        self.latency = LatencyStats()
+
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(["POST"]),
+            raise_on_status=False
+        )
+        self._adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", self._adapter)
+        self.session.mount("https://", self._adapter)
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embedding cho texts (1 request)"""
+        if not self.breaker.allow():
+            raise EmbeddingServiceUnavailable(f"Circuit breaker open for {self.url}")
+
+        start = time.perf_counter()
+        ok = False
+        try:
+            resp = self.session.post(self.url, json={"texts": texts}, timeout=self.timeout)
+            # Số lần urllib3 đã retry cho request này
+            if resp.raw is not None and getattr(resp.raw, 'retries', None) is not None:
+                self.latency.record_retries(len(resp.raw.retries.history))
+            resp.raise_for_status()
+            embeddings = resp.json()["embeddings"]
+            ok = True
+        except (requests.RequestException, KeyError, ValueError) as e:
+            # ValueError: body không phải JSON, KeyError: thiếu "embeddings"
+            raise EmbeddingServiceUnavailable(f"Embedding service error: {e!r}") from e
+        finally:
+            # Mọi lỗi (kể cả ngoài requests) đều ghi nhận, để request thử half-open không kẹt
+            self.latency.record((time.perf_counter() - start) * 1000, ok=ok)
+            if ok:
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+        return embeddings
+
+    def _connection_stats(self) -> Dict:
+        # urllib3 đếm số connection mở mới và số request trên mỗi pool
+        pool = self._adapter.poolmanager.connection_from_url(self.url)
+        opened = pool.num_connections
+        sent = pool.num_requests
+        return {
+            'opened': opened,
+            'requests': sent,
+            'reuse_rate': round(1 - opened / sent, 4) if sent else 0.0
+        }
+
+    def stats(self) -> Dict:
+        stats = self.latency.stats()
+        stats.update({
+            'url': self.url,
+            'circuit': self.breaker.state,
+            'rejected': self.breaker.rejected,
+            'connections': self._connection_stats()
+        })
+        return stats
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncEmbeddingClient:
+    """Client asyncio (httpx), tạo và dùng trong cùng 1 event loop"""
+
+    def __init__(
+        self,
+        url: str,
+        connect_timeout: float = 2.0,
+        read_timeout: float = 10.0,
+        max_retries: int = 2,
+        backoff_factor: float = 0.2,
+        pool_size: int = 20,
+        failure_threshold: int = 5,
+        reset_seconds: float = 30.0
+    ):
+        """Tham số giống EmbeddingClient"""
+        self.url = url
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.breaker = CircuitBreaker(failure_threshold, reset_seconds)
+        self.latency = LatencyStats()
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        )
+
+    async def _post(self, texts: List[str]) -> List[List[float]]:
+        for attempt in range(self.max_retries + 1):
+            try:
+                resp = await self.client.post(self.url, json={"texts": texts})
+                if resp.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                    raise httpx.HTTPStatusError("retryable status", request=resp.request, response=resp)
+                resp.raise_for_status()
+                return resp.json()["embeddings"]
+            except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                retryable = isinstance(e, httpx.TransportError) or e.response.status_code in RETRY_STATUSES
+                if retryable and attempt < self.max_retries:
+                    self.latency.record_retries(1)
+                    await asyncio.sleep(self.backoff_factor * (2 ** attempt))
+                    continue
+                raise EmbeddingServiceUnavailable(f"Embedding service error: {e!r}") from e
+            except (KeyError, ValueError) as e:
+                # ValueError: body không phải JSON, KeyError: thiếu "embeddings"
+                raise EmbeddingServiceUnavailable(f"Embedding service error: {e!r}") from e
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embedding cho texts (1 request, retry khi lỗi kết nối hoặc 502/503/504)"""
+        if not self.breaker.allow():
+            raise EmbeddingServiceUnavailable(f"Circuit breaker open for {self.url}")
+
+        start = time.perf_counter()
+        outcome = "failed"
+        try:
+            embeddings = await self._post(texts)
+            outcome = "ok"
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        finally:
+            # Như EmbeddingClient.embed: mọi kết cục đều ghi nhận; bị hủy thì không tính là lỗi service
+            if outcome == "cancelled":
+                self.breaker.record_cancelled()
+            else:
+                self.latency.record((time.perf_counter() - start) * 1000, ok=outcome == "ok")
+                if outcome == "ok":
+                    self.breaker.record_success()
+                else:
+                    self.breaker.record_failure()
+        return embeddings
+
+    def stats(self) -> Dict:
+        stats = self.latency.stats()
+        stats.update({
+            'url': self.url,
+            'circuit': self.breaker.state,
+            'rejected': self.breaker.rejected
+        })
+        return stats
+
+    async def close(self):
+        await self.client.aclose()
+
+
+def _client_kwargs() -> Dict:
+    return {
+        'connect_timeout': float(os.getenv("EMBEDDING_CONNECT_TIMEOUT", 2)),
+        'read_timeout': float(os.getenv("EMBEDDING_READ_TIMEOUT", 10)),
+        'max_retries': int(os.getenv("EMBEDDING_MAX_RETRIES", 2)),
+        'pool_size': int(os.getenv("EMBEDDING_POOL_SIZE", 20)),
+        'failure_threshold': int(os.getenv("EMBEDDING_BREAKER_THRESHOLD", 5)),
+        'reset_seconds': float(os.getenv("EMBEDDING_BREAKER_RESET", 30))
+    }
+
+
+# Singleton - dùng chung connection pool giữa main_service và agent_service
+_embedding_client = None
+_lock = threading.Lock()
+
+
+def get_embedding_client(url: Optional[str] = None) -> EmbeddingClient:
+    """Get singleton EmbeddingClient cấu hình từ env (EMBEDDING_SERVICE_URL, EMBEDDING_*)"""
+    global _embedding_client
+    with _lock:
+        if _embedding_client is None:
+            _embedding_client = EmbeddingClient(
+                url or os.getenv("EMBEDDING_SERVICE_URL"),
+                **_client_kwargs()
+            )
+    return _embedding_client
+
+
+# Singleton bản async - httpx.AsyncClient gắn với event loop tạo ra nó
+_async_embedding_client = None
+
+
+def get_async_embedding_client(url: Optional[str] = None) -> AsyncEmbeddingClient:
+    """
+    Get singleton AsyncEmbeddingClient cấu hình từ env (giống get_embedding_client)
+    Chỉ gọi trong event loop sẽ dùng nó (background loop của async layer)
+    """
+    global _async_embedding_client
+    if _async_embedding_client is None:
+        _async_embedding_client = AsyncEmbeddingClient(
+            url or os.getenv("EMBEDDING_SERVICE_URL"),
+            **_client_kwargs()
+        )
+    return _async_embedding_client
+
+
+def get_async_embedding_client_stats() -> Optional[Dict]:
+    """Stats của AsyncEmbeddingClient cho /metrics, None nếu chưa được tạo"""
+    return _async_embedding_client.stats() if _async_embedding_client is not None else None
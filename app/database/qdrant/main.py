@@ -1,17 +1,34 @@
 import torch
 from transformers import AutoTokenizer, AutoModel
 from qdrant_client import QdrantClient
-from qdrant_client.models import Filter, FieldCondition, MatchValue
+from qdrant_client.models import (
+    Filter, FieldCondition, MatchValue, SearchRequest, PayloadSelectorInclude, GeoRadius, GeoPoint,
+    SearchParams
+)
 from typing import List, Dict, Optional
 import json
 import os
 
 
 EMBEDDING_SERVICE_URL = os.getenv("EMBEDDING_SERVICE_URL")
-QDRANT_HOST = os.getenv("QDRANT_HOST")
-QDRANT_PORT = int(os.getenv("QDRANT_PORT"))
-QDRANT_COLLECTION = os.getenv("QDRANT_COLLECTION")
-import requests
+QDRANT_HOST = os.getenv("QDRANT_HOST", "localhost")
+QDRANT_PORT = int(os.getenv("QDRANT_PORT", 6333))
+QDRANT_COLLECTION = os.getenv("QDRANT_COLLECTION", "map_assistant_v2")
+
+from .embedding_cache import EmbeddingCache
+from .embedding_client import EmbeddingClient, AsyncEmbeddingClient
+from . import collection
+
+# Payload fields mỗi endpoint thực sự đọc - truyền vào payload_fields để
+# Qdrant không gửi về text chunk / images khi không cần
+DETAIL_FIELDS = ['title', 'summary', 'images', 'url', 'lat', 'lon', 'opening_hours']
+CARD_FIELDS = [
+    'title', 'name', 'summary', 'images', 'url', 'lat', 'lon',
+    'opening_hours', 'price_range', 'min_price', 'max_price'
+]
+COMPARE_FIELDS = ['title', 'url', 'summary', 'text']
+NAME_FIELDS = ['title', 'name']
+
 class QdrantPlaceSearch:
     """Qdrant search for place details using semantic search"""
     
@@ -20,7 +37,10 @@ class QdrantPlaceSearch:
         qdrant_url: str = QDRANT_HOST,
         qdrant_port: int = QDRANT_PORT,
         collection_name: str = QDRANT_COLLECTION,
-        embedding_service_url: str = EMBEDDING_SERVICE_URL
+        embedding_service_url: str = EMBEDDING_SERVICE_URL,
+        embedding_cache: Optional[EmbeddingCache] = None,
+        embedding_client: Optional[EmbeddingClient] = None,
+        search_params: Optional[SearchParams] = None
     ):
         """
         Initialize Qdrant search client
@@ -29,26 +49,99 @@ class QdrantPlaceSearch:
             qdrant_url: Qdrant server URL
             qdrant_port: Qdrant server port
             collection_name: Collection name in Qdrant
-            embedding_model: Pre-loaded embedding model (optional)
+            embedding_service_url: Embedding service /embed endpoint
+            embedding_cache: Cache vector theo text (optional)
+            embedding_client: Client dùng chung connection pool (None = tạo client riêng)
+            search_params: HNSW ef / quantization rescore (None = collection.search_params())
         """
         self.client = QdrantClient(host=qdrant_url, port=qdrant_port)
         self.collection_name = collection_name
         self.embedding_service_url = embedding_service_url
+        self.embedding_cache = embedding_cache
+        self.embedding_client = embedding_client or EmbeddingClient(embedding_service_url)
+        self.search_params = search_params or collection.search_params()
         
-        print(f"✓ Embedding service: {embedding_service_url}")
+        print(f"✓ Embedding service: {self.embedding_client.url}")
         print(f"✓ Connected to Qdrant: {qdrant_url}:{qdrant_port}")
         print(f"✓ Using collection: {collection_name}")
     
     def _get_embedding(self, text: str):
-        resp = requests.post(self.embedding_service_url, json={"texts": [text]}, timeout=10)
-        resp.raise_for_status()
-        return resp.json()["embeddings"][0]
+        return self._get_embeddings([text])[0]
+    
+    def _cached_embeddings(self, texts: List[str]):
+        """Vector có sẵn trong cache (None nếu chưa có) + {text chưa có: các vị trí}"""
+        vectors = [None] * len(texts)
+        missing = {}
+        for i, text in enumerate(texts):
+            vector = self.embedding_cache.get(text) if self.embedding_cache is not None else None
+            if vector is not None:
+                vectors[i] = vector
+            else:
+                missing.setdefault(text, []).append(i)
+        return vectors, missing
+    
+    def _fill_embeddings(self, vectors: list, missing: Dict, embeddings: List[List[float]]) -> List[List[float]]:
+        for text, vector in zip(missing, embeddings):
+            if self.embedding_cache is not None:
+                self.embedding_cache.set(text, vector)
+            for i in missing[text]:
+                vectors[i] = vector
+        return vectors
+    
+    def _get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Embedding cho nhiều text: text chưa có trong cache được gửi trong 1 request /embed"""
+        vectors, missing = self._cached_embeddings(texts)
+        if missing:
+            self._fill_embeddings(vectors, missing, self.embedding_client.embed(list(missing)))
+        return vectors
+    
+    async def aget_embeddings(self, texts: List[str], client: AsyncEmbeddingClient) -> List[List[float]]:
+        """Như _get_embeddings nhưng gọi /embed qua AsyncEmbeddingClient (không giữ thread khi chờ)"""
+        vectors, missing = self._cached_embeddings(texts)
+        if missing:
+            self._fill_embeddings(vectors, missing, await client.embed(list(missing)))
+        return vectors
+    
+    @staticmethod
+    def _payload_selector(payload_fields: Optional[List[str]]):
+        """None = toàn bộ payload, list = chỉ các field này (PayloadSelectorInclude)"""
+        if payload_fields is None:
+            return True
+        return PayloadSelectorInclude(include=list(payload_fields))
+    
+    @staticmethod
+    def geo_radius_filter(lat: Optional[float], lon: Optional[float],
+                          radius_meters: Optional[float]) -> Optional[Filter]:
+        """Filter theo bán kính quanh (lat, lon) trên payload 'location' (None nếu thiếu tham số)"""
+        if lat is None or lon is None or not radius_meters:
+            return None
+        return Filter(must=[
+            FieldCondition(
+                key="location",
+                geo_radius=GeoRadius(center=GeoPoint(lat=lat, lon=lon), radius=float(radius_meters))
+            )
+        ])
+    
+    @staticmethod
+    def _format_hits(hits) -> List[Dict]:
+        return [
+            {
+                'place_id': hit.id,
+                'score': hit.score,
+                'payload': hit.payload
+            }
+            for hit in hits
+        ]
     
     def search_place_details(
         self,
         query: str,
         top_k: int = 5,
-        score_threshold: float = 0.0
+        score_threshold: float = 0.0,
+        payload_fields: Optional[List[str]] = None,
+        lat: Optional[float] = None,
+        lon: Optional[float] = None,
+        radius_meters: Optional[float] = None
     ) -> List[Dict]:
         """
         Tìm kiếm thông tin chi tiết địa điểm bằng semantic search
@@ -57,6 +150,8 @@ class QdrantPlaceSearch:
             query: Câu truy vấn (VD: "tìm thông tin chi tiết Hồ Tây")
             top_k: Số lượng kết quả trả về
             score_threshold: Ngưỡng điểm tương đồng tối thiểu (0-1)
+            payload_fields: Chỉ lấy các payload field này (None = toàn bộ payload)
+            lat, lon, radius_meters: Chỉ lấy chunk có location trong bán kính này (optional)
             
         Returns:
             List các địa điểm với thông tin chi tiết và score
@@ -68,24 +163,116 @@ class QdrantPlaceSearch:
         search_result = self.client.search(
             collection_name=self.collection_name,
             query_vector=query_vector,
+            query_filter=self.geo_radius_filter(lat, lon, radius_meters),
+            limit=top_k,
+            score_threshold=score_threshold,
+            with_payload=self._payload_selector(payload_fields),
+            with_vectors=False,
+            search_params=self.search_params
+        )
+        
+        return self._format_hits(search_result)
+    
+    def search_place_groups(
+        self,
+        query: str,
+        top_k: int = 5,
+        group_size: int = 1,
+        score_threshold: float = 0.0,
+        payload_fields: Optional[List[str]] = None,
+        group_by: str = "document_id",
+        lat: Optional[float] = None,
+        lon: Optional[float] = None,
+        radius_meters: Optional[float] = None,
+        query_vector: Optional[List[float]] = None
+    ) -> List[Dict]:
+        """
+        Semantic search gom nhóm theo document: mỗi document (địa điểm) chỉ
+        xuất hiện 1 lần, top_k = số document khác nhau (Qdrant search_groups)
+        
+        Args:
+            query: Câu truy vấn
+            top_k: Số document trả về
+            group_size: Số chunk tốt nhất giữ lại cho mỗi document
+            score_threshold: Ngưỡng điểm tương đồng tối thiểu (0-1)
+            payload_fields: Chỉ lấy các payload field này (None = toàn bộ payload)
+            group_by: Payload field dùng để gom nhóm
+            lat, lon, radius_meters: Chỉ lấy chunk có location trong bán kính này (optional)
+            query_vector: Embedding của query đã có sẵn (None = tự gọi embedding service)
+            
+        Returns:
+            List cùng format với search_place_details (chunk tốt nhất của mỗi
+            document), thêm 'document_id' và 'chunks' (group_size chunk tốt nhất)
+        """
+        if query_vector is None:
+            query_vector = self._get_embedding(query)
+        
+        groups_result = self.client.search_groups(
+            collection_name=self.collection_name,
+            query_vector=query_vector,
+            query_filter=self.geo_radius_filter(lat, lon, radius_meters),
+            group_by=group_by,
             limit=top_k,
+            group_size=group_size,
             score_threshold=score_threshold,
-            with_payload=True,
-            with_vectors=False
+            with_payload=self._payload_selector(payload_fields),
+            with_vectors=False,
+            search_params=self.search_params
         )
         
-        # Format results
         results = []
-        for hit in search_result:
-            result = {
-                'place_id': hit.id,
-                'score': hit.score,
-                'payload': hit.payload
-            }
+        for group in groups_result.groups:
+            chunks = self._format_hits(group.hits)
+            if not chunks:
+                continue
+            result = dict(chunks[0])
+            result['document_id'] = group.id
+            result['chunks'] = chunks
             results.append(result)
         
         return results
     
+    def search_many(
+        self,
+        queries: List[str],
+        top_k: int = 5,
+        score_threshold: float = 0.0,
+        payload_fields: Optional[List[str]] = None
+    ) -> List[List[Dict]]:
+        """
+        Tìm kiếm nhiều query cùng lúc: 1 request /embed + 1 lần search_batch
+        
+        Args:
+            queries: Danh sách câu truy vấn (VD: ["Hồ Gươm", "Hồ Tây"])
+            top_k: Số lượng kết quả mỗi query
+            score_threshold: Ngưỡng điểm tương đồng tối thiểu (0-1)
+            payload_fields: Chỉ lấy các payload field này (None = toàn bộ payload)
+            
+        Returns:
+            List kết quả theo thứ tự queries, mỗi phần tử cùng format với search_place_details
+        """
+        if not queries:
+            return []
+        
+        query_vectors = self._get_embeddings(queries)
+        
+        batch_result = self.client.search_batch(
+            collection_name=self.collection_name,
+            requests=[
+                SearchRequest(
+                    vector=vector,
+                    limit=top_k,
+                    score_threshold=score_threshold,
+                    with_payload=self._payload_selector(payload_fields),
+                    with_vector=False,
+                    params=self.search_params
+                )
+                for vector in query_vectors
+            ]
+        )
+        
+        return [self._format_hits(hits) for hits in batch_result]
+    
     
     def print_search_results(self, results: List[Dict], title: str = "KẾT QUẢ TÌM KIẾM"):
         print(f"\n{'='*80}")
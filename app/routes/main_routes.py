@@ -1,9 +1,27 @@
-from flask import request
+from flask import request, jsonify, Response, stream_with_context
 def init_routes(app):
     @app.api_route("/health", methods=["GET"])
     def health_check():
         return "OK", 200
 
+    @app.api_route("/metrics", methods=["GET"])
+    def metrics_route():
+        """Thống kê các cache in-process"""
+        from app.services.main_service import get_cache_metrics
+        return get_cache_metrics()
+
+    @app.api_route("/cache/invalidate", methods=["POST"])
+    def invalidate_cache_route():
+        """
+        Xóa cache kết quả Neo4j (VD: sau khi chạy import_to_neo4j.py)
+        ?rebuild_index=1 + header X-Admin-Token: nạp lại cả grid index
+        """
+        from app.services.main_service import invalidate_caches
+        return invalidate_caches(
+            rebuild_index=request.args.get("rebuild_index", "").lower() in ("1", "true", "yes"),
+            admin_token=request.headers.get("X-Admin-Token")
+        )
+
     @app.api_route("/chat", methods=["POST"])
     def chat_route():
         """
@@ -15,10 +33,42 @@ def init_routes(app):
         }
         """
         data = request.get_json()
-        from app.services.agent_service import chat_handler
+        from app.services.agent_service import chat_with_context
         
         message = data.get("message")
-        return chat_handler(message)
+        return chat_with_context(message, data.get("session_id"), data.get("chat_history"))
+
+    @app.api_route("/chat/stream", methods=["POST"])
+    def chat_stream_route():
+        """
+        🤖 Agent Chat (streaming) - Server-Sent Events: start, intent, results, token..., done
+        Body: giống /chat
+        """
+        data = request.get_json()
+        from app.services.agent_service import chat_stream
+        
+        return Response(
+            stream_with_context(chat_stream(
+                data.get("message"),
+                session_id=data.get("session_id"),
+                chat_history=data.get("chat_history")
+            )),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+
+    @app.api_route("/chat/session/<session_id>", methods=["GET", "DELETE"])
+    def chat_session_route(session_id):
+        """Xem (GET) / xóa (DELETE) state của session chat"""
+        from app.services.session_store import get_session_store
+        
+        store = get_session_store()
+        if store is None:
+            return jsonify({"error": "Session store đang tắt (SESSION_STORE_SIZE=0)"}), 404
+        if request.method == "DELETE":
+            store.delete(session_id)
+            return jsonify({"success": True})
+        return jsonify({"session_id": session_id, **store.get(session_id)})
 
     @app.api_route("/place_info", methods=["POST"])
     def place_info_route():
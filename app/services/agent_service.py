@@ -6,31 +6,129 @@ Supports multilingual (Vietnamese & English)
 
 from flask import jsonify
 from app.models.model import AIService
-from app.database.neo4j.main import Neo4jSpatialQuery
+from app.database.neo4j.main import get_neo4j_query
 from app.database.qdrant.main import QdrantPlaceSearch
+from app.database.qdrant.embedding_cache import get_embedding_cache
+from app.database.qdrant.embedding_client import get_embedding_client
 from app.services.translation_service import get_translation_service
+from app.services.intent_classifier import LocalIntentClassifier, INTENT_EXAMPLES
+from app.services.intent_cache import get_intent_cache
+from app.services.session_store import get_session_store, detect_follow_up, merge_entities, reply_text
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
 import json
 import re
 import os
+import threading
+import time
 
 # Initialize services
-NEO4J_URI = os.getenv("NEO4J_URI", "bolt://localhost:7687")
-NEO4J_AUTH = (
-    os.getenv("NEO4J_USER", "neo4j"),
-    os.getenv("NEO4J_PASSWORD", "12345678")
-)
 QDRANT_HOST = os.getenv("QDRANT_HOST", "localhost")
 QDRANT_PORT = os.getenv("QDRANT_PORT", 6333)
 
-neo4j_query = Neo4jSpatialQuery(uri=NEO4J_URI, auth=NEO4J_AUTH)
+neo4j_query = get_neo4j_query()
 qdrant_search = QdrantPlaceSearch(
     qdrant_url=QDRANT_HOST,
     qdrant_port=QDRANT_PORT,
-    collection_name="map_assistant_v2"
+    collection_name="map_assistant_v2",
+    embedding_cache=get_embedding_cache(),
+    embedding_client=get_embedding_client()
 )
 ai_service = AIService()
 translation_service = get_translation_service()
 
+# Fan-out: các bước độc lập của 1 chat request chạy song song trên pool này
+AGENT_WORKERS = int(os.getenv("AGENT_WORKERS", 8))
+# Chạy trước Qdrant retrieval trên message trong lúc LLM classify intent
+AGENT_SPECULATIVE_SEARCH = os.getenv("AGENT_SPECULATIVE_SEARCH", "false").lower() in ("1", "true", "yes")
+AGENT_SPECULATIVE_TIMEOUT = float(os.getenv("AGENT_SPECULATIVE_TIMEOUT", 10))
+
+# Fast-path classifier local (rule + nearest-centroid) trước LLM classify_intent
+INTENT_LOCAL_CLASSIFIER = os.getenv("INTENT_LOCAL_CLASSIFIER", "true").lower() in ("1", "true", "yes")
+INTENT_LOCAL_CENTROID = os.getenv("INTENT_LOCAL_CENTROID", "true").lower() in ("1", "true", "yes")
+INTENT_LOCAL_THRESHOLD = float(os.getenv("INTENT_LOCAL_THRESHOLD", 0.8))
+
+agent_executor = ThreadPoolExecutor(max_workers=AGENT_WORKERS, thread_name_prefix="agent")
+
+
+class StageTimer:
+    """Thời gian (ms) từng stage của 1 request; stage chạy trên thread khác vẫn ghi được"""
+    
+    def __init__(self):
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+        self.timings = {}
+    
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = round((time.perf_counter() - start) * 1000, 2)
+            with self._lock:
+                self.timings[name] = elapsed
+    
+    def as_dict(self) -> dict:
+        with self._lock:
+            timings = dict(self.timings)
+        timings['total'] = round((time.perf_counter() - self._started) * 1000, 2)
+        return timings
+
+
+class SpeculativeSearch:
+    """
+    Qdrant retrieval chạy trước trên message trong lúc chờ classify_intent.
+    Kết quả gắn với message: dùng làm candidates khi intent cuối cùng là
+    semantic_search (query_description vẫn dùng cho summary), còn lại hủy
+    (nếu chưa chạy) hoặc bỏ kết quả
+    """
+    
+    def __init__(self, query: str, timer: StageTimer):
+        from app.services.main_service import semantic_candidates, semantic_candidates_async, EMBEDDING_ASYNC
+        
+        self.query = query
+        self.status = "pending"
+        
+        if EMBEDDING_ASYNC:
+            from app.database.neo4j import get_background_loop
+            
+            async def _run_async():
+                with timer.stage("speculative_retrieval"):
+                    return await semantic_candidates_async(query, top_k=10)
+            
+            # Chờ /embed trên background loop, không giữ thread của agent_executor;
+            # discard() hủy được cả request đang chạy
+            self.future = get_background_loop().submit(_run_async())
+            return
+        
+        def _run():
+            with timer.stage("speculative_retrieval"):
+                return semantic_candidates(query, top_k=10)
+        
+        self.future = agent_executor.submit(_run)
+    
+    def take(self):
+        """Kết quả retrieval trên message, None nếu không dùng được (và hủy phần việc còn lại)"""
+        try:
+            results = self.future.result(timeout=AGENT_SPECULATIVE_TIMEOUT)
+        except FutureTimeoutError:
+            self.discard()
+            return None
+        except Exception as e:
+            print(f"Speculative search failed: {e}")
+            self.status = "failed"
+            return None
+        self.status = "used"
+        return results
+    
+    def discard(self):
+        if self.status != "pending":
+            return
+        # cancel(): thread pool chỉ hủy được khi chưa bắt đầu (đang chạy thì để xong và bỏ
+        # kết quả); future của background loop hủy được cả task đang chạy
+        self.status = "cancelled" if self.future.cancel() else "discarded"
+
 
 class AgentRouter:
     """
@@ -38,53 +136,48 @@ class AgentRouter:
     """
     
     def __init__(self):
-        self.intent_examples = {
-            "search_places": [
-                "tìm quán cafe gần đây",
-                "tìm nhà hàng trong bán kính 2km",
-                "có quán ăn nào gần không"
-            ],
-            "nearby_landmark": [
-                "tìm khách sạn gần Hồ Gươm",
-                "có gì xung quanh Văn Miếu",
-                "địa điểm ăn uống gần Lăng Bác"
-            ],
-            "semantic_search": [
-                "quán cafe lãng mạn view đẹp",
-                "nhà hàng phù hợp hẹn hò",
-                "địa điểm chụp ảnh đẹp"
-            ],
-            "place_info": [
-                "cho tôi biết về Hồ Gươm",
-                "thông tin Văn Miếu",
-                "Lăng Bác có gì đặc biệt"
-            ],
-            "compare_places": [
-                "so sánh Hồ Gươm và Hồ Tây",
-                "nên đi Văn Miếu hay Hoàng Thành",
-                "khác nhau giữa 3 museum này"
-            ],
-            "plan_itinerary": [
-                "lập lịch trình 1 ngày Old Quarter",
-                "tạo kế hoạch tham quan 8 giờ",
-                "gợi ý lịch đi chơi cho gia đình"
-            ],
-            "recommend_places": [
-                "gợi ý địa điểm cho gia đình",
-                "địa điểm phù hợp ngân sách sinh viên",
-                "nơi nào tốt cho người cao tuổi"
-            ]
-        }
+        self.intent_examples = INTENT_EXAMPLES
+        self.intent_cache = get_intent_cache()
+        
+        self.local_classifier = None
+        if INTENT_LOCAL_CLASSIFIER:
+            self.local_classifier = LocalIntentClassifier(
+                self.intent_examples,
+                embed_fn=qdrant_search._get_embeddings if INTENT_LOCAL_CENTROID else None,
+                threshold=INTENT_LOCAL_THRESHOLD
+            )
     
     def classify_intent(self, message: str) -> dict:
         """
-        Phân loại intent của user message
+        Phân loại intent của user message: local classifier trước, chỉ gọi LLM
+        khi local chưa đủ tự tin
         Returns: {
             "intent": "search_places",
             "confidence": 0.95,
-            "entities": {...}
+            "entities": {...},
+            "source": "cache" | "rule" | "centroid" | "llm" | "fallback"
         }
         """
+        # Kết quả LLM đã cache (chip gợi ý, request retry) - trước cả local để bỏ qua embedding
+        if self.intent_cache is not None:
+            cached = self.intent_cache.get(message)
+            if cached is not None:
+                cached["source"] = "cache"
+                return cached
+        
+        if self.local_classifier is not None:
+            local_result = self.local_classifier.classify(message)
+            if local_result is not None:
+                return local_result
+        
+        result = self.classify_intent_llm(message)
+        # Chỉ cache kết quả LLM parse được, không cache fallback khi LLM lỗi
+        if self.intent_cache is not None and result.get("source") == "llm":
+            self.intent_cache.set(message, result)
+        return result
+    
+    def classify_intent_llm(self, message: str) -> dict:
+        """Phân loại intent bằng LLM (prompt đầy đủ)"""
         # Tạo prompt cho LLM để classify intent
         intent_prompt = f"""
 Bạn là một AI agent phân tích ý định người dùng cho hệ thống Map Assistant.
@@ -140,6 +233,7 @@ Chỉ điền các entities có trong message. Entities không có thì bỏ qua
             result_text = re.sub(r'```\s*', '', result_text)
             
             result = json.loads(result_text)
+            result["source"] = "llm"
             return result
             
         except Exception as e:
@@ -150,16 +244,24 @@ Chỉ điền các entities có trong message. Entities không có thì bỏ qua
                 "confidence": 0.5,
                 "entities": {
                     "query_description": message
-                }
+                },
+                "source": "fallback"
             }
     
-    def route_to_service(self, intent_result: dict, original_message: str) -> dict:
+    def route_to_service(self, intent_result: dict, original_message: str,
+                         speculative: SpeculativeSearch = None) -> dict:
         """
         Route đến service phù hợp dựa trên intent
+        
+        Args:
+            speculative: Retrieval đã chạy trước (chỉ semantic_search dùng tới)
         """
         intent = intent_result.get("intent")
         entities = intent_result.get("entities", {})
         
+        if speculative is not None and intent not in ("semantic_search", None) and intent in self.intent_examples:
+            speculative.discard()
+        
         try:
             if intent == "search_places":
                 return self._handle_search_places(entities, original_message)
@@ -168,7 +270,7 @@ Chỉ điền các entities có trong message. Entities không có thì bỏ qua
                 return self._handle_nearby_landmark(entities, original_message)
             
             elif intent == "semantic_search":
-                return self._handle_semantic_search(entities, original_message)
+                return self._handle_semantic_search(entities, original_message, speculative)
             
             elif intent == "place_info":
                 return self._handle_place_info(entities, original_message)
@@ -184,7 +286,7 @@ Chỉ điền các entities có trong message. Entities không có thì bỏ qua
             
             else:
                 # Default: semantic search
-                return self._handle_semantic_search(entities, original_message)
+                return self._handle_semantic_search(entities, original_message, speculative)
                 
         except Exception as e:
             return {
@@ -219,12 +321,14 @@ Chỉ điền các entities có trong message. Entities không có thì bỏ qua
         
         return nearby_landmark(landmark_name, categories, radius, 20)
     
-    def _handle_semantic_search(self, entities: dict, original_message: str) -> dict:
+    def _handle_semantic_search(self, entities: dict, original_message: str,
+                                speculative: SpeculativeSearch = None) -> dict:
         """Xử lý semantic_search intent"""
         from app.services.main_service import semantic_search
         
         query = entities.get("query_description", original_message)
-        return semantic_search(query, top_k=10)
+        vector_results = speculative.take() if speculative is not None else None
+        return semantic_search(query, top_k=10, vector_results=vector_results)
     
     def _handle_place_info(self, entities: dict, original_message: str) -> dict:
         """Xử lý place_info intent"""
@@ -310,25 +414,35 @@ def chat_handler(message: str, context: dict = None, language: str = None) -> di
     
     Args:
         message: Message từ user
-        context: Context của conversation (optional)
+        context: Session state (session_store) - bổ sung entity lượt này thiếu
         language: Preferred language ('vi' or 'en', auto-detect if None)
     
     Returns:
         Response với kết quả và metadata
     """
+    response, _ = _chat(message, context, language)
+    return jsonify(response)
+
+
+def _chat(message: str, context: dict = None, language: str = None):
+    """Pipeline của chat_handler, trả về (response dict, intent_result) để lưu session"""
     if not message or not message.strip():
         error_msg = "Xin lỗi, tôi không nhận được câu hỏi của bạn."
         if language == 'en':
             error_msg = "Sorry, I didn't receive your question."
         
-        return jsonify({
+        return {
             "success": False,
             "message": error_msg
-        })
+        }, {}
+    
+    timer = StageTimer()
+    speculative = None
     
     # Auto-detect language if not specified
     if language is None:
-        language = translation_service.detect_language(message)
+        with timer.stage("detect_language"):
+            language = translation_service.detect_language(message)
     
     try:
         # Store original message and language
@@ -337,13 +451,24 @@ def chat_handler(message: str, context: dict = None, language: str = None) -> di
         
         # Translate to Vietnamese if English (for intent classification)
         if language == 'en':
-            message = translation_service.translate(message, 'vi')
+            with timer.stage("translate"):
+                message = translation_service.translate(message, 'vi')
+        
+        # Retrieval trên message chạy song song với classify_intent (LLM)
+        if AGENT_SPECULATIVE_SEARCH:
+            speculative = SpeculativeSearch(message, timer)
         
         # Step 1: Classify intent
-        intent_result = agent_router.classify_intent(message)
+        with timer.stage("classify_intent"):
+            intent_result = agent_router.classify_intent(message)
+        if context:
+            intent_result = merge_entities(context, intent_result)
         
         # Step 2: Route to appropriate service
-        service_result = agent_router.route_to_service(intent_result, message)
+        with timer.stage("route"):
+            service_result = agent_router.route_to_service(intent_result, message, speculative)
+        if speculative is not None:
+            speculative.discard()
         
         # Step 3: Combine với metadata
         response = {
@@ -352,35 +477,245 @@ def chat_handler(message: str, context: dict = None, language: str = None) -> di
             "detected_language": original_language,
             "intent": intent_result.get("intent"),
             "confidence": intent_result.get("confidence"),
-            "result": service_result.json if hasattr(service_result, 'json') else service_result
+            "result": service_result.json if hasattr(service_result, 'json') else service_result,
+            "metadata": {
+                "intent_source": intent_result.get("source"),
+                "timings_ms": timer.as_dict(),
+                "speculative_search": speculative.status if speculative is not None else "off"
+            }
         }
         
-        return jsonify(response)
+        return response, intent_result
         
     except Exception as e:
+        if speculative is not None:
+            speculative.discard()
+        
         error_msg = "Xin lỗi, tôi gặp lỗi khi xử lý yêu cầu của bạn. Bạn có thể diễn đạt lại được không?"
         if language == 'en':
             error_msg = "Sorry, I encountered an error. Could you rephrase your request?"
         
-        return jsonify({
+        return {
             "success": False,
             "error": str(e),
-            "message": error_msg
+            "message": error_msg,
+            "metadata": {"timings_ms": timer.as_dict()}
+        }, {}
+
+
+def _sse(event: str, data: dict) -> str:
+    """1 event Server-Sent Events"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def chat_stream(message: str, language: str = None, session_id: str = None, chat_history: list = None):
+    """
+    Chat handler dạng stream (SSE): gửi từng phần ngay khi có; có session_id
+    thì dùng/lưu session như chat_with_context
+    
+    Events:
+        start   - ngay khi nhận request (time-to-first-byte)
+        intent  - intent + entities sau classify_intent
+        results - kết quả service (Neo4j/Qdrant); field chứa câu trả lời LLM
+                  để trống, tên field nằm trong summary_field
+        token   - từng đoạn text LLM
+        done    - câu trả lời đầy đủ + timings_ms
+        error   - lỗi (kết thúc stream)
+    """
+    from app.services.main_service import defer_ai_summary, stream_summary, SUMMARY_PLACEHOLDER
+    
+    timer = StageTimer()
+    speculative = None
+    yield _sse("start", {"message": message})
+    
+    if not message or not message.strip():
+        error_msg = "Sorry, I didn't receive your question." if language == 'en' else "Xin lỗi, tôi không nhận được câu hỏi của bạn."
+        yield _sse("error", {"message": error_msg})
+        return
+    
+    try:
+        # Lỗi session store (SQLite) / detect_language cũng kết thúc bằng event error
+        store = get_session_store() if session_id else None
+        state = None
+        if store is not None:
+            state = store.get(session_id)
+            store.seed_history(state, chat_history)
+            answered = _follow_up_response(store, state, message, language)
+            if answered is not None:
+                response, intent_result = answered
+                store.record_turn(state, message, intent_result, response["result"], response["result"]["summary"])
+                store.save(session_id, state)
+                session = {"session_id": session_id, "turns": state["turns"], "follow_up": response["result"]["follow_up"]}
+                yield _sse("intent", {
+                    "message": message,
+                    "detected_language": response["detected_language"],
+                    "intent": intent_result["intent"],
+                    "confidence": intent_result["confidence"],
+                    "entities": intent_result["entities"],
+                    "intent_source": "session"
+                })
+                yield _sse("results", {"result": response["result"], "summary_field": None,
+                                       "timings_ms": response["metadata"]["timings_ms"]})
+                yield _sse("done", {"summary": "", "summary_field": None,
+                                    "metadata": {**response["metadata"], "session": session}})
+                return
+        
+        if language is None:
+            with timer.stage("detect_language"):
+                language = translation_service.detect_language(message)
+        
+        original_message = message
+        if language == 'en':
+            with timer.stage("translate"):
+                message = translation_service.translate(message, 'vi')
+        
+        if AGENT_SPECULATIVE_SEARCH:
+            speculative = SpeculativeSearch(message, timer)
+        
+        with timer.stage("classify_intent"):
+            intent_result = agent_router.classify_intent(message)
+        if state is not None:
+            intent_result = merge_entities(state, intent_result)
+        yield _sse("intent", {
+            "message": original_message,
+            "detected_language": language,
+            "intent": intent_result.get("intent"),
+            "confidence": intent_result.get("confidence"),
+            "entities": intent_result.get("entities", {}),
+            "intent_source": intent_result.get("source")
+        })
+        
+        # Service trả kết quả ngay, lời gọi LLM tóm tắt được hoãn lại để stream
+        with timer.stage("route"), defer_ai_summary() as deferred:
+            service_result = agent_router.route_to_service(intent_result, message, speculative)
+        if speculative is not None:
+            speculative.discard()
+        
+        result = service_result.json if hasattr(service_result, 'json') else service_result
+        summary_field = None
+        if isinstance(result, dict):
+            summary_field = next((k for k, v in result.items() if v == SUMMARY_PLACEHOLDER), None)
+            if summary_field:
+                result[summary_field] = ""
+        yield _sse("results", {
+            "result": result,
+            "summary_field": summary_field,
+            "timings_ms": timer.as_dict()
         })
+        
+        summary = ""
+        if deferred:
+            user_message, data_extend = deferred[0]
+            with timer.stage("summary"):
+                for piece in stream_summary(user_message, data_extend):
+                    summary += piece
+                    yield _sse("token", {"text": piece})
+        
+        metadata = {
+            "intent_source": intent_result.get("source"),
+            "timings_ms": timer.as_dict(),
+            "speculative_search": speculative.status if speculative is not None else "off"
+        }
+        if state is not None:
+            if summary_field:
+                result[summary_field] = summary
+            store.record_turn(state, original_message, intent_result, result, summary or reply_text(result))
+            store.save(session_id, state)
+            metadata["session"] = {"session_id": session_id, "turns": state["turns"], "follow_up": None}
+        
+        yield _sse("done", {
+            "summary": summary,
+            "summary_field": summary_field,
+            "metadata": metadata
+        })
+    
+    except Exception as e:
+        if speculative is not None:
+            speculative.discard()
+        error_msg = "Sorry, I encountered an error. Could you rephrase your request?" if language == 'en' else \
+            "Xin lỗi, tôi gặp lỗi khi xử lý yêu cầu của bạn. Bạn có thể diễn đạt lại được không?"
+        yield _sse("error", {
+            "error": str(e),
+            "message": error_msg,
+            "metadata": {"timings_ms": timer.as_dict()}
+        })
+
+
+def _follow_up_response(store, state: dict, message: str, language: str = None):
+    """
+    Trả lời câu hỏi nối tiếp từ địa điểm đã có trong session (không classify/retrieval)
+    Returns: (response, intent_result) hoặc None nếu không phải/không trả lời được
+    """
+    refinement = detect_follow_up(message)
+    if refinement is None:
+        return None
+    
+    timer = StageTimer()
+    if language is None:
+        with timer.stage("detect_language"):
+            language = translation_service.detect_language(message)
+    with timer.stage("follow_up"):
+        result = store.answer_follow_up(state, refinement, language)
+    if result is None:
+        return None
+    
+    intent_result = {
+        "intent": state.get("last_intent"),
+        "confidence": 1.0,
+        "entities": state.get("entities", {}),
+        "source": "session"
+    }
+    response = {
+        "success": True,
+        "message": message,
+        "detected_language": language,
+        "intent": intent_result["intent"],
+        "confidence": intent_result["confidence"],
+        "result": result,
+        "metadata": {
+            "intent_source": "session",
+            "timings_ms": timer.as_dict(),
+            "speculative_search": "off"
+        }
+    }
+    return response, intent_result
 
 
-def chat_with_context(message: str, session_id: str = None, chat_history: list = None) -> dict:
+def chat_with_context(message: str, session_id: str = None, chat_history: list = None,
+                      language: str = None) -> dict:
     """
     Chat với context và history
     
     Args:
         message: Message hiện tại
         session_id: ID của session (để lưu context)
-        chat_history: Lịch sử chat trước đó
+        chat_history: Lịch sử chat trước đó, chỉ dùng khi server chưa có session này
+        language: Preferred language ('vi' or 'en', auto-detect if None)
     
     Returns:
-        Response với context
+        Response với context (metadata.session)
     """
-    # Có thể extend để lưu context vào Redis/PostgreSQL
-    # Giờ chỉ process message đơn giản
-    return chat_handler(message)
+    store = get_session_store()
+    if store is None or not session_id:
+        return chat_handler(message, language=language)
+    
+    state = store.get(session_id)
+    store.seed_history(state, chat_history)
+    
+    answered = _follow_up_response(store, state, message, language) if message else None
+    if answered is not None:
+        response, intent_result = answered
+    else:
+        response, intent_result = _chat(message, state, language)
+    
+    if response.get("success"):
+        result = response.get("result")
+        store.record_turn(state, message, intent_result, result, reply_text(result))
+        store.save(session_id, state)
+    
+    response.setdefault("metadata", {})["session"] = {
+        "session_id": session_id,
+        "turns": state["turns"],
+        "follow_up": response["result"].get("follow_up") if isinstance(response.get("result"), dict) else None
+    }
+    return jsonify(response)
@@ -0,0 +1,163 @@
+"""
+Cache kết quả LLM classify_intent (intent + entities đã parse)
+
+Key = model LLM + message đã chuẩn hóa (NFC, lowercase, gộp khoảng trắng,
+bỏ dấu câu cuối, thống nhất vị trí dấu thanh "hòa"/"hoà"). Tầng 1 là LRU
+in-memory có TTL, tầng 2 (optional) là SQLite dùng chung giữa các worker.
+Thống kê số LLM call tiết kiệm được trong 1 giờ gần nhất cho /metrics.
+"""
+
+from collections import deque
+from typing import Dict, Optional
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+
+from app.utils import TTLCache, MISSING, SQLiteStore
+
+# Dấu thanh đặt kiểu cũ (trên nguyên âm đầu) -> kiểu mới: "hòa" -> "hoà", "thúy" -> "thuý"
+_TONE_PLACEMENT = {
+    old: new
+    for pair, tones in (("oa", "àáảãạ"), ("oe", "èéẻẽẹ"), ("uy", "ỳýỷỹỵ"))
+    for old, new in zip(
+        (unicodedata.normalize('NFC', pair[0] + unicodedata.normalize('NFD', t)[1:]) + pair[1] for t in tones),
+        (pair[0] + t for t in tones)
+    )
+}
+_TONE_PATTERN = re.compile("|".join(map(re.escape, _TONE_PLACEMENT)))
+_TRAILING_PUNCT = re.compile(r"[\s?!.,;:…]+$")
+
+
+def normalize_message(message: str) -> str:
+    """'  Tìm quán   cafe gần đây?? ' -> 'tìm quán cafe gần đây'"""
+    if not message:
+        return ""
+    text = unicodedata.normalize('NFC', message).lower()
+    text = _TONE_PATTERN.sub(lambda m: _TONE_PLACEMENT[m.group(0)], text)
+    text = ' '.join(text.split())
+    return _TRAILING_PUNCT.sub("", text)
+
+
+class IntentCache:
+    """LRU + TTL in-memory, SQLite optional, cho kết quả classify_intent của LLM"""
+
+    def __init__(
+        self,
+        maxsize: int = 2048,
+        ttl_seconds: Optional[float] = 86400,
+        sqlite_path: Optional[str] = None,
+        namespace: str = ""
+    ):
+        """
+        Args:
+            maxsize: Số message tối đa giữ trong memory (LRU eviction)
+            ttl_seconds: Thời gian sống của mỗi kết quả (None = không hết hạn)
+            sqlite_path: File SQLite dùng chung giữa các process (None = chỉ memory)
+            namespace: Tên model LLM, nằm trong key để đổi model không dùng nhầm kết quả cũ
+        """
+        self.ttl_seconds = ttl_seconds
+        self.namespace = namespace
+        self.memory = TTLCache(maxsize=maxsize, ttl_seconds=ttl_seconds)
+        self.store = SQLiteStore(sqlite_path, table="intents") if sqlite_path else None
+        self.disk_hits = 0
+        self.llm_calls = 0
+        self._started = time.monotonic()
+        self._hit_times = deque()
+        self._lock = threading.Lock()
+
+    def _key(self, message: str) -> str:
+        raw = f"{self.namespace}\x00{normalize_message(message)}"
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def _record_hit(self):
+        now = time.monotonic()
+        with self._lock:
+            self._hit_times.append(now)
+            while self._hit_times and self._hit_times[0] < now - 3600:
+                self._hit_times.popleft()
+
+    def get(self, message: str) -> Optional[Dict]:
+        """Kết quả đã cache (dict mới mỗi lần gọi), None nếu chưa có/hết hạn"""
+        key = self._key(message)
+        raw = self.memory.get(key, MISSING)
+        if raw is MISSING and self.store is not None:
+            raw = self.store.get(key)
+            if raw is not MISSING:
+                self.memory.set(key, raw)
+                self.disk_hits += 1
+        if raw is MISSING:
+            return None
+
+        self._record_hit()
+        return json.loads(raw)
+
+    def set(self, message: str, result: Dict):
+        """Lưu kết quả LLM của message (đếm luôn 1 LLM call)"""
+        key = self._key(message)
+        raw = json.dumps(result, ensure_ascii=False).encode('utf-8')
+        self.memory.set(key, raw)
+        if self.store is not None:
+            self.store.set(key, raw, ttl_seconds=self.ttl_seconds)
+        with self._lock:
+            self.llm_calls += 1
+
+    def clear(self):
+        self.memory.clear()
+        if self.store is not None:
+            self.store.clear()
+
+    def stats(self) -> Dict:
+        """Hit rate, số LLM call đã gọi / tiết kiệm (tổng và 1 giờ gần nhất)"""
+        memory = self.memory.stats()
+        hits = memory['hits'] + self.disk_hits
+        total = memory['hits'] + memory['misses']
+        now = time.monotonic()
+        with self._lock:
+            saved_last_hour = sum(1 for t in self._hit_times if t >= now - 3600)
+            llm_calls = self.llm_calls
+        # Trung bình từ lúc khởi động; giờ đầu tiên tính như 1 giờ để không phóng đại
+        uptime_hours = max(1.0, (now - self._started) / 3600)
+        return {
+            'hits': hits,
+            'misses': total - hits,
+            'hit_rate': round(hits / total, 4) if total else 0.0,
+            'llm_calls': llm_calls,
+            'llm_calls_saved': hits,
+            'llm_calls_saved_last_hour': saved_last_hour,
+            'llm_calls_saved_per_hour': round(hits / uptime_hours, 2),
+            'memory': memory,
+            'disk': {
+                'path': self.store.path,
+                'size': len(self.store),
+                'hits': self.disk_hits
+            } if self.store is not None else None
+        }
+
+
+# Singleton - dùng chung cho mọi request của agent
+_intent_cache = None
+
+
+def get_intent_cache() -> Optional[IntentCache]:
+    """
+    Get singleton IntentCache cấu hình từ env:
+    INTENT_CACHE_SIZE (0 = tắt), INTENT_CACHE_TTL (giây), INTENT_CACHE_PATH
+    (trống = chỉ memory), MODEL (namespace)
+    """
+    global _intent_cache
+    if _intent_cache is None:
+        maxsize = int(os.getenv("INTENT_CACHE_SIZE", 2048))
+        if maxsize <= 0:
+            return None
+        ttl = float(os.getenv("INTENT_CACHE_TTL", 86400))
+        _intent_cache = IntentCache(
+            maxsize=maxsize,
+            ttl_seconds=ttl if ttl > 0 else None,
+            sqlite_path=os.getenv("INTENT_CACHE_PATH") or None,
+            namespace=os.getenv("MODEL", "")
+        )
+    return _intent_cache
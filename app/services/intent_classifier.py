@@ -0,0 +1,332 @@
+"""
+Local fast-path intent classifier đứng trước LLM classify_intent
+
+1. Rule keyword/regex + entity extractor (category, landmark, bán kính, số giờ)
+   cho các message rõ ràng: "tìm quán cafe gần đây", "so sánh Hồ Gươm và Hồ Tây"
+2. Nearest-centroid trên embedding của AgentRouter.intent_examples (qua
+   embedding service + cache), confidence = softmax của cosine với từng centroid
+Chỉ trả kết quả khi confidence >= threshold và đủ entity cho handler của
+intent đó; còn lại trả None để AgentRouter gọi LLM.
+"""
+
+from typing import Callable, Dict, List, Optional
+import math
+import re
+import threading
+import unicodedata
+
+from app.utils import normalize_name
+
+# Câu ví dụ cho từng intent (AgentRouter.intent_examples, centroid của classifier)
+INTENT_EXAMPLES = {
+    "search_places": [
+        "tìm quán cafe gần đây",
+        "tìm nhà hàng trong bán kính 2km",
+        "có quán ăn nào gần không"
+    ],
+    "nearby_landmark": [
+        "tìm khách sạn gần Hồ Gươm",
+        "có gì xung quanh Văn Miếu",
+        "địa điểm ăn uống gần Lăng Bác"
+    ],
+    "semantic_search": [
+        "quán cafe lãng mạn view đẹp",
+        "nhà hàng phù hợp hẹn hò",
+        "địa điểm chụp ảnh đẹp"
+    ],
+    "place_info": [
+        "cho tôi biết về Hồ Gươm",
+        "thông tin Văn Miếu",
+        "Lăng Bác có gì đặc biệt"
+    ],
+    "compare_places": [
+        "so sánh Hồ Gươm và Hồ Tây",
+        "nên đi Văn Miếu hay Hoàng Thành",
+        "khác nhau giữa 3 museum này"
+    ],
+    "plan_itinerary": [
+        "lập lịch trình 1 ngày Old Quarter",
+        "tạo kế hoạch tham quan 8 giờ",
+        "gợi ý lịch đi chơi cho gia đình"
+    ],
+    "recommend_places": [
+        "gợi ý địa điểm cho gia đình",
+        "địa điểm phù hợp ngân sách sinh viên",
+        "nơi nào tốt cho người cao tuổi"
+    ]
+}
+
+# Category (như trong Neo4j) -> keyword (lowercase, giữ dấu)
+CATEGORY_KEYWORDS = {
+    "cafe": ["cafe", "cà phê", "café", "coffee", "quán nước", "trà sữa"],
+    "restaurant": ["nhà hàng", "quán ăn", "restaurant", "ăn uống", "ăn tối", "ăn trưa"],
+    "fast_food": ["đồ ăn nhanh", "fast food", "gà rán"],
+    "bar": ["quán bar", "bar", "pub"],
+    "hotel": ["khách sạn", "hotel", "resort"],
+    "hostel": ["hostel", "nhà nghỉ", "homestay"],
+    "atm": ["atm", "cây rút tiền", "rút tiền"],
+    "bank": ["ngân hàng", "bank"],
+    "hospital": ["bệnh viện", "hospital"],
+    "clinic": ["phòng khám", "clinic"],
+    "pharmacy": ["nhà thuốc", "hiệu thuốc", "pharmacy"],
+    "park": ["công viên", "park"],
+    "museum": ["bảo tàng", "museum"],
+    "place_of_worship": ["chùa", "đền", "nhà thờ", "pagoda", "temple", "church"],
+    "marketplace": ["khu chợ", "market", "chợ đêm"],
+    "cinema": ["rạp chiếu phim", "rạp phim", "cinema"],
+    "fuel": ["cây xăng", "trạm xăng", "gas station"],
+    "parking": ["bãi đỗ xe", "bãi gửi xe", "parking"],
+}
+
+# Landmark hay gặp (tên chuẩn); so khớp không phân biệt dấu
+LANDMARKS = [
+    "Hồ Gươm", "Hồ Hoàn Kiếm", "Hồ Tây", "Văn Miếu", "Lăng Bác", "Hoàng Thành",
+    "Chùa Một Cột", "Đền Ngọc Sơn", "Nhà hát Lớn", "Nhà thờ Lớn", "Chợ Đồng Xuân",
+    "Cầu Long Biên", "Chùa Trấn Quốc", "Phố cổ", "Old Quarter", "Hoan Kiem Lake",
+    "West Lake", "Temple of Literature", "Bảo tàng Dân tộc học", "Hồ Trúc Bạch",
+    "Phố đi bộ", "Quảng trường Ba Đình", "Cột cờ Hà Nội", "Nhà tù Hỏa Lò",
+]
+
+COMPANION_KEYWORDS = {
+    "family": ["gia đình", "family", "trẻ em", "con nhỏ", "kids"],
+    "couple": ["người yêu", "hẹn hò", "cặp đôi", "couple", "date"],
+    "friends": ["bạn bè", "nhóm bạn", "friends"],
+    "elderly": ["người cao tuổi", "người già", "ông bà", "elderly"],
+    "solo": ["một mình", "solo"],
+}
+
+# Mức budget 1-4 của recommend_places
+BUDGET_KEYWORDS = {
+    1: ["sinh viên", "giá rẻ", "tiết kiệm", "bình dân", "cheap", "budget"],
+    4: ["cao cấp", "sang trọng", "luxury"],
+}
+
+_NEARBY = re.compile(r"gần đây|quanh đây|gần tôi|gần nhất|gần không|xung quanh đây|near me|nearby|closest")
+_NEAR = re.compile(r"\bgần\b|xung quanh|\bquanh\b|\bcạnh\b|sát\b|\bnear\b|\baround\b")
+_RADIUS = re.compile(r"(\d+(?:[.,]\d+)?)\s*(km|m|mét|met)\b")
+_COMPARE = re.compile(r"so sánh|khác nhau|khác gì|\bhay là\b|nên đi .+ hay|\bvs\.?\b|\bversus\b|\bcompare\b")
+_ITINERARY = re.compile(r"lịch trình|kế hoạch|lộ trình|lịch đi chơi|itinerary|\bplan\b")
+_DURATION = re.compile(r"(\d+)\s*(giờ|tiếng|h|hours?)\b|(\d+|một|nửa)\s*(ngày|day)")
+_INFO = re.compile(r"thông tin|cho tôi biết|giới thiệu|có gì đặc biệt|lịch sử|là gì|ở đâu|tell me|about|history")
+_RECOMMEND = re.compile(r"gợi ý|đề xuất|nên đi đâu|phù hợp|recommend|suggest")
+
+
+def _lower(text: str) -> str:
+    return ' '.join(unicodedata.normalize('NFC', text).lower().split())
+
+
+def _contains(text: str, keyword: str) -> bool:
+    return re.search(rf"(?<!\w){re.escape(keyword)}(?!\w)", text) is not None
+
+
+class LocalIntentClassifier:
+    """Rule + nearest-centroid classifier, dùng trước LLM"""
+
+    RULE_CONFIDENCE = 0.95
+
+    def __init__(
+        self,
+        intent_examples: Dict[str, List[str]],
+        embed_fn: Optional[Callable[[List[str]], List[List[float]]]] = None,
+        threshold: float = 0.8,
+        temperature: float = 0.05
+    ):
+        """
+        Args:
+            intent_examples: intent -> câu ví dụ (AgentRouter.intent_examples)
+            embed_fn: texts -> vectors (None = chỉ dùng rule)
+            threshold: Confidence tối thiểu để trả kết quả local
+            temperature: Nhiệt độ softmax trên cosine với centroid
+        """
+        self.intent_examples = intent_examples
+        self.embed_fn = embed_fn
+        self.threshold = threshold
+        self.temperature = temperature
+        self._centroids = None
+        self._lock = threading.Lock()
+        self._landmarks = sorted(
+            ((normalize_name(name), name) for name in LANDMARKS),
+            key=lambda item: -len(item[0])
+        )
+
+    # ==================== ENTITIES ====================
+
+    def extract_categories(self, text: str) -> List[str]:
+        return [category for category, keywords in CATEGORY_KEYWORDS.items()
+                if any(_contains(text, keyword) for keyword in keywords)]
+
+    def extract_landmarks(self, message: str) -> List[str]:
+        """Landmark theo thứ tự xuất hiện; tên dài khớp trước (Hồ Hoàn Kiếm > Hồ)"""
+        normalized = f" {normalize_name(message)} "
+        found = []
+        for key, name in self._landmarks:
+            pos = normalized.find(f" {key} ")
+            if pos >= 0:
+                found.append((pos, name))
+                normalized = normalized.replace(f" {key} ", " " + "_" * len(key) + " ")
+        return [name for _, name in sorted(found)]
+
+    @staticmethod
+    def extract_radius(text: str) -> Optional[int]:
+        match = _RADIUS.search(text)
+        if not match:
+            return None
+        value = float(match.group(1).replace(",", "."))
+        return int(value * 1000) if match.group(2) == "km" else int(value)
+
+    @staticmethod
+    def extract_duration(text: str) -> Optional[float]:
+        match = _DURATION.search(text)
+        if not match:
+            return None
+        if match.group(1):
+            return float(match.group(1))
+        days = {"một": 1, "nửa": 0.5}.get(match.group(3))
+        days = days if days is not None else float(match.group(3))
+        # 1 ngày tham quan ~ 8 giờ
+        return days * 8
+
+    @staticmethod
+    def extract_preferences(text: str) -> Dict:
+        """companions + budget (1-4) nếu message có nhắc tới"""
+        preferences = {}
+        for companions, keywords in COMPANION_KEYWORDS.items():
+            if any(_contains(text, keyword) for keyword in keywords):
+                preferences["companions"] = companions
+                break
+        for budget, keywords in BUDGET_KEYWORDS.items():
+            if any(_contains(text, keyword) for keyword in keywords):
+                preferences["budget"] = budget
+                break
+        return preferences
+
+    def extract_entities(self, message: str) -> Dict:
+        text = _lower(message)
+        entities = {}
+        categories = self.extract_categories(text)
+        if categories:
+            entities["categories"] = categories
+        landmarks = self.extract_landmarks(message)
+        if landmarks:
+            entities["landmark_name"] = landmarks[0]
+            entities["place_names"] = landmarks
+        radius = self.extract_radius(text)
+        if radius:
+            entities["radius_meters"] = radius
+        duration = self.extract_duration(text)
+        if duration:
+            entities["duration_hours"] = duration
+        preferences = self.extract_preferences(text)
+        if preferences:
+            entities["preferences"] = preferences
+        return entities
+
+    # ==================== CLASSIFY ====================
+
+    def _rule_intent(self, text: str, entities: Dict) -> Optional[str]:
+        landmarks = entities.get("place_names", [])
+        if _COMPARE.search(text) and len(landmarks) >= 2:
+            return "compare_places"
+        if _ITINERARY.search(text):
+            return "plan_itinerary"
+        if landmarks and _NEAR.search(text) and not _NEARBY.search(text):
+            return "nearby_landmark"
+        if entities.get("categories") and (_NEARBY.search(text) or "radius_meters" in entities):
+            return "search_places"
+        if len(landmarks) == 1 and _INFO.search(text):
+            return "place_info"
+        if _RECOMMEND.search(text) and entities.get("preferences"):
+            return "recommend_places"
+        return None
+
+    def _ensure_centroids(self):
+        with self._lock:
+            if self._centroids is not None:
+                return self._centroids
+            intents = list(self.intent_examples)
+            texts = [text for intent in intents for text in self.intent_examples[intent]]
+            vectors = iter(self.embed_fn(texts))
+            centroids = {}
+            for intent in intents:
+                members = [next(vectors) for _ in self.intent_examples[intent]]
+                centroid = [sum(values) / len(members) for values in zip(*members)]
+                centroids[intent] = _unit(centroid)
+            self._centroids = centroids
+            return centroids
+
+    def _centroid_intent(self, message: str) -> Optional[tuple]:
+        """(intent, confidence) theo nearest-centroid"""
+        centroids = self._ensure_centroids()
+        vector = _unit(self.embed_fn([message])[0])
+        scores = {intent: sum(a * b for a, b in zip(vector, centroid))
+                  for intent, centroid in centroids.items()}
+        best = max(scores.values())
+        weights = {intent: math.exp((score - best) / self.temperature) for intent, score in scores.items()}
+        intent = max(weights, key=weights.get)
+        return intent, weights[intent] / sum(weights.values())
+
+    @staticmethod
+    def _has_required_entities(intent: str, entities: Dict) -> bool:
+        if intent == "search_places":
+            return bool(entities.get("categories"))
+        if intent == "nearby_landmark":
+            return bool(entities.get("landmark_name"))
+        if intent == "place_info":
+            return bool(entities.get("landmark_name"))
+        if intent == "compare_places":
+            return len(entities.get("place_names", [])) >= 2
+        return True
+
+    def classify(self, message: str) -> Optional[Dict]:
+        """
+        Phân loại intent không cần LLM
+
+        Returns:
+            {'intent', 'confidence', 'entities', 'source'} giống classify_intent,
+            hoặc None nếu chưa đủ tự tin (gọi LLM)
+        """
+        text = _lower(message)
+        entities = self.extract_entities(message)
+
+        intent, confidence, source = self._rule_intent(text, entities), self.RULE_CONFIDENCE, "rule"
+        if intent is None:
+            if self.embed_fn is None:
+                return None
+            try:
+                intent, confidence = self._centroid_intent(message)
+            except Exception as e:
+                # Embedding service lỗi -> để LLM xử lý
+                print(f"Local intent classifier unavailable: {e}")
+                return None
+            source = "centroid"
+
+        if confidence < self.threshold or not self._has_required_entities(intent, entities):
+            return None
+
+        if intent == "place_info":
+            entities["place_name"] = entities["landmark_name"]
+        elif intent == "semantic_search":
+            entities["query_description"] = message
+        elif intent == "plan_itinerary":
+            entities["location"] = entities.get("landmark_name", "Hà Nội")
+
+        preferences = entities.get("preferences", {})
+        if intent in ("plan_itinerary", "recommend_places") and entities.get("categories"):
+            preferences["interests"] = entities["categories"]
+        if intent == "plan_itinerary":
+            # budget của plan_itinerary là VND/người, không phải mức 1-4
+            preferences.pop("budget", None)
+        if preferences:
+            entities["preferences"] = preferences
+
+        return {
+            "intent": intent,
+            "confidence": round(confidence, 4),
+            "entities": entities,
+            "source": source
+        }
+
+
+def _unit(vector: List[float]) -> List[float]:
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
@@ -1,7 +1,13 @@
 from flask import Flask, request, jsonify
 from neo4j import GraphDatabase
-from app.database.neo4j import Neo4jSpatialQuery
-from app.database.qdrant import QdrantPlaceSearch
+from app.database.neo4j import (
+    get_neo4j_query, get_async_neo4j_query, SpatialGridIndex, LandmarkResolver, SpatialQueryCache
+)
+from app.database.qdrant import (
+    QdrantPlaceSearch, get_embedding_cache, get_embedding_client, get_async_embedding_client
+)
+from app.database.qdrant.embedding_client import get_async_embedding_client_stats
+from app.database.qdrant.main import DETAIL_FIELDS, CARD_FIELDS, COMPARE_FIELDS, NAME_FIELDS
 from app.models.model import AIService
 from qdrant_client.models import Filter, FieldCondition, MatchValue
 
@@ -9,23 +15,63 @@ from qdrant_client.models import Filter, FieldCondition, MatchValue
 from app.services.translation_service import get_translation_service
 from app.services.maps_service import get_maps_service
 from app.services.budget_service import get_budget_service
+from app.services.intent_cache import get_intent_cache
+from app.services.session_store import get_session_store
 from app.models.enhanced_model import OpeningHours
 
+from contextlib import contextmanager
+import asyncio
+import hmac
 import os
+import threading
 
-NEO4J_URI = os.getenv("NEO4J_URI", "bolt://localhost:7687")
-NEO4J_AUTH = (
-    os.getenv("NEO4J_USER", "neo4j"),
-    os.getenv("NEO4J_PASSWORD", "12345678")
-)
 QDRANT_HOST = os.getenv("QDRANT_HOST", "localhost")
 QDRANT_PORT = os.getenv("QDRANT_PORT", 6333)
 
-neo4j_query = Neo4jSpatialQuery(uri=NEO4J_URI, auth=NEO4J_AUTH)
+# Grid index in-process cho search_places: "csv", "neo4j" hoặc để trống (tắt)
+NEO4J_SPATIAL_INDEX = os.getenv("NEO4J_SPATIAL_INDEX", "").lower()
+NEO4J_SPATIAL_INDEX_CSV = os.getenv(
+    "NEO4J_SPATIAL_INDEX_CSV",
+    "resource/data/hanoi_places_osm_filtered_full_row.csv"
+)
+# Landmark resolver cho nearby_landmark: "csv" (trie + full-text fallback), "fulltext" hoặc để trống (tắt)
+NEO4J_LANDMARK_RESOLVER = os.getenv("NEO4J_LANDMARK_RESOLVER", "").lower()
+# Result cache cho search theo tọa độ/quận (tự xóa khi import lại dữ liệu)
+NEO4J_RESULT_CACHE = os.getenv("NEO4J_RESULT_CACHE", "false").lower() in ("1", "true", "yes")
+NEO4J_RESULT_CACHE_SIZE = int(os.getenv("NEO4J_RESULT_CACHE_SIZE", 2048))
+NEO4J_RESULT_CACHE_TTL = float(os.getenv("NEO4J_RESULT_CACHE_TTL", 300))
+# Chạy các nhóm category của plan_itinerary đồng thời qua async driver
+NEO4J_ASYNC = os.getenv("NEO4J_ASYNC", "false").lower() in ("1", "true", "yes")
+# Speculative retrieval của agent: embedding qua AsyncEmbeddingClient trên background loop
+EMBEDDING_ASYNC = os.getenv("EMBEDDING_ASYNC", "false").lower() in ("1", "true", "yes")
+# Token cho thao tác quản trị tốn tài nguyên qua HTTP (rebuild grid index); trống = tắt
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# Driver/connection pool dùng chung với agent_service
+neo4j_query = get_neo4j_query()
+if NEO4J_SPATIAL_INDEX == "csv":
+    neo4j_query.enable_spatial_index(SpatialGridIndex.from_csv(NEO4J_SPATIAL_INDEX_CSV))
+elif NEO4J_SPATIAL_INDEX == "neo4j":
+    neo4j_query.enable_spatial_index()
+
+if NEO4J_LANDMARK_RESOLVER == "csv":
+    neo4j_query.enable_landmark_resolver(LandmarkResolver.from_csv(NEO4J_SPATIAL_INDEX_CSV))
+elif NEO4J_LANDMARK_RESOLVER == "fulltext":
+    neo4j_query.enable_landmark_resolver()
+
+if NEO4J_RESULT_CACHE:
+    neo4j_query.enable_result_cache(SpatialQueryCache(
+        maxsize=NEO4J_RESULT_CACHE_SIZE,
+        ttl_seconds=NEO4J_RESULT_CACHE_TTL,
+        version_fetcher=neo4j_query.get_dataset_version
+    ))
+
 qdrant_search = QdrantPlaceSearch(
     qdrant_url=QDRANT_HOST,
     qdrant_port=QDRANT_PORT,
-    collection_name="map_assistant_v2"
+    collection_name="map_assistant_v2",
+    embedding_cache=get_embedding_cache(),
+    embedding_client=get_embedding_client()
 )
 ai_service = AIService()
 
@@ -34,6 +80,81 @@ translation_service = get_translation_service()
 maps_service = get_maps_service()
 budget_service = get_budget_service()
 
+# Streaming (/chat/stream): trong defer_ai_summary() các service trả kết quả
+# ngay với SUMMARY_PLACEHOLDER thay cho câu trả lời LLM, agent stream sau
+SUMMARY_PLACEHOLDER = "\x00ai_summary\x00"
+SUMMARY_SYSTEM_PROMPT = "You are a helpful Travel assistant"
+_deferred_summary = threading.local()
+
+
+@contextmanager
+def defer_ai_summary():
+    """
+    Hoãn lời gọi LLM tóm tắt của các service trong thread hiện tại
+
+    Yields:
+        List (user_message, data_extend) của các lời gọi đã hoãn
+    """
+    _deferred_summary.prompts = []
+    try:
+        yield _deferred_summary.prompts
+    finally:
+        _deferred_summary.prompts = None
+
+
+def _generate_summary(user_message, data_extend):
+    prompts = getattr(_deferred_summary, 'prompts', None)
+    if prompts is not None:
+        prompts.append((user_message, data_extend))
+        return SUMMARY_PLACEHOLDER
+    return ai_service.generate_response(user_message=user_message, data_extend=data_extend)
+
+
+def _summary_messages(user_message, data_extend):
+    """Messages theo prompt template của AIService.generate_response (ARCHITECTURE.md, mục AI SERVICE)"""
+    return [
+        {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+        {"role": "user", "content": f"{user_message}\n\nData: {data_extend}"}
+    ]
+
+
+def stream_summary(user_message, data_extend):
+    """
+    Stream từng đoạn text câu trả lời LLM khi model sinh ra (cùng prompt với generate_response)
+
+    Lỗi giữa chừng: chưa gửi gì thì fallback generate_response 1 lần, đã gửi
+    token thì dừng ở phần đã có (client đã nhận, không gửi lại từ đầu)
+
+    Args:
+        user_message: Câu hỏi gửi LLM (như _generate_summary)
+        data_extend: Dữ liệu kèm theo
+
+    Yields:
+        Các đoạn text của câu trả lời
+    """
+    sent = False
+    try:
+        stream = ai_service.client.chat.completions.create(
+            model=ai_service.model,
+            messages=_summary_messages(user_message, data_extend),
+            stream=True
+        )
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                sent = True
+                yield delta
+        return
+    except Exception as e:
+        print(f"Streaming summary failed: {e}")
+        if sent:
+            return
+    
+    yield ai_service.generate_response(user_message=user_message, data_extend=data_extend)
+
+
 def get_info_details(name, language='vi'):
     """
     Lấy thông tin chi tiết về một địa điểm
@@ -44,7 +165,8 @@ def get_info_details(name, language='vi'):
     """
     res_qdrant = qdrant_search.search_place_details(
         query=name,
-        top_k=2
+        top_k=2,
+        payload_fields=DETAIL_FIELDS
     )
     data = ""
     place_info = {}
@@ -63,8 +185,8 @@ def get_info_details(name, language='vi'):
                 'url': payload.get('url', '')
             }
             
-            # Add coordinates if available
-            # Note: Need to get from Neo4j or OSM data
+            # Tọa độ được ghép từ CSV OSM lúc ingest (save_to_qdrant.py);
+            # document không khớp place nào mới dùng tọa độ mặc định
             place_info['lat'] = payload.get('lat', 21.0285)
             place_info['lon'] = payload.get('lon', 105.8542)
 
@@ -89,7 +211,7 @@ def get_info_details(name, language='vi'):
     if language == 'en':
         prompt = f"Provide detailed information about '{name}' in English."
     
-    ai_response = ai_service.generate_response(
+    ai_response = _generate_summary(
         user_message=prompt,
         data_extend=data
     )
@@ -199,7 +321,7 @@ def search_places(lat, lon, categories, radius_meters=2000, limit=20, language='
         if language == 'en':
             prompt = "Please provide a brief summary of these places in English"
         
-        ai_summary = ai_service.generate_response(
+        ai_summary = _generate_summary(
             user_message=prompt,
             data_extend=places_summary
         )
@@ -284,7 +406,7 @@ def nearby_landmark(landmark_name, categories, radius_meters=1000, limit=20):
         for place in places[:5]:
             summary += f"- {place['name']}: {place['address']}, cách {place['distance_meters']}m\n"
         
-        ai_response = ai_service.generate_response(
+        ai_response = _generate_summary(
             user_message=f"Hãy mô tả ngắn gọn về các địa điểm xung quanh {landmark_name}",
             data_extend=summary
         )
@@ -299,7 +421,39 @@ def nearby_landmark(landmark_name, categories, radius_meters=1000, limit=20):
     return jsonify({"error": f"Không tìm thấy landmark '{landmark_name}'"})
 
 
-def semantic_search(query, lat=None, lon=None, radius_meters=5000, top_k=10):
+def semantic_candidates(query, lat=None, lon=None, radius_meters=5000, top_k=10, query_vector=None):
+    """
+    Step 1 của semantic_search: Qdrant search gom theo document_id để top_k
+    là top_k địa điểm khác nhau thay vì nhiều chunk của cùng 1 bài.
+    Không cần Flask context -> agent chạy trước được trên thread khác
+    """
+    return qdrant_search.search_place_groups(
+        query=query,
+        top_k=top_k,
+        group_size=1,
+        score_threshold=0.3,
+        payload_fields=CARD_FIELDS,
+        # Filter bán kính chạy trong Qdrant trên geo payload 'location'
+        lat=lat,
+        lon=lon,
+        radius_meters=radius_meters,
+        query_vector=query_vector
+    )
+
+
+async def semantic_candidates_async(query, lat=None, lon=None, radius_meters=5000, top_k=10):
+    """
+    semantic_candidates chạy trên background loop: embedding qua AsyncEmbeddingClient
+    (chờ I/O không giữ thread, hủy task là hủy luôn request /embed), Qdrant search
+    (client sync) trên worker thread
+    """
+    vectors = await qdrant_search.aget_embeddings([query], get_async_embedding_client())
+    return await asyncio.to_thread(
+        semantic_candidates, query, lat, lon, radius_meters, top_k, query_vector=vectors[0]
+    )
+
+
+def semantic_search(query, lat=None, lon=None, radius_meters=5000, top_k=10, vector_results=None):
     """
     Tìm kiếm địa điểm bằng ngữ nghĩa kết hợp Neo4j + Qdrant
     
@@ -308,20 +462,15 @@ def semantic_search(query, lat=None, lon=None, radius_meters=5000, top_k=10):
         lat, lon: Tọa độ (optional)
         radius_meters: Bán kính filter
         top_k: Số kết quả
+        vector_results: Kết quả semantic_candidates đã có sẵn (agent chạy trước), None = tự search
     """
     # Step 1: Semantic search với Qdrant
-    vector_results = qdrant_search.search_place_details(
-        query=query,
-        top_k=top_k * 2,  # Lấy nhiều hơn để filter
-        score_threshold=0.3
-    )
+    if vector_results is None:
+        vector_results = semantic_candidates(query, lat, lon, radius_meters, top_k)
     
     if not vector_results:
         return jsonify({"total": 0, "places": [], "message": "Không tìm thấy kết quả phù hợp"})
     
-    # Step 2: Filter bằng Neo4j nếu có location
-    place_ids = [item['place_id'] for item in vector_results]
-    
     # Kết hợp thông tin và enrich với Phase 1
     results = []
     for item in vector_results[:top_k]:
@@ -366,7 +515,7 @@ def semantic_search(query, lat=None, lon=None, radius_meters=5000, top_k=10):
     
     # Generate AI response
     data_summary = "\n".join([f"{r['name']}: {r['summary'][:200]}..." for r in results[:5]])
-    ai_response = ai_service.generate_response(
+    ai_response = _generate_summary(
         user_message=f"Dựa trên yêu cầu '{query}', hãy giới thiệu các địa điểm phù hợp nhất",
         data_extend=data_summary
     )
@@ -389,14 +538,15 @@ def compare_places(place_names):
     if not place_names or len(place_names) < 2:
         return jsonify({"error": "Cần ít nhất 2 địa điểm để so sánh"})
     
-    # Tìm thông tin mỗi địa điểm từ Qdrant
+    # Tìm thông tin tất cả địa điểm từ Qdrant trong 1 lần gọi batched
     all_places_data = []
-    for name in place_names:
-        results = qdrant_search.search_place_details(
-            query=name,
-            top_k=1,
-            score_threshold=0.0
-        )
+    batch_results = qdrant_search.search_many(
+        queries=place_names,
+        top_k=1,
+        score_threshold=0.0,
+        payload_fields=COMPARE_FIELDS
+    )
+    for name, results in zip(place_names, batch_results):
         if results:
             all_places_data.append({
                 'name': name,
@@ -414,7 +564,7 @@ def compare_places(place_names):
         comparison_data += f"{payload.get('summary', '')}\n"
         comparison_data += f"{payload.get('text', '')}\n"
     
-    ai_response = ai_service.generate_response(
+    ai_response = _generate_summary(
         user_message=f"Hãy so sánh chi tiết các địa điểm: {', '.join(place_names)}. Phân tích điểm mạnh, điểm yếu, phù hợp cho ai, và đưa ra lời khuyên nên chọn địa điểm nào.",
         data_extend=comparison_data
     )
@@ -458,13 +608,27 @@ def plan_itinerary(location, duration_hours, preferences=None, start_time="09:00
         ['shopping', 'market']
     ]
     
-    results = neo4j_query.find_places_by_multiple_categories(
-        lat=lat,
-        lon=lon,
-        category_groups=category_groups,
-        radius_meters=3000,
-        limit=5
-    )
+    if NEO4J_ASYNC:
+        async_query, loop = get_async_neo4j_query(
+            spatial_index=neo4j_query.spatial_index,
+            landmark_resolver=neo4j_query.landmark_resolver,
+            result_cache=neo4j_query.result_cache
+        )
+        results = loop.run(async_query.find_places_by_multiple_categories(
+            lat=lat,
+            lon=lon,
+            category_groups=category_groups,
+            radius_meters=3000,
+            limit=5
+        ))
+    else:
+        results = neo4j_query.find_places_by_multiple_categories(
+            lat=lat,
+            lon=lon,
+            category_groups=category_groups,
+            radius_meters=3000,
+            limit=5
+        )
     
     # Flatten results for cost estimation
     all_places = []
@@ -541,7 +705,7 @@ def plan_itinerary(location, duration_hours, preferences=None, start_time="09:00
         if budget_limit:
             prompt += f"\nNote: Budget {budget_limit:,} VND/person. Estimated cost: {cost_estimate['per_person']['avg']:,} VND/person"
     
-    ai_response = ai_service.generate_response(
+    ai_response = _generate_summary(
         user_message=prompt,
         data_extend=itinerary_data
     )
@@ -594,18 +758,19 @@ def recommend_places(user_preferences, current_location=None, limit=10):
         vector_results = qdrant_search.search_place_details(
             query=query_text,
             top_k=limit,
-            score_threshold=0.3
+            score_threshold=0.3,
+            payload_fields=NAME_FIELDS
         )
         places = [{
             'place_id': item['place_id'],
-            'name': item.get('payload', {}).get('name', 'N/A'),
+            'name': item.get('payload', {}).get('title', item.get('payload', {}).get('name', 'N/A')),
             'score': item['score']
         } for item in vector_results]
     
     # Generate recommendation với AI
     places_summary = "\n".join([f"{p['name']}" for p in places[:limit]])
     
-    ai_response = ai_service.generate_response(
+    ai_response = _generate_summary(
         user_message=f"""Dựa trên sở thích: {user_preferences}, 
         hãy gợi ý và giải thích tại sao các địa điểm sau phù hợp:
         {places_summary}
@@ -620,3 +785,50 @@ def recommend_places(user_preferences, current_location=None, limit=10):
         "recommendation": ai_response
     })
 
+
+def get_cache_metrics():
+    """Thống kê các cache in-process (hit/miss, kích thước, số lần invalidate)"""
+    metrics = {}
+    
+    if neo4j_query.result_cache is not None:
+        metrics['neo4j_result_cache'] = neo4j_query.result_cache.stats()
+    
+    if neo4j_query.landmark_resolver is not None:
+        metrics['landmark_cache'] = neo4j_query.landmark_resolver.cache.stats()
+    
+    if qdrant_search.embedding_cache is not None:
+        metrics['embedding_cache'] = qdrant_search.embedding_cache.stats()
+    
+    metrics['embedding_client'] = qdrant_search.embedding_client.stats()
+    async_client_stats = get_async_embedding_client_stats()
+    if async_client_stats is not None:
+        metrics['async_embedding_client'] = async_client_stats
+    
+    intent_cache = get_intent_cache()
+    if intent_cache is not None:
+        metrics['intent_cache'] = intent_cache.stats()
+    
+    session_store = get_session_store()
+    if session_store is not None:
+        metrics['session_store'] = session_store.stats()
+    
+    return jsonify(metrics)
+
+
+def invalidate_caches(rebuild_index=False, admin_token=None):
+    """
+    Xóa các cache dữ liệu Neo4j (gọi sau khi import lại dữ liệu)
+    
+    Args:
+        rebuild_index: Nạp lại grid index (dump toàn bộ Place từ Neo4j) - cần ADMIN_TOKEN
+        admin_token: Token client gửi lên (header X-Admin-Token)
+    """
+    if rebuild_index:
+        if not ADMIN_TOKEN or not hmac.compare_digest(admin_token or "", ADMIN_TOKEN):
+            return jsonify({"success": False, "error": "Rebuild index cần X-Admin-Token hợp lệ"}), 403
+    
+    neo4j_query.invalidate_caches()
+    rebuilt = bool(rebuild_index) and neo4j_query.spatial_index is not None
+    if rebuilt:
+        neo4j_query.refresh_spatial_index()
+    return jsonify({"success": True, "spatial_index_rebuilt": rebuilt})
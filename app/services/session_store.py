@@ -0,0 +1,371 @@
+"""
+Session memory cho chat_with_context: state gọn theo session_id
+
+Mỗi session giữ intent cuối, entities đã resolve (landmark, categories...),
+danh sách địa điểm của kết quả cuối (dạng card gọn + place_ids) và lịch sử
+chat giới hạn theo token (các lượt cũ được gộp thành summary 1 dòng/lượt).
+Câu hỏi nối tiếp ngắn ("còn quán nào rẻ hơn không?") được trả lời bằng cách
+lọc/sắp xếp lại các địa điểm đã có, không classify/retrieval lại.
+
+Backend: LRU + TTL in-process (mặc định) hoặc file SQLite (dùng chung giữa
+các worker, sống qua restart).
+"""
+
+from typing import Dict, List, Optional, Tuple
+import json
+import os
+import time
+
+from app.utils import TTLCache, MISSING, SQLiteStore, normalize_name
+
+# Field của địa điểm giữ lại trong session (đủ để hiển thị card + lọc lại)
+PLACE_FIELDS = (
+    'place_id', 'name', 'address', 'categories', 'lat', 'lon', 'distance_meters',
+    'score', 'url', 'google_maps_url', 'is_open_now', 'price_info', 'estimated_cost'
+)
+
+# Field kết quả service chứa danh sách địa điểm / câu trả lời dạng text
+PLACE_LIST_FIELDS = ('places', 'nearby_places', 'available_places')
+REPLY_FIELDS = ('summary', 'recommendation', 'response', 'comparison', 'itinerary', 'message', 'error')
+
+# Entity được kế thừa sang lượt sau khi lượt đó không nhắc lại
+CARRY_ENTITIES = {
+    'search_places': ('categories',),
+    'nearby_landmark': ('landmark_name', 'categories'),
+    'place_info': ('place_name',),
+    'plan_itinerary': ('location', 'duration_hours', 'preferences'),
+    'recommend_places': ('preferences', 'current_location'),
+}
+
+# Câu hỏi nối tiếp (so khớp sau normalize_name: bỏ dấu, lowercase)
+FOLLOW_UP_PATTERNS = {
+    'cheaper': ("re hon", "gia thap hon", "binh dan hon", "do dat hon", "cheaper", "less expensive"),
+    'closer': ("gan hon", "closer", "nearer"),
+    'open_now': ("dang mo", "con mo", "mo cua bay gio", "open now", "still open"),
+}
+FOLLOW_UP_MAX_WORDS = 10
+# Số địa điểm đầu danh sách coi như đã hiển thị cho người dùng (và liệt kê trong summary)
+FOLLOW_UP_SHOWN = 5
+
+FOLLOW_UP_SUMMARIES = {
+    'vi': {
+        'cheaper': "Các địa điểm rẻ hơn trong kết quả trước, sắp theo giá tăng dần",
+        'closer': "Các địa điểm trong kết quả trước, sắp theo khoảng cách",
+        'open_now': "Các địa điểm trong kết quả trước đang mở cửa",
+    },
+    'en': {
+        'cheaper': "Cheaper places from the previous results, sorted by price",
+        'closer': "Places from the previous results, sorted by distance",
+        'open_now': "Places from the previous results that are open now",
+    },
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """Ước lượng số token (không cần tokenizer): ~3 ký tự/token với tiếng Việt có dấu"""
+    return (len(text) + 2) // 3 if text else 0
+
+
+def detect_follow_up(message: str) -> Optional[str]:
+    """
+    'còn quán nào rẻ hơn không?' -> 'cheaper'. Chỉ xét message ngắn để câu
+    hỏi mới đầy đủ ("tìm quán cafe gần Hồ Gươm hơn") vẫn đi qua pipeline
+    """
+    text = normalize_name(message)
+    if not text or len(text.split()) > FOLLOW_UP_MAX_WORDS:
+        return None
+    padded = f" {text} "
+    for refinement, patterns in FOLLOW_UP_PATTERNS.items():
+        if any(f" {pattern} " in padded for pattern in patterns):
+            return refinement
+    return None
+
+
+def _price_of(place: Dict) -> Optional[Tuple[str, float]]:
+    """
+    Giá thấp nhất của địa điểm kèm nguồn giá
+
+    Returns:
+        ('db', giá) từ price_info, ('estimate', giá) từ estimated_cost,
+        None nếu không có. Giá khác nguồn không so sánh được với nhau
+    """
+    price_info = place.get('price_info') or {}
+    candidates = (
+        ('db', price_info.get('min_price') or price_info.get('max_price')),
+        ('estimate', ((place.get('estimated_cost') or {}).get('per_person') or {}).get('min')),
+    )
+    for source, price in candidates:
+        if price is None:
+            continue
+        try:
+            return source, float(price)
+        except (TypeError, ValueError):
+            return None
+    return None
+
+
+def _compact_place(place: Dict) -> Dict:
+    return {k: place[k] for k in PLACE_FIELDS if place.get(k) is not None}
+
+
+def reply_text(result) -> str:
+    """Câu trả lời text của kết quả service (để lưu history)"""
+    if not isinstance(result, dict):
+        return ""
+    return next((result[k] for k in REPLY_FIELDS if isinstance(result.get(k), str) and result[k]), "")
+
+
+def merge_entities(state: Dict, intent_result: Dict) -> Dict:
+    """
+    Điền entity lượt này không nhắc lại từ lượt trước cùng intent
+    ('thế còn khách sạn?' sau 'quán cafe gần Hồ Gươm' -> landmark Hồ Gươm)
+    """
+    intent = intent_result.get('intent')
+    previous = state.get('entities') or {}
+    entities = dict(intent_result.get('entities') or {})
+
+    if intent == 'nearby_landmark' and not entities.get('landmark_name') and state.get('landmark'):
+        entities['landmark_name'] = state['landmark']['name']
+    if intent == 'place_info' and not entities.get('place_name') and not entities.get('landmark_name'):
+        name = previous.get('place_name') or (state.get('landmark') or {}).get('name')
+        if name:
+            entities['place_name'] = name
+
+    if intent == state.get('last_intent'):
+        for key in CARRY_ENTITIES.get(intent, ()):
+            if not entities.get(key) and previous.get(key):
+                entities[key] = previous[key]
+
+    return {**intent_result, 'entities': entities}
+
+
+def new_session() -> Dict:
+    return {
+        'turns': 0,
+        'last_intent': None,
+        'entities': {},
+        'landmark': None,
+        'place_ids': [],
+        'places': [],
+        'summary': "",
+        'history': [],
+        'updated_at': None
+    }
+
+
+class MemorySessionBackend:
+    """Session trong process: LRU giới hạn số session, hết hạn sau ttl_seconds không dùng"""
+
+    def __init__(self, maxsize: int = 1024, ttl_seconds: Optional[float] = 86400):
+        self.cache = TTLCache(maxsize=maxsize, ttl_seconds=ttl_seconds)
+
+    def __len__(self):
+        return len(self.cache)
+
+    def get(self, session_id: str) -> Optional[bytes]:
+        raw = self.cache.get(session_id, MISSING)
+        return None if raw is MISSING else raw
+
+    def set(self, session_id: str, raw: bytes):
+        self.cache.set(session_id, raw)
+
+    def delete(self, session_id: str):
+        self.cache.pop(session_id)
+
+    def stats(self) -> Dict:
+        return {'backend': 'memory', **self.cache.stats()}
+
+
+class SQLiteSessionBackend:
+    """Session trong file SQLite, dùng chung giữa các worker"""
+
+    def __init__(self, path: str, ttl_seconds: Optional[float] = 86400):
+        self.ttl_seconds = ttl_seconds
+        self.store = SQLiteStore(path, table="sessions")
+
+    def __len__(self):
+        return len(self.store)
+
+    def get(self, session_id: str) -> Optional[bytes]:
+        raw = self.store.get(session_id)
+        return None if raw is MISSING else raw
+
+    def set(self, session_id: str, raw: bytes):
+        self.store.set(session_id, raw, ttl_seconds=self.ttl_seconds)
+
+    def delete(self, session_id: str):
+        self.store.delete(session_id)
+
+    def stats(self) -> Dict:
+        return {'backend': 'sqlite', 'path': self.store.path, 'size': len(self.store)}
+
+
+class SessionStore:
+    """State gọn của từng session chat trên 1 backend (memory/SQLite)"""
+
+    def __init__(self, backend, history_tokens: int = 1024, max_places: int = 20):
+        """
+        Args:
+            backend: MemorySessionBackend hoặc SQLiteSessionBackend
+            history_tokens: Ngân sách token cho history + summary của mỗi session
+            max_places: Số địa điểm tối đa giữ từ kết quả cuối
+        """
+        self.backend = backend
+        self.history_tokens = history_tokens
+        self.max_places = max_places
+        self.follow_ups = 0
+
+    def get(self, session_id: str) -> Dict:
+        """State của session (state mới nếu chưa có/hết hạn)"""
+        raw = self.backend.get(session_id)
+        return json.loads(raw) if raw is not None else new_session()
+
+    def save(self, session_id: str, state: Dict):
+        state['updated_at'] = time.time()
+        self.backend.set(session_id, json.dumps(state, ensure_ascii=False).encode('utf-8'))
+
+    def delete(self, session_id: str):
+        self.backend.delete(session_id)
+
+    def seed_history(self, state: Dict, chat_history: List[Dict]):
+        """Nạp chat_history client gửi lên (chỉ khi session chưa có lượt nào)"""
+        if state['turns'] or not chat_history:
+            return
+        for item in chat_history:
+            if isinstance(item, dict) and item.get('content'):
+                role = 'assistant' if item.get('role') in ('assistant', 'bot') else 'user'
+                state['history'].append({'role': role, 'content': str(item['content'])})
+        self._compact_history(state)
+
+    def record_turn(self, state: Dict, message: str, intent_result: Dict, result, reply: str = ""):
+        """Cập nhật state sau 1 lượt chat (chưa ghi xuống backend, gọi save sau)"""
+        state['turns'] += 1
+        if intent_result.get('intent'):
+            state['last_intent'] = intent_result['intent']
+            state['entities'] = intent_result.get('entities') or {}
+
+        if isinstance(result, dict):
+            if isinstance(result.get('landmark'), dict):
+                state['landmark'] = {
+                    k: result['landmark'].get(k) for k in ('place_id', 'name', 'address', 'lat', 'lon')
+                }
+            places = next((result[k] for k in PLACE_LIST_FIELDS if isinstance(result.get(k), list)), None)
+            # compare_places trả về list tên, không phải card
+            if places and isinstance(places[0], dict):
+                state['places'] = [_compact_place(p) for p in places[:self.max_places]]
+                state['place_ids'] = [p['place_id'] for p in state['places'] if p.get('place_id')]
+
+        state['history'].append({'role': 'user', 'content': message})
+        if reply:
+            state['history'].append({'role': 'assistant', 'content': reply})
+        self._compact_history(state)
+
+    def _compact_history(self, state: Dict):
+        """Giữ history trong ngân sách token: lượt cũ nhất gộp vào summary (1 dòng ngắn)"""
+        history = state['history']
+        cost = lambda: sum(estimate_tokens(h['content']) for h in history) + estimate_tokens(state['summary'])
+
+        while len(history) > 1 and cost() > self.history_tokens:
+            item = history.pop(0)
+            content = ' '.join(item['content'].split())
+            line = f"{item['role']}: {content[:120]}{'…' if len(content) > 120 else ''}"
+            state['summary'] = f"{state['summary']}\n{line}".strip()
+
+            # Summary tối đa 1/4 ngân sách, bỏ dòng cũ nhất trước
+            lines = state['summary'].split("\n")
+            while len(lines) > 1 and estimate_tokens("\n".join(lines)) > self.history_tokens // 4:
+                lines.pop(0)
+            state['summary'] = "\n".join(lines)
+
+    def answer_follow_up(self, state: Dict, refinement: str, language: Optional[str] = None) -> Optional[Dict]:
+        """
+        Trả lời câu hỏi nối tiếp bằng địa điểm của kết quả trước
+
+        Args:
+            state: Session state
+            refinement: Loại câu hỏi nối tiếp (detect_follow_up)
+            language: 'en' để trả summary tiếng Anh, còn lại tiếng Việt
+
+        Returns:
+            Kết quả dạng service (places + summary), None nếu không áp dụng được
+        """
+        places = state.get('places') or []
+        if not places:
+            return None
+
+        if refinement == 'cheaper':
+            # Mốc: giá thấp nhất (theo từng nguồn giá) trong các địa điểm lượt trước đã hiển thị,
+            # chỉ so địa điểm cùng nguồn giá
+            reference = {}
+            for place in places[:FOLLOW_UP_SHOWN]:
+                priced = _price_of(place)
+                if priced is not None:
+                    source, price = priced
+                    reference[source] = min(price, reference.get(source, price))
+            cheaper = []
+            for place in places[FOLLOW_UP_SHOWN:]:
+                priced = _price_of(place)
+                if priced is not None and priced[0] in reference and priced[1] < reference[priced[0]]:
+                    cheaper.append((priced, place))
+            # Giá từ DB trước, ước tính sau; trong mỗi nguồn theo giá tăng dần
+            cheaper.sort(key=lambda item: (item[0][0] != 'db', item[0][1]))
+            selected = [place for _, place in cheaper]
+        elif refinement == 'closer':
+            selected = sorted(
+                (p for p in places if p.get('distance_meters') is not None),
+                key=lambda p: p['distance_meters']
+            )
+        elif refinement == 'open_now':
+            selected = [p for p in places if p.get('is_open_now')]
+        else:
+            return None
+
+        if not selected:
+            return None
+
+        self.follow_ups += 1
+        summary = FOLLOW_UP_SUMMARIES['en' if language == 'en' else 'vi'][refinement]
+        lines = [f"- {p['name']}" + (f": {p['address']}" if p.get('address') else "") for p in selected[:FOLLOW_UP_SHOWN]]
+        result = {
+            "total": len(selected),
+            "places": selected,
+            "summary": f"{summary}:\n" + "\n".join(lines),
+            "follow_up": refinement
+        }
+        if state.get('landmark'):
+            result['landmark'] = state['landmark']
+        return result
+
+    def stats(self) -> Dict:
+        return {
+            **self.backend.stats(),
+            'history_tokens': self.history_tokens,
+            'follow_ups_answered': self.follow_ups
+        }
+
+
+# Singleton - dùng chung cho mọi request của agent
+_session_store = None
+
+
+def get_session_store() -> Optional[SessionStore]:
+    """
+    Get singleton SessionStore cấu hình từ env:
+    SESSION_STORE_SIZE (0 = tắt), SESSION_TTL (giây không hoạt động),
+    SESSION_STORE_PATH (trống = memory, có giá trị = SQLite),
+    SESSION_HISTORY_TOKENS
+    """
+    global _session_store
+    if _session_store is None:
+        maxsize = int(os.getenv("SESSION_STORE_SIZE", 1024))
+        if maxsize <= 0:
+            return None
+        ttl = float(os.getenv("SESSION_TTL", 86400))
+        ttl = ttl if ttl > 0 else None
+        path = os.getenv("SESSION_STORE_PATH") or None
+        backend = SQLiteSessionBackend(path, ttl) if path else MemorySessionBackend(maxsize, ttl)
+        _session_store = SessionStore(
+            backend,
+            history_tokens=int(os.getenv("SESSION_HISTORY_TOKENS", 1024))
+        )
+    return _session_store
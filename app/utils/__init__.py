@@ -0,0 +1,3 @@
+from .cache import TTLCache, MISSING
+from .sqlite_store import SQLiteStore
+from .text import strip_accents, normalize_name, normalize_text
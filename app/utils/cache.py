@@ -0,0 +1,88 @@
+"""
+LRU cache có TTL, thread-safe, kèm hit/miss counters
+Dùng chung cho các cache in-process (landmark, query result, ...)
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+import threading
+import time
+
+
+# Sentinel để phân biệt "không có trong cache" với giá trị None đã cache
+MISSING = object()
+
+
+class TTLCache:
+    """LRU cache giới hạn số phần tử, mỗi phần tử hết hạn sau ttl_seconds"""
+
+    def __init__(self, maxsize: int = 1024, ttl_seconds: Optional[float] = 3600):
+        """
+        Args:
+            maxsize: Số phần tử tối đa (LRU eviction khi vượt quá)
+            ttl_seconds: Thời gian sống của mỗi phần tử (None = không hết hạn)
+        """
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, MISSING, count=False) is not MISSING
+
+    def get(self, key: Hashable, default: Any = None, count: bool = True) -> Any:
+        """Lấy giá trị; trả về default nếu không có hoặc đã hết hạn"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    if count:
+                        self.hits += 1
+                    return value
+                del self._data[key]
+
+            if count:
+                self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None):
+        """Lưu giá trị; ttl_seconds ghi đè TTL mặc định cho phần tử này"""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.pop(key, None)
+            return default if entry is None else entry[0]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict:
+        """Thống kê hit/miss của cache"""
+        total = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'ttl_seconds': self.ttl_seconds,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0
+        }
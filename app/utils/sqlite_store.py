@@ -0,0 +1,93 @@
+"""
+Key-value store trên SQLite (1 file, sống qua restart)
+Dùng làm tầng persistent phía sau các cache in-process
+"""
+
+from typing import Any, Optional
+import os
+import sqlite3
+import threading
+import time
+
+from .cache import MISSING
+
+
+class SQLiteStore:
+    """Bảng key -> value (BLOB) có hạn sử dụng tùy chọn, thread-safe"""
+
+    def __init__(self, path: str, table: str = "kv"):
+        """
+        Args:
+            path: Đường dẫn file SQLite (thư mục cha được tạo nếu chưa có)
+            table: Tên bảng, nhiều store có thể dùng chung 1 file
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.table = table
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "key TEXT PRIMARY KEY, value BLOB, expires_at REAL, updated_at REAL)"
+            )
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute(f"SELECT count(*) FROM {self.table}").fetchone()[0]
+
+    def get(self, key: str, default: Any = MISSING) -> Any:
+        """Lấy value; trả về default nếu không có hoặc đã hết hạn"""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return default
+            value, expires_at = row
+            if expires_at is not None and expires_at <= time.time():
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self._conn.commit()
+                return default
+            return value
+
+    def set(self, key: str, value: bytes, ttl_seconds: Optional[float] = None):
+        """Ghi value (bytes/str); ttl_seconds = None -> không hết hạn"""
+        now = time.time()
+        expires_at = now + ttl_seconds if ttl_seconds is not None else None
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at, updated_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, value, expires_at, now)
+            )
+            self._conn.commit()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def purge_expired(self) -> int:
+        """Xóa các entry đã hết hạn, trả về số entry bị xóa"""
+        with self._lock:
+            cursor = self._conn.execute(
+                f"DELETE FROM {self.table} WHERE expires_at IS NOT NULL AND expires_at <= ?",
+                (time.time(),)
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
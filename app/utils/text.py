@@ -0,0 +1,35 @@
+"""
+Chuẩn hóa text tiếng Việt cho so khớp tên địa điểm
+"""
+
+import re
+import unicodedata
+
+
+def strip_accents(text: str) -> str:
+    """Bỏ dấu tiếng Việt: 'Hồ Gươm' -> 'Ho Guom'"""
+    text = unicodedata.normalize('NFD', text)
+    text = ''.join(ch for ch in text if unicodedata.category(ch) != 'Mn')
+    return text.replace('đ', 'd').replace('Đ', 'D')
+
+
+def normalize_name(text: str) -> str:
+    """
+    Chuẩn hóa tên để so khớp không phân biệt dấu/hoa thường
+    VD: '  Hồ   GƯƠM!' -> 'ho guom'
+    """
+    if not text:
+        return ""
+    text = strip_accents(text).lower()
+    text = re.sub(r'[^\w\s]', ' ', text)
+    return ' '.join(text.split())
+
+
+def normalize_text(text: str) -> str:
+    """
+    Chuẩn hóa nhẹ (NFC + gộp khoảng trắng), giữ nguyên dấu và hoa/thường
+    vì model embedding phân biệt các biến thể này
+    """
+    if not text:
+        return ""
+    return ' '.join(unicodedata.normalize('NFC', text).split())
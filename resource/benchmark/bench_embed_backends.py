@@ -0,0 +1,79 @@
+"""
+Benchmark: latency / throughput của từng embedding backend trên CPU
+- latency: 1 query ngắn mỗi lần (giống QdrantPlaceSearch._get_embedding)
+- throughput: batch tên địa điểm từ CSV
+
+Chạy: python resource/benchmark/bench_embed_backends.py --backends torch torch-int8 onnx
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'serve'))
+
+from embed_backends import EmbeddingBackend, BACKENDS  # noqa: E402
+
+MODEL_NAME = "AITeamVN/Vietnamese_Embedding"
+CSV_PATH = "resource/data/hanoi_places_osm_filtered_full_row.csv"
+
+
+def _bench(backend: EmbeddingBackend, queries: list, runs: int, batch_size: int) -> dict:
+    backend.encode(queries[:batch_size])  # warm-up
+
+    latencies = []
+    for i in range(runs):
+        start = time.perf_counter()
+        backend.encode([queries[i % len(queries)]])
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+
+    texts = queries[:batch_size * 4]
+    start = time.perf_counter()
+    for i in range(0, len(texts), batch_size):
+        backend.encode(texts[i:i + batch_size])
+    elapsed = time.perf_counter() - start
+
+    return {
+        'p50': statistics.median(latencies),
+        'p95': latencies[max(0, int(len(latencies) * 0.95) - 1)],
+        'throughput': len(texts) / elapsed
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=None, help="torch.set_num_threads")
+    args = parser.parse_args()
+
+    if args.threads:
+        import torch
+        torch.set_num_threads(args.threads)
+
+    queries = pd.read_csv(CSV_PATH)['name'].dropna().astype(str).tolist()
+    print(f"single-query runs={args.runs}, batch size={args.batch_size}\n")
+
+    for name in args.backends:
+        try:
+            start = time.perf_counter()
+            backend = EmbeddingBackend(name, MODEL_NAME)
+            load = time.perf_counter() - start
+        except ImportError as e:
+            print(f"{name:<12} skipped ({e})")
+            continue
+
+        result = _bench(backend, queries, args.runs, args.batch_size)
+        print(f"{name:<12} load={load:6.1f}s  p50={result['p50']:8.2f}ms  "
+              f"p95={result['p95']:8.2f}ms  throughput={result['throughput']:7.1f} texts/s")
+        del backend
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark: micro-batching trong serve/embed_service.py
+Bắn N request /embed 1 text (giống QdrantPlaceSearch._get_embedding) từ nhiều
+client đồng thời, đo throughput + latency trên CPU
+
+Chạy 2 instance của service để so sánh:
+    cd serve && EMBED_BATCH_WINDOW_MS=0 uvicorn embed_service:app --port 8972
+    cd serve && EMBED_BATCH_WINDOW_MS=5 uvicorn embed_service:app --port 8973
+    python resource/benchmark/bench_embed_batching.py \\
+        --url http://localhost:8972/embed --compare-url http://localhost:8973/embed
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import statistics
+import time
+
+import pandas as pd
+import requests
+
+CSV_PATH = "resource/data/hanoi_places_osm_filtered_full_row.csv"
+
+
+def _load_queries(n: int) -> list:
+    names = pd.read_csv(CSV_PATH)['name'].dropna().astype(str).tolist()
+    return [names[i % len(names)] for i in range(n)]
+
+
+def _run_load(url: str, queries: list, concurrency: int) -> dict:
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+    session.mount("http://", adapter)
+
+    def _one(text):
+        start = time.perf_counter()
+        response = session.post(url, json={"texts": [text]}, timeout=60)
+        response.raise_for_status()
+        return (time.perf_counter() - start) * 1000
+
+    # Warm-up
+    _one(queries[0])
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = sorted(executor.map(_one, queries))
+    elapsed = time.perf_counter() - start
+
+    return {
+        'throughput': len(queries) / elapsed,
+        'p50': statistics.median(latencies),
+        'p95': latencies[max(0, int(len(latencies) * 0.95) - 1)]
+    }
+
+
+def _report(label: str, result: dict):
+    print(f"{label:<10} {result['throughput']:8.1f} req/s  "
+          f"p50={result['p50']:8.2f}ms  p95={result['p95']:8.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8972/embed",
+                        help="Service chạy với EMBED_BATCH_WINDOW_MS=0 (baseline)")
+    parser.add_argument("--compare-url", default=None,
+                        help="Service chạy với micro-batching bật")
+    parser.add_argument("--requests", type=int, default=256)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    queries = _load_queries(args.requests)
+    print(f"{args.requests} requests x 1 text, concurrency={args.concurrency}")
+
+    baseline = _run_load(args.url, queries, args.concurrency)
+    _report("baseline", baseline)
+
+    if args.compare_url:
+        batched = _run_load(args.compare_url, queries, args.concurrency)
+        _report("batched", batched)
+        print(f"throughput gain: {batched['throughput'] / baseline['throughput']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Benchmark: local intent classifier (rule + nearest-centroid) vs LLM classify_intent
+Trên tập message có nhãn: coverage (tỉ lệ trả lời local), accuracy của các
+dự đoán local, latency p50/p95; --llm đo thêm accuracy/latency của LLM và của
+pipeline local -> LLM fallback
+
+Chạy: python resource/benchmark/bench_intent_classifier.py --threshold 0.8 [--no-centroid] [--llm]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from collections import Counter
+
+# Chạy như script từ thư mục gốc repo: thêm project root vào sys.path
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from app.database.qdrant.embedding_client import EmbeddingClient
+from app.services.intent_classifier import LocalIntentClassifier, INTENT_EXAMPLES
+
+# (message, intent) - không trùng với INTENT_EXAMPLES
+LABELLED = [
+    ("tìm quán cà phê quanh đây", "search_places"),
+    ("có cây ATM nào gần tôi không", "search_places"),
+    ("nhà thuốc gần nhất ở đâu", "search_places"),
+    ("tìm khách sạn trong bán kính 500m", "search_places"),
+    ("find a cafe nearby", "search_places"),
+    ("quán bar gần đây", "search_places"),
+    ("tìm ngân hàng gần đây", "search_places"),
+    ("bệnh viện nào gần tôi nhất", "search_places"),
+    ("nhà hàng gần Hồ Tây", "nearby_landmark"),
+    ("quán cafe xung quanh Nhà hát Lớn", "nearby_landmark"),
+    ("khách sạn cạnh Chợ Đồng Xuân", "nearby_landmark"),
+    ("ăn gì gần Văn Miếu", "nearby_landmark"),
+    ("có bảo tàng nào gần Hoàng Thành không", "nearby_landmark"),
+    ("hotels near Hoan Kiem Lake", "nearby_landmark"),
+    ("quanh Nhà thờ Lớn có quán ăn nào ngon", "nearby_landmark"),
+    ("quán cafe yên tĩnh để làm việc", "semantic_search"),
+    ("chỗ ngắm hoàng hôn đẹp", "semantic_search"),
+    ("nhà hàng món Huế chính gốc", "semantic_search"),
+    ("địa điểm vui chơi cho trẻ em cuối tuần", "semantic_search"),
+    ("quán phở ngon nổi tiếng", "semantic_search"),
+    ("nơi có kiến trúc Pháp cổ", "semantic_search"),
+    ("quán ăn vỉa hè đông vui", "semantic_search"),
+    ("chùa cổ yên bình", "semantic_search"),
+    ("giới thiệu về Chùa Một Cột", "place_info"),
+    ("lịch sử Nhà tù Hỏa Lò", "place_info"),
+    ("Đền Ngọc Sơn là gì", "place_info"),
+    ("Cầu Long Biên được xây năm nào", "place_info"),
+    ("tell me about the Temple of Literature", "place_info"),
+    ("thông tin về Hồ Hoàn Kiếm", "place_info"),
+    ("Chùa Trấn Quốc có gì đặc biệt", "place_info"),
+    ("so sánh Văn Miếu với Hoàng Thành", "compare_places"),
+    ("Hồ Tây hay Hồ Gươm đẹp hơn", "compare_places"),
+    ("Lăng Bác và Chùa Một Cột khác nhau thế nào", "compare_places"),
+    ("compare Old Quarter vs West Lake", "compare_places"),
+    ("nên đi Nhà hát Lớn hay Nhà thờ Lớn", "compare_places"),
+    ("lên lịch trình 2 ngày ở Hà Nội", "plan_itinerary"),
+    ("kế hoạch tham quan phố cổ nửa ngày", "plan_itinerary"),
+    ("plan a 6 hours trip around Hoan Kiem Lake", "plan_itinerary"),
+    ("lộ trình đi bộ quanh Hồ Gươm 3 tiếng", "plan_itinerary"),
+    ("xếp lịch đi chơi Hà Nội cho nhóm bạn 1 ngày", "plan_itinerary"),
+    ("gợi ý chỗ đi chơi cho cặp đôi", "recommend_places"),
+    ("đề xuất địa điểm cho người già", "recommend_places"),
+    ("recommend places for a family with kids", "recommend_places"),
+    ("nên đi đâu khi đi một mình", "recommend_places"),
+    ("gợi ý nơi giá rẻ cho sinh viên", "recommend_places"),
+    ("địa điểm sang trọng phù hợp tiếp khách", "recommend_places"),
+]
+
+
+def _pct(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] if values else 0.0
+
+
+def _evaluate(classify, runs: int) -> dict:
+    predictions, timings = [], []
+    for message, _ in LABELLED:
+        for _ in range(runs):
+            start = time.perf_counter()
+            result = classify(message)
+            timings.append((time.perf_counter() - start) * 1000)
+        predictions.append(result)
+
+    answered = [(p, label) for p, (_, label) in zip(predictions, LABELLED) if p is not None]
+    correct = sum(1 for p, label in answered if p['intent'] == label)
+    errors = Counter((label, p['intent']) for p, label in answered if p['intent'] != label)
+    return {
+        'coverage': len(answered) / len(LABELLED),
+        'accuracy': correct / len(answered) if answered else 0.0,
+        'sources': Counter(p.get('source') for p, _ in answered),
+        'errors': errors,
+        'p50': statistics.median(timings),
+        'p95': _pct(timings, 0.95)
+    }
+
+
+def _print(name: str, result: dict):
+    print(f"\n{name}")
+    print(f"  coverage={result['coverage']:.0%}  accuracy={result['accuracy']:.1%}  "
+          f"p50={result['p50']:.2f}ms  p95={result['p95']:.2f}ms")
+    print(f"  sources: {dict(result['sources'])}")
+    for (label, predicted), count in result['errors'].most_common():
+        print(f"  {label} -> {predicted}: {count}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threshold", type=float, default=float(os.getenv("INTENT_LOCAL_THRESHOLD", 0.8)))
+    parser.add_argument("--runs", type=int, default=5, help="Số lần đo latency mỗi message")
+    parser.add_argument("--no-centroid", action="store_true", help="Chỉ dùng rule")
+    parser.add_argument("--llm", action="store_true", help="Đo thêm LLM classify_intent (tốn API call)")
+    args = parser.parse_args()
+
+    print(f"{len(LABELLED)} labelled messages, threshold={args.threshold}")
+
+    rules = LocalIntentClassifier(INTENT_EXAMPLES, threshold=args.threshold)
+    _print("local: rules", _evaluate(rules.classify, args.runs))
+
+    local = rules
+    if not args.no_centroid:
+        embedder = EmbeddingClient(os.getenv("EMBEDDING_SERVICE_URL", "http://localhost:8972/embed"))
+        vectors = {}
+
+        def embed(texts):
+            # Cache như QdrantPlaceSearch._get_embeddings -> chỉ đo phần classifier
+            missing = [t for t in texts if t not in vectors]
+            if missing:
+                vectors.update(zip(missing, embedder.embed(missing)))
+            return [vectors[t] for t in texts]
+
+        local = LocalIntentClassifier(INTENT_EXAMPLES, embed_fn=embed, threshold=args.threshold)
+        embed([m for m, _ in LABELLED])
+        _print("local: rules + centroid", _evaluate(local.classify, args.runs))
+
+    if args.llm:
+        from app.services.agent_service import agent_router
+
+        _print("llm", _evaluate(agent_router.classify_intent_llm, 1))
+        _print("local -> llm fallback",
+               _evaluate(lambda m: local.classify(m) or agent_router.classify_intent_llm(m), 1))
+
+
+if __name__ == "__main__":
+    main()
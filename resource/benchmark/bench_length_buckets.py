@@ -0,0 +1,104 @@
+"""
+Benchmark: length bucketing khi encode batch hỗn hợp query ngắn + chunk dài
+Dùng phân bố độ dài chunk thật của wiki_info_clean.json (chunk_text như lúc
+ingest) trộn với tên địa điểm trong CSV, so sánh pad cả batch tới text dài
+nhất với encode theo bucket độ dài
+
+Chạy: python resource/benchmark/bench_length_buckets.py --batches 10 --batch-size 32
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# Script ingest chạy phẳng trong resource/test_db (`python save_to_qdrant.py`)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'test_db'))
+
+import save_to_qdrant  # noqa: E402
+from save_to_qdrant import VietnameseEmbeddingModel  # noqa: E402
+
+WIKI_PATH = "resource/data/wiki_info_clean.json"
+CSV_PATH = "resource/data/hanoi_places_osm_filtered_full_row.csv"
+
+
+def _load_chunks(model: VietnameseEmbeddingModel, max_docs: int) -> list:
+    # chunk_text dùng biến global embedding_model của script ingest
+    save_to_qdrant.embedding_model = model
+    with open(WIKI_PATH, encoding="utf-8") as f:
+        docs = json.load(f)
+
+    chunks = []
+    for doc in docs[:max_docs]:
+        content = doc.get("content") or ""
+        if len(content.strip()) >= 10:
+            chunks.extend(save_to_qdrant.chunk_text(content))
+    return chunks
+
+
+def _percentiles(values: list) -> str:
+    values = sorted(values)
+    pick = lambda q: values[min(len(values) - 1, int(len(values) * q))]
+    return f"p50={pick(0.5)} p90={pick(0.9)} p99={pick(0.99)} max={values[-1]}"
+
+
+def _encode_all(model: VietnameseEmbeddingModel, batches: list, max_batch_tokens) -> tuple:
+    model.max_batch_tokens = max_batch_tokens
+    model.encode(batches[0][:2])  # warm-up
+
+    vectors = []
+    start = time.process_time()
+    wall = time.perf_counter()
+    for batch in batches:
+        vectors.extend(model.encode(batch))
+    return vectors, time.process_time() - start, time.perf_counter() - wall
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batches", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--query-ratio", type=float, default=0.75,
+                        help="Tỉ lệ query ngắn (tên địa điểm) trong mỗi batch")
+    parser.add_argument("--max-docs", type=int, default=100)
+    parser.add_argument("--max-batch-tokens", type=int, default=8192)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    model = VietnameseEmbeddingModel(max_batch_tokens=None)
+    chunks = _load_chunks(model, args.max_docs)
+    queries = pd.read_csv(CSV_PATH)['name'].dropna().astype(str).tolist()
+
+    chunk_lengths = [len(model.tokenizer(c)["input_ids"]) for c in chunks]
+    print(f"{len(chunks)} wiki chunks, token length {_percentiles(chunk_lengths)}")
+
+    n_queries = int(args.batch_size * args.query_ratio)
+    batches = []
+    for _ in range(args.batches):
+        batch = random.sample(queries, n_queries) + random.sample(chunks, args.batch_size - n_queries)
+        random.shuffle(batch)
+        batches.append(batch)
+
+    padded, padded_cpu, padded_wall = _encode_all(model, batches, None)
+    bucketed, bucketed_cpu, bucketed_wall = _encode_all(model, batches, args.max_batch_tokens)
+
+    a = np.asarray(padded)
+    b = np.asarray(bucketed)
+    cosine = (a * b).sum(axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+
+    print(f"\n{args.batches} batches x {args.batch_size} texts ({n_queries} queries/batch)")
+    print(f"padded    cpu={padded_cpu:8.2f}s  wall={padded_wall:8.2f}s")
+    print(f"bucketed  cpu={bucketed_cpu:8.2f}s  wall={bucketed_wall:8.2f}s")
+    print(f"cpu time reduction: {padded_cpu / bucketed_cpu:.2f}x")
+    print(f"cosine(padded, bucketed): min={cosine.min():.6f} mean={statistics.mean(cosine.tolist()):.6f}")
+
+
+if __name__ == "__main__":
+    main()
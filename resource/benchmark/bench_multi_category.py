@@ -0,0 +1,82 @@
+"""
+Benchmark: find_places_by_multiple_categories
+So sánh N query tuần tự (1 session + 1 query cho mỗi nhóm) với 1 câu Cypher batched
+
+Chạy: python resource/benchmark/bench_multi_category.py --runs 50
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+# Chạy như script từ thư mục gốc repo: thêm project root vào sys.path
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from app.database.neo4j import Neo4jSpatialQuery
+
+CATEGORY_GROUPS = [
+    ['restaurant', 'cafe'],
+    ['museum', 'gallery', 'historical'],
+    ['shopping', 'market']
+]
+
+
+def _time_calls(fn, runs: int) -> list:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def _report(label: str, timings: list):
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1] if len(timings) >= 20 else timings[-1]
+    print(f"{label:<12} mean={statistics.mean(timings):8.2f}ms  "
+          f"p50={statistics.median(timings):8.2f}ms  p95={p95:8.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lat", type=float, default=21.0285)
+    parser.add_argument("--lon", type=float, default=105.8542)
+    parser.add_argument("--radius", type=int, default=3000)
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    with Neo4jSpatialQuery() as query:
+        def sequential():
+            return query.find_places_by_multiple_categories(
+                args.lat, args.lon, CATEGORY_GROUPS, args.radius, args.limit, batched=False
+            )
+
+        def batched():
+            return query.find_places_by_multiple_categories(
+                args.lat, args.lon, CATEGORY_GROUPS, args.radius, args.limit, batched=True
+            )
+
+        # Warm-up + kiểm tra 2 cách trả về cùng tập place_id
+        seq_result, batch_result = sequential(), batched()
+        for name in seq_result:
+            seq_ids = {p['place_id'] for p in seq_result[name]}
+            batch_ids = {p['place_id'] for p in batch_result.get(name, [])}
+            status = "OK" if seq_ids == batch_ids else "DIFF (ties at limit boundary?)"
+            print(f"  {name}: {len(seq_ids)} places -> {status}")
+
+        print(f"\n{len(CATEGORY_GROUPS)} groups, radius={args.radius}m, limit={args.limit}, runs={args.runs}")
+        seq_timings = _time_calls(sequential, args.runs)
+        batch_timings = _time_calls(batched, args.runs)
+
+        _report("sequential", seq_timings)
+        _report("batched", batch_timings)
+        print(f"speedup: {statistics.mean(seq_timings) / statistics.mean(batch_timings):.2f}x")
+
+
+if __name__ == "__main__":
+    main()
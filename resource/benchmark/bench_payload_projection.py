@@ -0,0 +1,76 @@
+"""
+Benchmark: payload projection (PayloadSelectorInclude) cho từng endpoint
+So sánh kích thước payload (JSON bytes) và thời gian search + deserialize
+giữa with_payload=True và chỉ lấy các field endpoint đó đọc
+
+Chạy: python resource/benchmark/bench_payload_projection.py --runs 20
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+# Chạy như script từ thư mục gốc repo: thêm project root vào sys.path
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from app.database.qdrant import QdrantPlaceSearch
+from app.database.qdrant.main import DETAIL_FIELDS, CARD_FIELDS, COMPARE_FIELDS, NAME_FIELDS
+
+# endpoint -> (payload_fields, top_k) giống main_service
+ENDPOINTS = {
+    'place_info': (DETAIL_FIELDS, 2),
+    'semantic_search': (CARD_FIELDS, 20),
+    'compare_places': (COMPARE_FIELDS, 1),
+    'recommend_places': (NAME_FIELDS, 10),
+}
+
+QUERIES = [
+    "Hồ Gươm",
+    "Lăng Chủ tịch Hồ Chí Minh",
+    "Văn Miếu Quốc Tử Giám",
+    "chùa cổ yên tĩnh",
+    "bảo tàng lịch sử",
+    "quán cafe lãng mạn view đẹp",
+]
+
+
+def _measure(search: QdrantPlaceSearch, fields, top_k: int, runs: int) -> dict:
+    sizes, timings = [], []
+    for i in range(runs):
+        query = QUERIES[i % len(QUERIES)]
+        # Embedding đã cache sau lượt đầu -> chỉ đo Qdrant search + deserialize
+        search._get_embedding(query)
+        start = time.perf_counter()
+        results = search.search_place_details(query, top_k=top_k, payload_fields=fields)
+        timings.append((time.perf_counter() - start) * 1000)
+        sizes.append(len(json.dumps([r['payload'] for r in results], ensure_ascii=False).encode('utf-8')))
+    return {'bytes': statistics.mean(sizes), 'ms': statistics.median(timings)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    search = QdrantPlaceSearch(
+        qdrant_url=os.getenv("QDRANT_HOST", "localhost"),
+        qdrant_port=int(os.getenv("QDRANT_PORT", 6333)),
+        collection_name=os.getenv("QDRANT_COLLECTION", "map_assistant_v2")
+    )
+
+    print(f"\n{'endpoint':<18}{'full bytes':>12}{'proj bytes':>12}{'saved':>8}{'full ms':>10}{'proj ms':>10}")
+    for name, (fields, top_k) in ENDPOINTS.items():
+        full = _measure(search, None, top_k, args.runs)
+        projected = _measure(search, fields, top_k, args.runs)
+        saved = 1 - projected['bytes'] / full['bytes'] if full['bytes'] else 0.0
+        print(f"{name:<18}{full['bytes']:>12.0f}{projected['bytes']:>12.0f}{saved:>7.0%}"
+              f"{full['ms']:>10.2f}{projected['ms']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Benchmark: recall@k vs latency cho các cấu hình HNSW / quantization
+Copy vector thật của collection wiki (map_assistant_v2) sang các collection
+tạm với từng cấu hình, dùng search exact trên collection gốc làm ground truth.
+Query = tiêu đề + câu đầu summary của wiki_info_clean.json (qua embedding service)
+
+Chạy: python resource/benchmark/bench_qdrant_recall.py --queries 100 --k 10
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+from qdrant_client import QdrantClient
+from qdrant_client.models import (
+    Distance, VectorParams, HnswConfigDiff, OptimizersConfigDiff, PointStruct, SearchParams
+)
+
+# Chạy như script từ thư mục gốc repo: thêm project root vào sys.path
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from app.database.qdrant.collection import COLLECTION_NAME, VECTOR_SIZE, quantization_config, search_params
+from app.database.qdrant.embedding_client import EmbeddingClient
+
+WIKI_PATH = "resource/data/wiki_info_clean.json"
+
+# (m, ef_construct, quantization)
+BUILD_CONFIGS = [
+    (16, 100, "none"),
+    (16, 200, "none"),
+    (16, 200, "int8"),
+    (32, 256, "int8"),
+]
+HNSW_EFS = [32, 64, 128, 256]
+
+
+def _load_points(client: QdrantClient, collection_name: str) -> list:
+    points, offset = [], None
+    while True:
+        batch, offset = client.scroll(
+            collection_name=collection_name, limit=256, offset=offset,
+            with_payload=False, with_vectors=True
+        )
+        points.extend(batch)
+        if offset is None:
+            return points
+
+
+def _load_queries(n: int) -> list:
+    with open(WIKI_PATH, encoding="utf-8") as f:
+        docs = json.load(f)
+    queries = []
+    for doc in docs[:n]:
+        summary = (doc.get("summary") or "").split(". ")[0]
+        queries.append(f"{doc.get('title', '')}. {summary}".strip())
+    return queries
+
+
+def _build(client: QdrantClient, name: str, points: list, m: int, ef_construct: int, quantization: str):
+    client.recreate_collection(
+        collection_name=name,
+        vectors_config=VectorParams(size=VECTOR_SIZE, distance=Distance.COSINE),
+        # full_scan_threshold / indexing_threshold nhỏ để corpus nhỏ vẫn đi qua HNSW
+        hnsw_config=HnswConfigDiff(m=m, ef_construct=ef_construct, full_scan_threshold=10),
+        optimizers_config=OptimizersConfigDiff(indexing_threshold=0, default_segment_number=2),
+        quantization_config=quantization_config(quantization)
+    )
+    for i in range(0, len(points), 256):
+        client.upsert(
+            collection_name=name,
+            points=[PointStruct(id=p.id, vector=p.vector) for p in points[i:i + 256]],
+            wait=True
+        )
+    # Chờ optimizer build xong HNSW
+    while client.get_collection(name).status != "green":
+        time.sleep(0.5)
+
+
+def _run(client: QdrantClient, name: str, vectors: list, truth: list, k: int, params: SearchParams) -> dict:
+    recalls, timings = [], []
+    for vector, expected in zip(vectors, truth):
+        start = time.perf_counter()
+        hits = client.search(collection_name=name, query_vector=vector, limit=k,
+                             search_params=params, with_payload=False)
+        timings.append((time.perf_counter() - start) * 1000)
+        recalls.append(len({h.id for h in hits} & expected) / max(1, len(expected)))
+    timings.sort()
+    return {
+        'recall': statistics.mean(recalls),
+        'p50': statistics.median(timings),
+        'p95': timings[max(0, int(len(timings) * 0.95) - 1)]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--collection", default=COLLECTION_NAME)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--keep", action="store_true", help="Không xóa collection tạm")
+    args = parser.parse_args()
+
+    client = QdrantClient(host=os.getenv("QDRANT_HOST", "localhost"), port=int(os.getenv("QDRANT_PORT", 6333)))
+    embedder = EmbeddingClient(os.getenv("EMBEDDING_SERVICE_URL", "http://localhost:8972/embed"))
+
+    points = _load_points(client, args.collection)
+    queries = _load_queries(args.queries)
+    vectors = []
+    for i in range(0, len(queries), 16):
+        vectors.extend(embedder.embed(queries[i:i + 16]))
+    print(f"{len(points)} vectors, {len(queries)} queries, k={args.k}")
+
+    truth = [
+        {h.id for h in client.search(collection_name=args.collection, query_vector=v, limit=args.k,
+                                     search_params=SearchParams(exact=True), with_payload=False)}
+        for v in vectors
+    ]
+
+    print(f"\n{'m':>4}{'ef_c':>6}{'quant':>7}{'ef':>6}{'rescore':>9}{'recall@k':>10}{'p50 ms':>9}{'p95 ms':>9}")
+    for m, ef_construct, quantization in BUILD_CONFIGS:
+        name = f"{args.collection}_bench_m{m}_ef{ef_construct}_{quantization}"
+        _build(client, name, points, m, ef_construct, quantization)
+        rescores = [True, False] if quantization != "none" else [True]
+        for hnsw_ef in HNSW_EFS:
+            for rescore in rescores:
+                result = _run(client, name, vectors, truth, args.k, search_params(hnsw_ef=hnsw_ef, rescore=rescore))
+                print(f"{m:>4}{ef_construct:>6}{quantization:>7}{hnsw_ef:>6}{str(rescore):>9}"
+                      f"{result['recall']:>10.4f}{result['p50']:>9.2f}{result['p95']:>9.2f}")
+        if not args.keep:
+            client.delete_collection(name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Token-aware chunker cho ingest wiki (save_to_qdrant.py)
+
+Chunker cũ tokenize lại toàn bộ chunk đang tích lũy sau mỗi câu (O(n²) trên
+bài dài). TokenChunker tokenize mỗi câu đúng 1 lần (1 lời gọi batch), cộng dồn
+số token và chỉ tokenize chính xác cả chunk khi ước lượng đã sát max_tokens,
+nên với overlap_tokens=0 + splitter="legacy" kết quả giống hệt chunker cũ.
+"""
+
+from typing import List, Optional
+import re
+
+# Sai số tối đa (token) giả định cho mỗi lần nối 2 câu khi cộng dồn: khoảng
+# trắng cuối câu trước được gộp vào token đầu câu sau
+JOIN_SLACK = 2
+
+# Viết tắt hay gặp trong wiki tiếng Việt - dấu chấm sau chúng không kết thúc câu
+ABBREVIATIONS = {
+    "tp.", "tt.", "q.", "p.", "h.", "x.", "tx.", "st.", "dr.", "mr.", "ms.",
+    "gs.", "pgs.", "ts.", "ths.", "bs.", "ks.", "ng.", "v.v.", "vd.", "tr.",
+    "tcn.", "cn.", "sđd.", "no.", "vol.",
+}
+
+_BOUNDARY = re.compile(r'[.!?…]+["”’)\]]*(?P<space>[ \t]+)|(?P<nl>[ \t]*\n\s*)')
+_OPENERS = set('"“‘([=')
+
+SPLITTERS = ("legacy", "vi")
+
+
+def split_legacy(text: str) -> List[str]:
+    """Tách như chunker cũ: split('. ') và nối lại '. ' vào cuối mỗi câu"""
+    return [sentence + ". " for sentence in text.split(". ")]
+
+
+def split_vi(text: str) -> List[str]:
+    """
+    Tách câu tiếng Việt: sau . ! ? … (kèm dấu đóng ngoặc/nháy) + khoảng trắng
+    + chữ hoa/số/mở ngoặc, hoặc xuống dòng. Không tách sau viết tắt (TP., GS.,
+    v.v.) và chữ cái viết tắt tên riêng. Các piece nối lại đúng bằng text gốc.
+    """
+    pieces, last = [], 0
+    for match in _BOUNDARY.finditer(text):
+        end = match.end()
+        if match.group('nl') is None:
+            next_char = text[end:end + 1]
+            if not next_char or not (next_char.isupper() or next_char.isdigit() or next_char in _OPENERS):
+                continue
+            words = text[last:match.start()].split()
+            word = words[-1].lower() if words else ""
+            if text[match.start()] == "." and (word + "." in ABBREVIATIONS or (len(word) == 1 and word.isalpha())):
+                continue
+        pieces.append(text[last:end])
+        last = end
+
+    if last < len(text):
+        pieces.append(text[last:])
+    return pieces
+
+
+def legacy_chunk_text(text: str, tokenizer, max_tokens: int = 1024, min_remaining_tokens: int = 96) -> List[str]:
+    """Chunker cũ (tokenize lại cả chunk mỗi câu) - giữ làm chuẩn cho regression test"""
+    count_tokens = lambda t: len(tokenizer(t)["input_ids"])
+    sentences = text.split(". ")
+    chunks, current_chunk = [], ""
+
+    for sentence in sentences:
+        candidate_chunk = current_chunk + sentence + ". "
+        if count_tokens(candidate_chunk) <= max_tokens:
+            current_chunk = candidate_chunk
+        else:
+            if current_chunk:
+                chunks.append(current_chunk.strip())
+            current_chunk = sentence + ". "
+
+    if current_chunk and count_tokens(current_chunk) >= min_remaining_tokens:
+        chunks.append(current_chunk.strip())
+
+    return chunks
+
+
+class TokenChunker:
+    """Chunk text theo số token (kèm special tokens, giống count_tokens cũ)"""
+
+    def __init__(
+        self,
+        tokenizer,
+        max_tokens: int = 1024,
+        min_remaining_tokens: int = 96,
+        overlap_tokens: int = 0,
+        splitter: str = "legacy"
+    ):
+        """
+        Args:
+            tokenizer: HuggingFace tokenizer của model embedding
+            max_tokens: Số token tối đa mỗi chunk
+            min_remaining_tokens: Chunk cuối ngắn hơn ngưỡng này bị bỏ
+            overlap_tokens: Số token (tính theo câu trọn vẹn) lặp lại từ cuối chunk trước
+            splitter: "legacy" (split '. ' như cũ) hoặc "vi" (tách câu tiếng Việt)
+        """
+        if splitter not in SPLITTERS:
+            raise ValueError(f"Unknown splitter '{splitter}', expected one of {SPLITTERS}")
+
+        self.tokenizer = tokenizer
+        self.max_tokens = max_tokens
+        self.min_remaining_tokens = min_remaining_tokens
+        self.overlap_tokens = overlap_tokens
+        self.split = split_legacy if splitter == "legacy" else split_vi
+        # Số special token (<s>, </s>) mà mỗi lần tokenize đều cộng thêm
+        self.special_tokens = self.count("")
+
+    def count(self, text: str) -> int:
+        return len(self.tokenizer(text)["input_ids"])
+
+    def chunk(self, text: str) -> List[str]:
+        pieces = self.split(text)
+        if not pieces:
+            return []
+
+        # Mỗi câu tokenize đúng 1 lần
+        lengths = [len(ids) for ids in self.tokenizer(pieces)["input_ids"]]
+
+        chunks = self._chunk_incremental(pieces, lengths)
+        if chunks is None:
+            # Giả định sai số khi cộng dồn bị vi phạm -> chạy lại bản chính xác
+            chunks = self._chunk_exact(pieces, lengths)
+        return chunks
+
+    def _overlap_start(self, start: int, end: int, lengths: List[int]) -> int:
+        """Index câu đầu tiên của phần overlap lấy từ cuối pieces[start:end]"""
+        if self.overlap_tokens <= 0:
+            return end
+        budget, j = self.overlap_tokens, end
+        while j > start + 1:
+            cost = lengths[j - 1] - self.special_tokens
+            if cost > budget:
+                break
+            budget -= cost
+            j -= 1
+        return j
+
+    def _chunk_incremental(self, pieces: List[str], lengths: List[int]) -> Optional[List[str]]:
+        chunks = []
+        start = end = 0          # current chunk = pieces[start:end]
+        overlap_end = 0          # pieces[start:overlap_end] là overlap từ chunk trước
+        estimate, slack = 0, 0   # số token ước lượng của current + sai số tích lũy tối đa
+        i = 0
+
+        while i < len(pieces):
+            if end == start:
+                # Chunk rỗng: luôn nhận câu đầu tiên (kể cả khi dài hơn max_tokens)
+                end = i + 1
+                estimate, slack = lengths[i], 0
+                i += 1
+                continue
+
+            guess = estimate + lengths[i] - self.special_tokens
+            if guess + slack + JOIN_SLACK <= self.max_tokens:
+                end = i + 1
+                estimate, slack = guess, slack + JOIN_SLACK
+                i += 1
+                continue
+
+            # Sát ngưỡng: đếm chính xác
+            exact = self.count("".join(pieces[start:i + 1]))
+            if exact <= self.max_tokens:
+                end = i + 1
+                estimate, slack = exact, 0
+                i += 1
+                continue
+
+            current = "".join(pieces[start:end])
+            if slack and self.count(current) > self.max_tokens:
+                return None
+
+            if end > overlap_end:
+                chunks.append(current.strip())
+                start = self._overlap_start(start, end, lengths)
+            else:
+                # Chỉ còn phần overlap mà vẫn không chứa nổi câu tiếp theo -> bỏ overlap
+                start = end
+            overlap_end = end
+
+            if start < end:
+                estimate, slack = self.count("".join(pieces[start:end])), 0
+
+        if end > overlap_end:
+            current = "".join(pieces[start:end])
+            if current and self.count(current) >= self.min_remaining_tokens:
+                chunks.append(current.strip())
+
+        return chunks
+
+    def _chunk_exact(self, pieces: List[str], lengths: List[int]) -> List[str]:
+        chunks = []
+        start = end = overlap_end = 0
+
+        i = 0
+        while i < len(pieces):
+            if end == start or self.count("".join(pieces[start:i + 1])) <= self.max_tokens:
+                end = i + 1
+                i += 1
+                continue
+
+            if end > overlap_end:
+                chunks.append("".join(pieces[start:end]).strip())
+                start = self._overlap_start(start, end, lengths)
+            else:
+                start = end
+            overlap_end = end
+
+        if end > overlap_end:
+            current = "".join(pieces[start:end])
+            if current and self.count(current) >= self.min_remaining_tokens:
+                chunks.append(current.strip())
+
+        return chunks
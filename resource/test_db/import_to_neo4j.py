@@ -4,12 +4,64 @@ Supports Phase 1 features: opening_hours, price_range, contact info, multilingua
 """
 
 from neo4j import GraphDatabase
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
+import argparse
+import hashlib
 import os
+import time
 from typing import Dict, List
 import json
 
 
+# ==================== BULK IMPORT QUERIES ====================
+
+BULK_MERGE_PLACES_QUERY = """
+UNWIND $rows AS row
+MERGE (p:Place {place_id: row.place_id})
+SET p += row.props,
+    p.location = CASE
+        WHEN row.props.lat IS NULL OR row.props.lon IS NULL THEN null
+        ELSE point({latitude: row.props.lat, longitude: row.props.lon})
+    END
+"""
+
+SYNC_UPSERT_PLACES_QUERY = """
+UNWIND $rows AS row
+MERGE (p:Place {place_id: row.place_id})
+SET p = row.props,
+    p.location = CASE
+        WHEN row.props.lat IS NULL OR row.props.lon IS NULL THEN null
+        ELSE point({latitude: row.props.lat, longitude: row.props.lon})
+    END
+WITH p
+OPTIONAL MATCH (p)-[r:HAS_CATEGORY|IN_DISTRICT]->()
+DELETE r
+"""
+
+SYNC_DELETE_PLACES_QUERY = """
+UNWIND $place_ids AS place_id
+MATCH (p:Place {place_id: place_id})
+DETACH DELETE p
+"""
+
+BULK_LINK_CATEGORIES_QUERY = """
+UNWIND $rows AS row
+MATCH (p:Place {place_id: row.place_id})
+UNWIND row.categories AS category
+MATCH (c:Category {name: category})
+MERGE (p)-[:HAS_CATEGORY]->(c)
+"""
+
+BULK_LINK_DISTRICTS_QUERY = """
+UNWIND $rows AS row
+WITH row WHERE row.district_code IS NOT NULL
+MATCH (p:Place {place_id: row.place_id})
+MATCH (d:District {code: row.district_code})
+MERGE (p)-[:IN_DISTRICT]->(d)
+"""
+
+
 class Neo4jImporter:
     """Import place data from CSV to Neo4j with Phase 1 enhancements"""
     
@@ -32,8 +84,12 @@ class Neo4jImporter:
             constraints = [
                 "CREATE CONSTRAINT place_id IF NOT EXISTS FOR (p:Place) REQUIRE p.place_id IS UNIQUE",
                 "CREATE CONSTRAINT category_name IF NOT EXISTS FOR (c:Category) REQUIRE c.name IS UNIQUE",
+                "CREATE CONSTRAINT district_code IF NOT EXISTS FOR (d:District) REQUIRE d.code IS UNIQUE",
                 "CREATE INDEX place_name IF NOT EXISTS FOR (p:Place) ON (p.name)",
                 "CREATE INDEX place_location IF NOT EXISTS FOR (p:Place) ON (p.location)",
+                # Full-text index cho landmark resolver (không phân biệt dấu)
+                "CREATE FULLTEXT INDEX place_name_fulltext IF NOT EXISTS FOR (p:Place) ON EACH [p.name, p.alt_names] "
+                "OPTIONS {indexConfig: {`fulltext.analyzer`: 'standard-folding'}}",
             ]
             
             print("Creating constraints and indexes...")
@@ -88,8 +144,27 @@ class Neo4jImporter:
     
     def _import_single_place(self, session, row):
         """Import a single place with all Phase 1 features"""
+        place_props = self._place_props(row)
         
-        # Prepare place properties
+        # Create Place node with location point
+        query = """
+        MERGE (p:Place {place_id: $place_id})
+        SET p += $props,
+            p.location = point({latitude: $lat, longitude: $lon})
+        """
+        
+        session.run(query, place_id=place_props['place_id'], 
+                   props=place_props, 
+                   lat=place_props['lat'], 
+                   lon=place_props['lon'])
+        
+        # Import categories + subcategories
+        for category in self._row_categories(row):
+            self._link_category(session, place_props['place_id'], category)
+    
+    @staticmethod
+    def _place_props(row) -> Dict:
+        """Build Place properties from a CSV row"""
         place_props = {
             'place_id': str(row['place_id']),
             'osm_id': str(row.get('osm_id', '')),
@@ -102,6 +177,9 @@ class Neo4jImporter:
         if pd.notna(row.get('address')):
             place_props['address'] = str(row['address'])
         
+        if pd.notna(row.get('alt_names')):
+            place_props['alt_names'] = str(row['alt_names'])
+        
         # Phase 1 fields
         if pd.notna(row.get('opening_hours')):
             place_props['opening_hours'] = str(row['opening_hours'])
@@ -145,31 +223,17 @@ class Neo4jImporter:
         if pd.notna(row.get('wheelchair')):
             place_props['wheelchair'] = str(row['wheelchair'])
         
-        # Create Place node with location point
-        query = """
-        MERGE (p:Place {place_id: $place_id})
-        SET p += $props,
-            p.location = point({latitude: $lat, longitude: $lon})
-        """
-        
-        session.run(query, place_id=place_props['place_id'], 
-                   props=place_props, 
-                   lat=place_props['lat'], 
-                   lon=place_props['lon'])
-        
-        # Import categories
-        categories_str = row.get('categories', '')
-        if pd.notna(categories_str) and categories_str:
-            categories = [c.strip() for c in str(categories_str).split(',') if c.strip()]
-            for category in categories:
-                self._link_category(session, place_props['place_id'], category)
-        
-        # Import subcategories
-        subcategories_str = row.get('subcategories', '')
-        if pd.notna(subcategories_str) and subcategories_str:
-            subcategories = [c.strip() for c in str(subcategories_str).split(',') if c.strip()]
-            for subcategory in subcategories:
-                self._link_category(session, place_props['place_id'], subcategory)
+        return place_props
+    
+    @staticmethod
+    def _row_categories(row) -> List[str]:
+        """Categories + subcategories of a CSV row (comma separated)"""
+        categories = []
+        for column in ('categories', 'subcategories'):
+            value = row.get(column, '')
+            if pd.notna(value) and value:
+                categories += [c.strip() for c in str(value).split(',') if c.strip()]
+        return categories
     
     def _link_category(self, session, place_id: str, category: str):
         """Link place to category"""
@@ -180,6 +244,198 @@ class Neo4jImporter:
         """
         session.run(query, place_id=place_id, category=category)
     
+    # ==================== BULK IMPORT ====================
+    
+    @classmethod
+    def _bulk_row(cls, row) -> Dict:
+        """Convert a CSV row to the parameter map used by the UNWIND queries"""
+        props = cls._place_props(row)
+        # NaN is not a valid coordinate - leave location unset instead
+        for key in ('lat', 'lon'):
+            if pd.isna(props[key]):
+                props[key] = None
+        
+        district_code = row.get('district_code')
+        bulk_row = {
+            'place_id': props['place_id'],
+            'props': props,
+            'categories': list(dict.fromkeys(cls._row_categories(row))),
+            'district_code': str(district_code) if pd.notna(district_code) and district_code else None
+        }
+        # Hash stored on the node so sync_places_from_csv can skip unchanged rows
+        props['content_hash'] = cls._content_hash(bulk_row)
+        return bulk_row
+    
+    @staticmethod
+    def _content_hash(bulk_row: Dict) -> str:
+        """SHA-1 of place props + categories + district (without the hash itself)"""
+        content = {
+            'props': {k: v for k, v in bulk_row['props'].items() if k != 'content_hash'},
+            'categories': sorted(bulk_row['categories']),
+            'district_code': bulk_row['district_code']
+        }
+        payload = json.dumps(content, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+    
+    def _merge_lookup_nodes(self, rows: List[Dict]):
+        """Create every Category/District up front so workers only MATCH them"""
+        categories = sorted({c for row in rows for c in row['categories']})
+        districts = sorted({row['district_code'] for row in rows if row['district_code']})
+        
+        def _write(tx):
+            tx.run("UNWIND $names AS name MERGE (:Category {name: name})", names=categories)
+            tx.run("UNWIND $codes AS code MERGE (:District {code: code})", codes=districts)
+        
+        with self.driver.session() as session:
+            session.execute_write(_write)
+        
+        print(f"✓ {len(categories)} categories, {len(districts)} districts")
+    
+    def _write_bulk_batch(self, session, rows: List[Dict]):
+        """Write 1 batch: 1 transaction for Place nodes, 1 for relationships"""
+        session.execute_write(lambda tx: tx.run(BULK_MERGE_PLACES_QUERY, rows=rows).consume())
+        
+        def _link(tx):
+            tx.run(BULK_LINK_CATEGORIES_QUERY, rows=rows).consume()
+            tx.run(BULK_LINK_DISTRICTS_QUERY, rows=rows).consume()
+        
+        session.execute_write(_link)
+    
+    def _import_bulk_range(self, rows: List[Dict], batch_size: int) -> int:
+        """Import a contiguous place_id range (1 session per worker)"""
+        with self.driver.session() as session:
+            for start in range(0, len(rows), batch_size):
+                self._write_bulk_batch(session, rows[start:start + batch_size])
+        return len(rows)
+    
+    def import_places_bulk(self, csv_path: str, batch_size: int = 1000, workers: int = 1) -> Dict:
+        """
+        Bulk import places: each batch is sent as 1 parameter list and written
+        with UNWIND inside explicit write transactions
+        
+        Args:
+            csv_path: Path to CSV file
+            batch_size: Number of rows per UNWIND batch
+            workers: Number of parallel workers, each owns a disjoint place_id range
+        
+        Returns:
+            Dict with rows, batches, seconds and rows_per_sec
+        """
+        print(f"\n📊 Loading CSV: {csv_path}")
+        df = pd.read_csv(csv_path)
+        
+        started = time.perf_counter()
+        rows = [self._bulk_row(row) for _, row in df.iterrows()]
+        rows.sort(key=lambda row: row['place_id'])
+        print(f"Found {len(rows)} places")
+        
+        self._merge_lookup_nodes(rows)
+        
+        # Disjoint place_id ranges -> workers never MERGE the same Place node
+        workers = max(1, min(workers, len(rows)))
+        chunk = -(-len(rows) // workers) if rows else 0
+        ranges = [rows[i:i + chunk] for i in range(0, len(rows), chunk)] if rows else []
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(self._import_bulk_range, part, batch_size) for part in ranges]
+            for future in futures:
+                done = future.result()
+                print(f"✓ Worker imported {done} places")
+        
+        elapsed = time.perf_counter() - started
+        report = {
+            'rows': len(rows),
+            'batches': sum(-(-len(part) // batch_size) for part in ranges),
+            'seconds': round(elapsed, 2),
+            'rows_per_sec': round(len(rows) / elapsed, 1) if elapsed > 0 else 0.0
+        }
+        print(f"\n✅ Bulk import complete! {report['rows']} places in {report['seconds']}s "
+              f"({report['rows_per_sec']} rows/sec, {report['batches']} batches, {workers} workers)")
+        return report
+    
+    # ==================== INCREMENTAL SYNC ====================
+    
+    def _existing_hashes(self) -> Dict[str, str]:
+        """place_id -> content_hash of every Place currently in the graph"""
+        with self.driver.session() as session:
+            result = session.run("MATCH (p:Place) RETURN p.place_id AS place_id, p.content_hash AS content_hash")
+            return {record['place_id']: record['content_hash'] for record in result}
+    
+    def sync_places_from_csv(self, csv_path: str, batch_size: int = 1000) -> Dict:
+        """
+        Incremental sync: only upsert rows whose content hash changed and delete
+        places missing from the CSV. The graph stays online the whole time.
+        
+        Args:
+            csv_path: Path to CSV file
+            batch_size: Number of rows per write transaction
+        
+        Returns:
+            Dict with added, changed, removed, unchanged counts and seconds
+        """
+        print(f"\n📊 Loading CSV: {csv_path}")
+        df = pd.read_csv(csv_path)
+        
+        started = time.perf_counter()
+        rows = {}
+        for _, row in df.iterrows():
+            bulk_row = self._bulk_row(row)
+            rows[bulk_row['place_id']] = bulk_row
+        
+        existing = self._existing_hashes()
+        added = [r for place_id, r in rows.items() if place_id not in existing]
+        changed = [r for place_id, r in rows.items()
+                   if place_id in existing and existing[place_id] != r['props']['content_hash']]
+        removed = sorted(set(existing) - set(rows))
+        
+        upserts = sorted(added + changed, key=lambda row: row['place_id'])
+        if upserts:
+            self._merge_lookup_nodes(upserts)
+        
+        def _upsert(tx, batch):
+            # Node props + relationships replaced in 1 transaction -> readers never
+            # see a place without its categories
+            tx.run(SYNC_UPSERT_PLACES_QUERY, rows=batch).consume()
+            tx.run(BULK_LINK_CATEGORIES_QUERY, rows=batch).consume()
+            tx.run(BULK_LINK_DISTRICTS_QUERY, rows=batch).consume()
+        
+        with self.driver.session() as session:
+            for start in range(0, len(upserts), batch_size):
+                session.execute_write(_upsert, upserts[start:start + batch_size])
+            
+            for start in range(0, len(removed), batch_size):
+                session.execute_write(
+                    lambda tx, ids: tx.run(SYNC_DELETE_PLACES_QUERY, place_ids=ids).consume(),
+                    removed[start:start + batch_size]
+                )
+        
+        report = {
+            'added': len(added),
+            'changed': len(changed),
+            'removed': len(removed),
+            'unchanged': len(rows) - len(added) - len(changed),
+            'seconds': round(time.perf_counter() - started, 2)
+        }
+        print(f"\n✅ Sync complete in {report['seconds']}s: {report['added']} added, "
+              f"{report['changed']} changed, {report['removed']} removed, "
+              f"{report['unchanged']} unchanged")
+        return report
+    
+    def bump_dataset_version(self):
+        """
+        Tăng version dữ liệu - API server so sánh version này để tự xóa
+        result cache sau khi dữ liệu được nạp lại
+        """
+        with self.driver.session() as session:
+            record = session.run("""
+            MERGE (m:DatasetMeta {key: 'places'})
+            SET m.version = coalesce(m.version, 0) + 1,
+                m.updated_at = datetime()
+            RETURN m.version AS version
+            """).single()
+            print(f"✓ Dataset version: {record['version']}")
+            return record['version']
+    
     def get_statistics(self) -> Dict:
         """Get database statistics"""
         with self.driver.session() as session:
@@ -214,6 +470,15 @@ class Neo4jImporter:
 
 def main():
     """Main import workflow"""
+    parser = argparse.ArgumentParser(description="Import places CSV into Neo4j")
+    parser.add_argument("--mode", choices=["single", "bulk", "sync"], default="bulk",
+                        help="single = 1 MERGE per row (legacy), bulk = batched UNWIND, "
+                             "sync = incremental update without clearing the database")
+    parser.add_argument("--batch-size", type=int, default=None,
+                        help="Rows per batch (default: 100 single, 1000 bulk)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Parallel workers for bulk mode")
+    args = parser.parse_args()
     
     # Configuration
     NEO4J_URI = os.getenv("NEO4J_URI", "bolt://localhost:7687")
@@ -241,6 +506,13 @@ def main():
     importer = Neo4jImporter(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD)
     
     try:
+        if args.mode == "sync":
+            importer.create_constraints_and_indexes()
+            report = importer.sync_places_from_csv(csv_to_import, batch_size=args.batch_size or 1000)
+            if report['added'] or report['changed'] or report['removed']:
+                importer.bump_dataset_version()
+            return
+        
         # Ask before clearing
         print("\n⚠️  WARNING: This will clear existing data in Neo4j!")
         response = input("Do you want to continue? (yes/no): ").strip().lower()
@@ -257,7 +529,12 @@ def main():
         print("\n" + "="*80)
         print("  IMPORTING DATA")
         print("="*80)
-        importer.import_places_from_csv(csv_to_import, batch_size=100)
+        if args.mode == "bulk":
+            importer.import_places_bulk(csv_to_import, batch_size=args.batch_size or 1000,
+                                        workers=args.workers)
+        else:
+            importer.import_places_from_csv(csv_to_import, batch_size=args.batch_size or 100)
+        importer.bump_dataset_version()
         
         # Show statistics
         print("\n" + "="*80)
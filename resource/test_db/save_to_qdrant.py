@@ -1,54 +1,203 @@
 import os
+import sys
+import csv
+import hashlib
 import torch
 import uuid
 import json
 import gc
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from tqdm import tqdm
 from typing import List, Dict, Optional
 from transformers import AutoTokenizer, AutoModel
 from qdrant_client import QdrantClient
-from qdrant_client.models import PointStruct, VectorParams
+from qdrant_client.models import (
+    PointStruct, Filter, FieldCondition, MatchValue, FilterSelector, PayloadSelectorInclude
+)
+
+# Ensure project root is on sys.path
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from app.database.qdrant.collection import create_collection, COLLECTION_NAME
+from serve.embed_backends import length_buckets
+
+# chunker.py nằm cạnh script này (resource/ trùng tên module stdlib nên không import theo package)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from chunker import TokenChunker  # noqa: E402
 
 
 class VietnameseEmbeddingModel:
-    def __init__(self, model_name='AITeamVN/Vietnamese_Embedding', max_length=1024):
+    def __init__(self, model_name='AITeamVN/Vietnamese_Embedding', max_length=1024,
+                 max_batch_tokens: Optional[int] = 8192):
+        """
+        Args:
+            max_batch_tokens: Ngưỡng (số text x độ dài max) của mỗi bucket khi
+                encode; None = pad cả batch tới text dài nhất như cũ
+        """
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        self.model_name = model_name
         self.tokenizer = AutoTokenizer.from_pretrained(model_name)
         self.model = AutoModel.from_pretrained(model_name).to(self.device)
         self.model.eval()
         self.max_length = max_length
+        self.max_batch_tokens = max_batch_tokens
+
+    def _forward(self, inputs) -> List[List[float]]:
+        inputs = {k: v.to(self.device) for k, v in inputs.items()}
+        outputs = self.model(**inputs)
+        embeddings = outputs.last_hidden_state[:, 0, :]  # CLS token
+        return embeddings.cpu().tolist()
 
     def encode(self, texts: List[str]) -> List[List[float]]:
         with torch.no_grad():
-            inputs = self.tokenizer(texts, padding=True, truncation=True,
-                                    return_tensors='pt', max_length=self.max_length)
-            inputs = {k: v.to(self.device) for k, v in inputs.items()}
-            outputs = self.model(**inputs)
-            embeddings = outputs.last_hidden_state[:, 0, :]  # CLS token
-            return embeddings.cpu().tolist()
+            if not self.max_batch_tokens or len(texts) == 1:
+                inputs = self.tokenizer(texts, padding=True, truncation=True,
+                                        return_tensors='pt', max_length=self.max_length)
+                return self._forward(inputs)
+
+            # Sort theo số token, mỗi bucket chỉ pad tới text dài nhất của nó
+            encodings = self.tokenizer(texts, truncation=True, max_length=self.max_length)
+            lengths = [len(ids) for ids in encodings['input_ids']]
+
+            embeddings = [None] * len(texts)
+            for bucket in length_buckets(lengths, self.max_batch_tokens):
+                features = [{k: encodings[k][i] for k in encodings.keys()} for i in bucket]
+                inputs = self.tokenizer.pad(features, padding=True, return_tensors='pt')
+                for i, embedding in zip(bucket, self._forward(inputs)):
+                    embeddings[i] = embedding
+            return embeddings
+
 
+def load_place_coordinates(csv_path: str) -> Dict[str, tuple]:
+    """
+    Đọc tọa độ từ CSV OSM: place_id -> (lat, lon)
+    Document wiki có id dạng '<place_id>_<osm_id>' (VD: HN-OSM-0015_N442913494)
+    """
+    coordinates = {}
+    with open(csv_path, encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            try:
+                coordinates[row["place_id"]] = (float(row["lat"]), float(row["lon"]))
+            except (TypeError, ValueError):
+                continue
+    return coordinates
 
-def count_tokens(text: str) -> int:
-    return len(embedding_model.tokenizer(text)["input_ids"])
 
+def place_id_of(doc_id: str) -> str:
+    """'HN-OSM-0015_N442913494' -> 'HN-OSM-0015'"""
+    return doc_id.split("_", 1)[0]
 
-def chunk_text(text: str, max_tokens: int = 1024, min_remaining_tokens: int = 96) -> List[str]:
-    sentences = text.split(". ")
-    chunks, current_chunk = [], ""
 
-    for sentence in sentences:
-        candidate_chunk = current_chunk + sentence + ". "
-        if count_tokens(candidate_chunk) <= max_tokens:
-            current_chunk = candidate_chunk
-        else:
-            if current_chunk:
-                chunks.append(current_chunk.strip())
-            current_chunk = sentence + ". "
+# Namespace cố định cho uuid5: cùng document/chunk/nội dung luôn ra cùng point ID
+POINT_ID_NAMESPACE = uuid.UUID("5b0f7c1e-3f43-4b8e-9a52-0d8e6f1c2a77")
+
+
+def point_id(doc_id: str, chunk_index: int, text: str) -> str:
+    """Point ID deterministic: ingest lại ghi đè đúng point cũ thay vì tạo bản sao"""
+    text_hash = hashlib.sha1(text.encode("utf-8")).hexdigest()
+    return str(uuid.uuid5(POINT_ID_NAMESPACE, f"{doc_id}:{chunk_index}:{text_hash}"))
+
 
-    if current_chunk and count_tokens(current_chunk) >= min_remaining_tokens:
-        chunks.append(current_chunk.strip())
+def document_hash(item: Dict, metadata: Dict, chunk_options: Optional[Dict] = None) -> str:
+    """SHA-1 của content + metadata + tham số chunk (đổi bất kỳ cái nào -> document được ingest lại)"""
+    content = {
+        "content": item.get("content", ""),
+        "metadata": {k: v for k, v in metadata.items() if k != "content_hash"},
+        "chunk_options": chunk_options or {}
+    }
+    payload = json.dumps(content, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
 
-    return chunks
+
+def count_tokens(text: str, tokenizer=None) -> int:
+    tokenizer = tokenizer or embedding_model.tokenizer
+    return len(tokenizer(text)["input_ids"])
+
+
+def chunk_text(text: str, max_tokens: int = 1024, min_remaining_tokens: int = 96,
+               tokenizer=None, overlap_tokens: int = 0, splitter: str = "legacy") -> List[str]:
+    """
+    Chunk text theo số token (TokenChunker: mỗi câu tokenize 1 lần)
+
+    Args:
+        overlap_tokens: Số token lặp lại từ cuối chunk trước (0 = như cũ)
+        splitter: "legacy" (split '. ') hoặc "vi" (tách câu tiếng Việt)
+    """
+    chunker = TokenChunker(
+        tokenizer or embedding_model.tokenizer,
+        max_tokens=max_tokens,
+        min_remaining_tokens=min_remaining_tokens,
+        overlap_tokens=overlap_tokens,
+        splitter=splitter
+    )
+    return chunker.chunk(text)
+
+
+def build_metadata(item: Dict, coordinates: Optional[Dict[str, tuple]] = None) -> Dict:
+    """Metadata của 1 document wiki + tọa độ ghép theo place_id"""
+    doc_id = item["id"]
+    metadata = {
+        "title": item.get("title", ""),
+        "url": item.get("url", ""),
+        "summary": item.get("summary", ""),
+        "images": item.get("images", []),  # Lấy danh sách images
+        "place_id": place_id_of(doc_id)
+    }
+    
+    # Join tọa độ theo place_id
+    if coordinates and metadata["place_id"] in coordinates:
+        metadata["lat"], metadata["lon"] = coordinates[metadata["place_id"]]
+    
+    return metadata
+
+
+def build_payload(text: str, chunk_index: int, doc_id: str, metadata: Dict) -> Dict:
+    """Payload đầy đủ cho 1 chunk"""
+    payload = {
+        # Text chunk
+        "text": text,
+        "chunk_index": chunk_index,
+        
+        # Document info
+        "document_id": doc_id,
+        "title": metadata.get("title", ""),
+        "url": metadata.get("url", ""),
+        "summary": metadata.get("summary", ""),
+        
+        # Images (quan trọng!)
+        "images": metadata.get("images", []),
+        "image_count": len(metadata.get("images", [])),
+        
+        # Additional metadata (optional)
+        "has_images": len(metadata.get("images", [])) > 0
+    }
+    
+    # Thêm các trường tùy chọn nếu có
+    if "categories" in metadata:
+        payload["categories"] = metadata["categories"]
+    
+    if "tags" in metadata:
+        payload["tags"] = metadata["tags"]
+    
+    # Hash của document để ingest lại bỏ qua document không đổi
+    if metadata.get("content_hash"):
+        payload["content_hash"] = metadata["content_hash"]
+    
+    # Tọa độ từ CSV OSM: geo payload cho filter bán kính trong Qdrant
+    if metadata.get("place_id"):
+        payload["place_id"] = metadata["place_id"]
+    if metadata.get("lat") is not None and metadata.get("lon") is not None:
+        payload["lat"] = metadata["lat"]
+        payload["lon"] = metadata["lon"]
+        payload["location"] = {"lat": metadata["lat"], "lon": metadata["lon"]}
+    
+    return payload
 
 
 def save_to_qdrant(
@@ -58,7 +207,7 @@ def save_to_qdrant(
     metadata: Dict
 ):
     """
-    Lưu chunks vào Qdrant với metadata đầy đủ
+    Lưu chunks của 1 document vào Qdrant với metadata đầy đủ (đồng bộ)
     
     Args:
         embedding_model: Model embedding
@@ -79,151 +228,385 @@ def save_to_qdrant(
             print(f" Lỗi: số vectors ({len(vectors)}) != số chunks ({len(chunks)}) cho doc {doc_id}")
             return
         
-        points = []
-        
-        for idx, (vec, txt) in enumerate(zip(vectors, chunks)):
-            # Tạo payload đầy đủ với metadata
-            payload = {
-                # Text chunk
-                "text": txt,
-                "chunk_index": idx,
-                
-                # Document info
-                "document_id": doc_id,
-                "title": metadata.get("title", ""),
-                "url": metadata.get("url", ""),
-                "summary": metadata.get("summary", ""),
-                
-                # Images (quan trọng!)
-                "images": metadata.get("images", []),
-                "image_count": len(metadata.get("images", [])),
-                
-                # Additional metadata (optional)
-                "has_images": len(metadata.get("images", [])) > 0
-            }
-            
-            # Thêm các trường tùy chọn nếu có
-            if "categories" in metadata:
-                payload["categories"] = metadata["categories"]
-            
-            if "tags" in metadata:
-                payload["tags"] = metadata["tags"]
-            
-            points.append(
-                PointStruct(
-                    id=str(uuid.uuid4()),
-                    vector=vec,
-                    payload=payload
-                )
+        points = [
+            PointStruct(
+                id=point_id(doc_id, idx, txt),
+                vector=vec,
+                payload=build_payload(txt, idx, doc_id, metadata)
             )
+            for idx, (vec, txt) in enumerate(zip(vectors, chunks))
+        ]
         
-        client.upsert(collection_name="map_assistant_v2", points=points)
+        client.upsert(collection_name=COLLECTION_NAME, points=points)
         print(f"✓ Saved {len(points)} chunks for doc {doc_id} (images: {len(metadata.get('images', []))})")
         
     except Exception as e:
         print(f" Lỗi khi lưu doc {doc_id} lên Qdrant: {e}")
         import traceback
         traceback.print_exc()
-    finally:
-        if 'vectors' in locals():
-            del vectors
-        if 'points' in locals():
-            del points
-        torch.cuda.empty_cache()
-        gc.collect()
 
 
-def run(path: str, batch_size: int = 8):
+# ==================== RESUME ====================
+
+def existing_document_hashes(qdrant_client: QdrantClient, collection_name: str = COLLECTION_NAME) -> Dict[str, str]:
+    """document_id -> content_hash của mọi document đang có trong collection"""
+    hashes, offset = {}, None
+    while True:
+        points, offset = qdrant_client.scroll(
+            collection_name=collection_name,
+            limit=1024,
+            offset=offset,
+            with_payload=PayloadSelectorInclude(include=["document_id", "content_hash"]),
+            with_vectors=False
+        )
+        for point in points:
+            payload = point.payload or {}
+            if payload.get("document_id"):
+                hashes[payload["document_id"]] = payload.get("content_hash")
+        if offset is None:
+            return hashes
+
+
+def delete_stale_points(qdrant_client: QdrantClient, doc_id: str, content_hash: str,
+                        collection_name: str = COLLECTION_NAME):
+    """Xóa point của doc_id thuộc phiên bản cũ (content_hash khác) - không đụng point mới"""
+    qdrant_client.delete(
+        collection_name=collection_name,
+        points_selector=FilterSelector(filter=Filter(
+            must=[FieldCondition(key="document_id", match=MatchValue(value=doc_id))],
+            must_not=[FieldCondition(key="content_hash", match=MatchValue(value=content_hash))]
+        )),
+        wait=True
+    )
+
+
+def load_checkpoint(checkpoint_path: str, source: str, documents: int) -> int:
+    """
+    Đọc checkpoint của lần ingest trước
+
+    Returns:
+        Vị trí document cuối cùng đã upsert xong (-1 nếu không có checkpoint
+        hoặc checkpoint thuộc file/số document khác)
     """
-    Xử lý file JSON và lưu vào Qdrant với metadata đầy đủ
+    if not checkpoint_path or not os.path.exists(checkpoint_path):
+        return -1
+    with open(checkpoint_path, "r", encoding="utf-8") as f:
+        state = json.load(f)
+    if state.get("source") != os.path.abspath(source) or state.get("documents") != documents:
+        print(f"  Checkpoint {checkpoint_path} thuộc lần chạy khác, bỏ qua")
+        return -1
+    return state.get("completed_through", -1)
+
+
+def save_checkpoint(checkpoint_path: str, state: Dict):
+    """Ghi checkpoint atomic (file tạm + rename) để crash giữa chừng không làm hỏng file"""
+    tmp_path = f"{checkpoint_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, checkpoint_path)
+
+
+# ==================== PIPELINE ====================
+
+# Chunker riêng của mỗi process chunking
+_worker_chunker = None
+
+
+def _init_chunk_worker(model_name: str, overlap_tokens: int = 0, splitter: str = "legacy"):
+    global _worker_chunker
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+    _worker_chunker = TokenChunker(
+        AutoTokenizer.from_pretrained(model_name),
+        overlap_tokens=overlap_tokens,
+        splitter=splitter
+    )
+
+
+def _chunk_document(item: Dict) -> Optional[Dict]:
+    """
+    Stage 1 (process pool): kiểm tra + chunk 1 document
+
+    Returns:
+        {'id', 'chunks', 'tokens'} hoặc None nếu document bị bỏ qua
+    """
+    doc_id = item.get("id")
+    text_content = item.get("content", "")
+    
+    # Bỏ qua document không có ID, content không hợp lệ hoặc quá ngắn
+    if not doc_id or not text_content or not isinstance(text_content, str):
+        return None
+    if len(text_content.strip()) < 10:
+        return None
+    
+    chunks = _worker_chunker.chunk(text_content)
+    if not chunks:
+        return None
+    
+    return {
+        "id": doc_id,
+        "chunks": chunks,
+        "tokens": [_worker_chunker.count(chunk) for chunk in chunks]
+    }
+
+
+def _iter_chunked(data: List[Dict], workers: int, model_name: str, max_inflight: int,
+                  overlap_tokens: int = 0, splitter: str = "legacy"):
+    """Chunk song song, giữ thứ tự document, tối đa max_inflight document đang chờ"""
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_chunk_worker,
+                             initargs=(model_name, overlap_tokens, splitter)) as executor:
+        inflight = deque()
+        for item in data:
+            inflight.append((item, executor.submit(_chunk_document, item)))
+            if len(inflight) >= max_inflight:
+                item, future = inflight.popleft()
+                yield item, future.result()
+        while inflight:
+            item, future = inflight.popleft()
+            yield item, future.result()
+
+
+class _Upserter(threading.Thread):
+    """
+    Stage 3: upsert lên Qdrant trên background thread, nhận batch qua queue có giới hạn.
+    Sau mỗi batch upsert thành công ghi checkpoint (nếu có checkpoint_path)
+    """
+
+    def __init__(self, qdrant_client: QdrantClient, collection_name: str, queue_size: int,
+                 checkpoint_path: Optional[str] = None, checkpoint_state: Optional[Dict] = None):
+        super().__init__(daemon=True)
+        self.client = qdrant_client
+        self.collection_name = collection_name
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_state = dict(checkpoint_state or {})
+        self.upserted = 0
+        self.batches = 0
+        self.error = None
+
+    def put(self, points: List[PointStruct], completed_through: Optional[tuple] = None):
+        """
+        Args:
+            points: Batch point cần upsert
+            completed_through: (vị trí, document_id) của document cuối cùng mà
+                toàn bộ point đã nằm trong batch này hoặc các batch trước
+        """
+        if self.error is not None:
+            raise RuntimeError(f"Upsert thread failed: {self.error}") from self.error
+        self.queue.put((points, completed_through))
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            if self.error is not None:
+                continue
+            points, completed_through = item
+            try:
+                self.client.upsert(collection_name=self.collection_name, points=points, wait=True)
+                self.upserted += len(points)
+                self.batches += 1
+                if self.checkpoint_path and completed_through is not None:
+                    self.checkpoint_state.update({
+                        "completed_through": completed_through[0],
+                        "document_id": completed_through[1],
+                        "batches": self.batches,
+                        "points": self.upserted,
+                        "updated_at": time.strftime("%Y-%m-%dT%H:%M:%S")
+                    })
+                    save_checkpoint(self.checkpoint_path, self.checkpoint_state)
+            except Exception as e:
+                self.error = e
+
+    def close(self):
+        self.queue.put(None)
+        self.join()
+        if self.error is not None:
+            raise RuntimeError(f"Upsert thread failed: {self.error}") from self.error
+
+
+def run(
+    path: str,
+    coordinates: Optional[Dict[str, tuple]] = None,
+    workers: int = 4,
+    max_batch_tokens: int = 16384,
+    upsert_batch_size: int = 256,
+    queue_size: int = 4,
+    overlap_tokens: int = 0,
+    splitter: str = "legacy",
+    checkpoint_path: Optional[str] = None,
+    skip_unchanged: bool = False
+) -> Dict:
+    """
+    Xử lý file JSON và lưu vào Qdrant theo pipeline 3 stage:
+    chunk (process pool) -> embed theo batch nhiều document -> upsert (background thread)
+    
+    Point ID deterministic (point_id) nên chạy lại chỉ ghi đè, không nhân bản chunk.
     
     Args:
         path: Đường dẫn file JSON
-        batch_size: Số lượng documents xử lý cùng lúc
+        coordinates: place_id -> (lat, lon) từ load_place_coordinates (optional)
+        workers: Số process chunking
+        max_batch_tokens: Tổng số token tối đa của 1 batch embedding (gộp nhiều document)
+        upsert_batch_size: Số point mỗi lần upsert
+        queue_size: Số batch upsert tối đa chờ trong queue
+        overlap_tokens: Số token lặp lại giữa 2 chunk liên tiếp
+        splitter: Cách tách câu khi chunk ("legacy" | "vi")
+        checkpoint_path: File checkpoint; có checkpoint của lần chạy dở thì bỏ qua
+            các document đã upsert xong. Xóa khi chạy hết
+        skip_unchanged: Đọc content_hash đang có trong collection, bỏ qua document
+            không đổi và xóa point phiên bản cũ của document đã đổi
+    
+    Returns:
+        Dict thống kê (docs, chunks, skipped, unchanged, resumed, docs_per_sec, chunks_per_sec)
     """
     with open(path, "r", encoding="utf-8") as file:
         data = json.load(file)
-
+    
+    coordinates = coordinates or {}
+    chunk_options = {"splitter": splitter, "overlap_tokens": overlap_tokens}
+    located_docs = 0
     total_chunks = 0
     skipped_docs = 0
+    unchanged_docs = 0
+    changed_docs = 0
+    resumed_docs = 0
     total_images = 0
+    indexed_docs = 0
 
     print(f"\n{'='*80}")
     print(f" Đang xử lý {len(data)} documents từ {path}")
+    print(f" workers={workers}, max_batch_tokens={max_batch_tokens}, upsert_batch_size={upsert_batch_size}")
+    print(f" splitter={splitter}, overlap_tokens={overlap_tokens}")
     print(f"{'='*80}\n")
 
-    for i in tqdm(range(0, len(data), batch_size), desc="Processing batches"):
-        batch = data[i:i + batch_size]
-        
-        for item in batch:
-            # Lấy ID từ document
-            doc_id = item.get("id", None)
-            
-            if not doc_id:
-                skipped_docs += 1
-                continue
-            
-            # Lấy content
-            text_content = item.get("content", "")
-            
-            # Kiểm tra content có hợp lệ không
-            if not text_content or not isinstance(text_content, str):
-                skipped_docs += 1
-                continue
-            
-            # Kiểm tra content có đủ dài không (tránh content quá ngắn)
-            if len(text_content.strip()) < 10:
+    started = time.perf_counter()
+
+    resume_from = load_checkpoint(checkpoint_path, path, len(data)) if checkpoint_path else -1
+    if resume_from >= 0:
+        print(f"Tiếp tục từ checkpoint: bỏ qua {resume_from + 1} documents đã upsert")
+    existing = existing_document_hashes(client) if skip_unchanged else {}
+    if skip_unchanged:
+        print(f"Collection đang có {len(existing)} documents")
+
+    # (vị trí trong file, item, metadata) của các document cần chunk + embed
+    entries = []
+    for position, item in enumerate(data):
+        if position <= resume_from:
+            resumed_docs += 1
+            continue
+        doc_id = item.get("id")
+        metadata = None
+        if doc_id:
+            metadata = build_metadata(item, coordinates)
+            metadata["content_hash"] = document_hash(item, metadata, chunk_options)
+            if doc_id in existing:
+                if existing[doc_id] == metadata["content_hash"]:
+                    unchanged_docs += 1
+                    continue
+                # Point của phiên bản cũ có ID khác (hash chunk khác) -> xóa
+                delete_stale_points(client, doc_id, metadata["content_hash"])
+                changed_docs += 1
+        entries.append((position, item, metadata))
+
+    checkpoint_state = {"source": os.path.abspath(path), "documents": len(data), "completed_through": resume_from}
+    upserter = _Upserter(client, COLLECTION_NAME, queue_size, checkpoint_path, checkpoint_state)
+    upserter.start()
+
+    # Chunk chờ embed: (text, chunk_index, doc_id, metadata, mark)
+    # mark = (vị trí, document_id, là chunk cuối của document)
+    pending, pending_tokens = [], 0
+    points, marks = [], []
+
+    def completed_through(batch_marks):
+        position, doc_id, last = batch_marks[-1]
+        return (position, doc_id) if last else (position - 1, None)
+
+    def flush_embeddings():
+        nonlocal pending, pending_tokens, points, marks
+        if not pending:
+            return
+        vectors = embedding_model.encode([text for text, _, _, _, _ in pending])
+        for vec, (text, idx, doc_id, metadata, mark) in zip(vectors, pending):
+            points.append(PointStruct(
+                id=point_id(doc_id, idx, text),
+                vector=vec,
+                payload=build_payload(text, idx, doc_id, metadata)
+            ))
+            marks.append(mark)
+        pending, pending_tokens = [], 0
+        while len(points) >= upsert_batch_size:
+            upserter.put(points[:upsert_batch_size], completed_through(marks[:upsert_batch_size]))
+            points, marks = points[upsert_batch_size:], marks[upsert_batch_size:]
+
+    try:
+        chunked = _iter_chunked([item for _, item, _ in entries], workers, embedding_model.model_name,
+                                max_inflight=workers * 4, overlap_tokens=overlap_tokens, splitter=splitter)
+        for (position, _, metadata), (item, result) in tqdm(zip(entries, chunked), total=len(entries),
+                                                             desc="Processing documents"):
+            if result is None:
                 skipped_docs += 1
                 continue
             
-            # Chunk text
-            chunks = chunk_text(text_content)
+            if "lat" in metadata:
+                located_docs += 1
+            total_images += len(metadata["images"])
+            total_chunks += len(result["chunks"])
+            indexed_docs += 1
             
-            # Chỉ lưu nếu có chunks
-            if chunks:
-                # Chuẩn bị metadata
-                metadata = {
-                    "title": item.get("title", ""),
-                    "url": item.get("url", ""),
-                    "summary": item.get("summary", ""),
-                    "images": item.get("images", [])  # Lấy danh sách images
-                }
-                
-                # Đếm images
-                total_images += len(metadata["images"])
-                
-                # Lưu vào Qdrant
-                total_chunks += len(chunks)
-                save_to_qdrant(embedding_model, chunks, doc_id, metadata)
-            else:
-                skipped_docs += 1
+            last_idx = len(result["chunks"]) - 1
+            for idx, (text, tokens) in enumerate(zip(result["chunks"], result["tokens"])):
+                if pending and pending_tokens + tokens > max_batch_tokens:
+                    flush_embeddings()
+                pending.append((text, idx, result["id"], metadata, (position, result["id"], idx == last_idx)))
+                pending_tokens += tokens
+        
+        flush_embeddings()
+        if points:
+            upserter.put(points, completed_through(marks))
+    finally:
+        upserter.close()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+        gc.collect()
+
+    # Chạy hết -> lần sau bắt đầu lại từ đầu
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    elapsed = time.perf_counter() - started
+    report = {
+        "docs": indexed_docs,
+        "chunks": total_chunks,
+        "skipped": skipped_docs,
+        "unchanged": unchanged_docs,
+        "changed": changed_docs,
+        "resumed": resumed_docs,
+        "seconds": round(elapsed, 2),
+        "docs_per_sec": round(indexed_docs / elapsed, 2) if elapsed else 0.0,
+        "chunks_per_sec": round(total_chunks / elapsed, 2) if elapsed else 0.0
+    }
 
     print(f"\n{'='*80}")
     print(f"THỐNG KÊ KẾT QUẢ")
     print(f"{'='*80}")
     print(f"Tổng số chunks đã xử lý: {total_chunks}")
     print(f"tổng số images: {total_images}")
+    print(f"Số documents có tọa độ: {located_docs}")
     print(f"Số documents bị bỏ qua: {skipped_docs}")
+    print(f"Số documents không đổi (skip): {unchanged_docs}, đã đổi: {changed_docs}, từ checkpoint: {resumed_docs}")
+    print(f"Thời gian: {report['seconds']}s ({report['docs_per_sec']} docs/sec, {report['chunks_per_sec']} chunks/sec)")
     print(f"{'='*80}\n")
+    return report
 
 
 def init_qdrant():
-    """Khởi tạo collection Qdrant"""
-    collections = client.get_collections().collections
-    existing = [c.name for c in collections]
-
-    if "map_assistant_v2" not in existing:
-        print("Tạo Qdrant collection: map_assistant_v2")
-        client.create_collection(
-            collection_name="map_assistant_v2",
-            vectors_config=VectorParams(
-                size=1024,            
-                distance="Cosine"
-            )
-        )
-        print("Collection đã được tạo")
+    """Khởi tạo collection Qdrant (HNSW tune sẵn, int8 quantization, payload index)"""
+    if create_collection(client, COLLECTION_NAME):
+        print(f"Collection '{COLLECTION_NAME}' đã được tạo")
     else:
-        print("Collection 'map_assistant_v2' đã tồn tại")
+        print(f"Collection '{COLLECTION_NAME}' đã tồn tại")
+    print("Payload index đã sẵn sàng")
 
 
 def verify_data_sample():
@@ -235,7 +618,7 @@ def verify_data_sample():
     try:
         # Lấy 1 point ngẫu nhiên
         scroll_result = client.scroll(
-            collection_name="map_assistant_v2_v2",
+            collection_name=COLLECTION_NAME,
             limit=1,
             with_payload=True,
             with_vectors=False
@@ -292,8 +675,21 @@ if __name__ == "__main__":
     
     print(f"\nĐường dẫn file: {file_path}")
     
+    # Tọa độ địa điểm để ghép vào payload
+    places_csv = "resource/data/hanoi_places_osm_filtered_full_row.csv"
+    coordinates = load_place_coordinates(places_csv) if os.path.exists(places_csv) else {}
+    print(f"Đã đọc tọa độ của {len(coordinates)} địa điểm từ {places_csv}")
+    
     # Xử lý
-    run(file_path, batch_size=2)
+    run(
+        file_path,
+        coordinates=coordinates,
+        workers=max(1, (os.cpu_count() or 2) - 1),
+        overlap_tokens=int(os.getenv("CHUNK_OVERLAP_TOKENS", 0)),
+        splitter=os.getenv("CHUNK_SPLITTER", "legacy"),
+        checkpoint_path=os.getenv("INGEST_CHECKPOINT", "qdrant_ingest.checkpoint.json") or None,
+        skip_unchanged=os.getenv("INGEST_SKIP_UNCHANGED", "false").lower() == "true"
+    )
     
     # Kiểm tra mẫu dữ liệu
     verify_data_sample()
@@ -0,0 +1,115 @@
+# embed_backends.py
+"""
+Inference backend cho embedding service (CPU)
+
+- torch:      PyTorch fp32 (mặc định, dùng GPU nếu có)
+- torch-int8: PyTorch dynamic quantization int8 cho các lớp Linear (CPU)
+- onnx:       ONNX Runtime qua optimum (cần `pip install optimum[onnxruntime]`)
+"""
+
+from typing import List, Optional
+import torch
+from transformers import AutoTokenizer, AutoModel
+
+BACKENDS = ("torch", "torch-int8", "onnx")
+
+
+class EmbeddingBackend:
+    """Tokenizer + model của 1 backend, encode CLS pooling giống nhau cho mọi backend"""
+
+    def __init__(self, name: str, model_name: str, max_length: int = 1024,
+                 bucket_max_tokens: int = 8192, onnx_path: Optional[str] = None):
+        """
+        Args:
+            name: torch | torch-int8 | onnx
+            model_name: Tên model HuggingFace
+            max_length: Số token tối đa mỗi text
+            bucket_max_tokens: Ngưỡng (số text x độ dài max) của mỗi bucket, 0 = tắt bucketing
+            onnx_path: Thư mục model ONNX đã export sẵn (None = export từ model_name khi load)
+        """
+        if name not in BACKENDS:
+            raise ValueError(f"Unknown embedding backend '{name}', expected one of {BACKENDS}")
+
+        self.name = name
+        self.model_name = model_name
+        self.max_length = max_length
+        self.bucket_max_tokens = bucket_max_tokens
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+
+        if name == "torch":
+            self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+            self.model = AutoModel.from_pretrained(model_name).to(self.device)
+        elif name == "torch-int8":
+            # Dynamic quantization chỉ chạy trên CPU
+            self.device = torch.device("cpu")
+            model = AutoModel.from_pretrained(model_name)
+            self.model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        else:
+            try:
+                from optimum.onnxruntime import ORTModelForFeatureExtraction
+            except ImportError as e:
+                raise ImportError(
+                    "EMBED_BACKEND=onnx cần optimum + onnxruntime: pip install optimum[onnxruntime]"
+                ) from e
+            self.device = torch.device("cpu")
+            if onnx_path:
+                self.model = ORTModelForFeatureExtraction.from_pretrained(onnx_path)
+            else:
+                self.model = ORTModelForFeatureExtraction.from_pretrained(model_name, export=True)
+
+        if hasattr(self.model, "eval"):
+            self.model.eval()
+
+    def info(self) -> dict:
+        return {
+            "backend": self.name,
+            "model": self.model_name,
+            "device": str(self.device),
+            "max_length": self.max_length,
+            "bucket_max_tokens": self.bucket_max_tokens
+        }
+
+    def _forward(self, inputs) -> List[List[float]]:
+        inputs = {k: v.to(self.device) for k, v in inputs.items()}
+        outputs = self.model(**inputs)
+        return outputs.last_hidden_state[:, 0, :].cpu().numpy().tolist()
+
+    def encode(self, texts: List[str]) -> List[List[float]]:
+        """Embedding CLS cho texts, giữ nguyên thứ tự đầu vào"""
+        with torch.no_grad():
+            if self.bucket_max_tokens <= 0 or len(texts) == 1:
+                return self._forward(self.tokenizer(
+                    texts,
+                    padding=True,
+                    truncation=True,
+                    return_tensors="pt",
+                    max_length=self.max_length
+                ))
+
+            encodings = self.tokenizer(texts, truncation=True, max_length=self.max_length)
+            lengths = [len(ids) for ids in encodings["input_ids"]]
+
+            embeddings = [None] * len(texts)
+            for bucket in length_buckets(lengths, self.bucket_max_tokens):
+                features = [{k: encodings[k][i] for k in encodings.keys()} for i in bucket]
+                inputs = self.tokenizer.pad(features, padding=True, return_tensors="pt")
+                for i, embedding in zip(bucket, self._forward(inputs)):
+                    embeddings[i] = embedding
+            return embeddings
+
+
+def length_buckets(lengths: List[int], max_tokens: int) -> List[List[int]]:
+    """
+    Chia index theo độ dài tăng dần thành các bucket, mỗi bucket pad tới text
+    dài nhất của chính nó (số text x độ dài max <= max_tokens)
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    buckets, current = [], []
+    for i in order:
+        if current and (len(current) + 1) * lengths[i] > max_tokens:
+            buckets.append(current)
+            current = []
+        current.append(i)
+    if current:
+        buckets.append(current)
+    return buckets
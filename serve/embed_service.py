@@ -2,33 +2,141 @@
 from fastapi import FastAPI
 from pydantic import BaseModel
 from typing import List
-import torch
-from transformers import AutoTokenizer, AutoModel
+import asyncio
+import os
+
+from embed_backends import EmbeddingBackend
 
 app = FastAPI()
 
-MODEL_NAME = "AITeamVN/Vietnamese_Embedding"  
+MODEL_NAME = "AITeamVN/Vietnamese_Embedding"
 MAX_LENGTH = 1024
 
+# Micro-batching: gom các request /embed đồng thời trong cửa sổ này (ms) thành
+# 1 forward pass. 0 = tắt, mỗi request chạy forward riêng như trước
+BATCH_WINDOW_MS = float(os.getenv("EMBED_BATCH_WINDOW_MS", "5"))
+MAX_BATCH_SIZE = int(os.getenv("EMBED_MAX_BATCH_SIZE", "32"))
+# Length bucketing: text được sort theo số token và chia bucket sao cho
+# (số text x độ dài dài nhất) <= giá trị này. 0 = tắt, pad cả batch như cũ
+BUCKET_MAX_TOKENS = int(os.getenv("EMBED_BUCKET_MAX_TOKENS", "8192"))
+
+# Inference backend: torch | torch-int8 | onnx (xem embed_backends.py)
+BACKEND = os.getenv("EMBED_BACKEND", "torch")
+ONNX_MODEL_PATH = os.getenv("EMBED_ONNX_PATH") or None
+
 class BatchRequest(BaseModel):
     texts: List[str]
 
-device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
-model = AutoModel.from_pretrained(MODEL_NAME).to(device)
-model.eval()
+backend = EmbeddingBackend(
+    BACKEND,
+    MODEL_NAME,
+    max_length=MAX_LENGTH,
+    bucket_max_tokens=BUCKET_MAX_TOKENS,
+    onnx_path=ONNX_MODEL_PATH
+)
+
+
+def encode_texts(texts: List[str]) -> List[List[float]]:
+    """Embedding CLS cho texts, giữ nguyên thứ tự đầu vào"""
+    return backend.encode(texts)
+
+
+class MicroBatcher:
+    """
+    Gom các request đồng thời: request đầu tiên mở cửa sổ `window_ms`, các
+    request tới trong cửa sổ (tới khi đủ `max_batch_size` text) được ghép
+    vào cùng 1 forward pass, kết quả được chia lại theo thứ tự từng request
+    """
+
+    def __init__(self, window_ms: float, max_batch_size: int):
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self.queue: asyncio.Queue = None
+        self._worker = None
+
+    def start(self):
+        self.queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+
+    async def submit(self, texts: List[str]) -> List[List[float]]:
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((texts, future))
+        return await future
+
+    async def _collect(self):
+        pending = [await self.queue.get()]
+        size = len(pending[0][0])
+        deadline = asyncio.get_running_loop().time() + self.window
+
+        while size < self.max_batch_size:
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            pending.append(item)
+            size += len(item[0])
+
+        return pending
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = await self._collect()
+            texts = [text for request_texts, _ in pending for text in request_texts]
+            try:
+                # Forward chạy trên thread riêng để event loop vẫn nhận request mới
+                embeddings = await loop.run_in_executor(None, encode_texts, texts)
+            except Exception as e:
+                for _, future in pending:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            offset = 0
+            for request_texts, future in pending:
+                if not future.done():
+                    future.set_result(embeddings[offset:offset + len(request_texts)])
+                offset += len(request_texts)
+
+
+batcher = MicroBatcher(BATCH_WINDOW_MS, MAX_BATCH_SIZE) if BATCH_WINDOW_MS > 0 else None
+
+
+@app.on_event("startup")
+async def start_batcher():
+    if batcher is not None:
+        batcher.start()
+
+
+@app.on_event("shutdown")
+async def stop_batcher():
+    if batcher is not None:
+        await batcher.stop()
+
+
+@app.get("/info")
+def info():
+    """Backend đang chạy + cấu hình batching"""
+    return {
+        **backend.info(),
+        "batch_window_ms": BATCH_WINDOW_MS,
+        "max_batch_size": MAX_BATCH_SIZE
+    }
+
 
 @app.post("/embed")
-def embed_batch(req: BatchRequest):
-    with torch.no_grad():
-        inputs = tokenizer(
-            req.texts,
-            padding=True,
-            truncation=True,
-            return_tensors="pt",
-            max_length=MAX_LENGTH
-        )
-        inputs = {k: v.to(device) for k, v in inputs.items()}
-        outputs = model(**inputs)
-        embeddings = outputs.last_hidden_state[:, 0, :].cpu().numpy().tolist()
-        return {"embeddings": embeddings}
+async def embed_batch(req: BatchRequest):
+    if not req.texts:
+        return {"embeddings": []}
+    if batcher is None:
+        embeddings = await asyncio.get_running_loop().run_in_executor(None, encode_texts, req.texts)
+    else:
+        embeddings = await batcher.submit(req.texts)
+    return {"embeddings": embeddings}
@@ -0,0 +1,137 @@
+"""
+Regression test cho TokenChunker (resource/test_db/chunker.py)
+Với overlap_tokens=0 + splitter="legacy", output phải giống hệt chunker cũ
+trên toàn bộ wiki_info_clean.json; kiểm tra thêm giới hạn token khi có overlap
+
+pytest test_chunker.py: dùng FakeTokenizer (không cần transformers/mạng)
+python test_chunker.py: dùng tokenizer thật của model embedding
+"""
+
+import sys
+import os
+import json
+import re
+import time
+
+import pytest
+
+# chunker.py chạy phẳng cùng các script resource/test_db (resource/ trùng tên module stdlib)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resource', 'test_db'))
+
+MODEL_NAME = "AITeamVN/Vietnamese_Embedding"
+WIKI_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resource", "data", "wiki_info_clean.json")
+MAX_TOKENS = 1024
+MIN_REMAINING_TOKENS = 96
+
+
+class FakeTokenizer:
+    """
+    Giả lập tokenizer kiểu sentencepiece: mỗi từ tách thành các piece <= 4 ký
+    tự, khoảng trắng gộp vào từ sau, thêm 2 special token <s> </s>
+    """
+
+    def _ids(self, text):
+        pieces = []
+        for word in re.findall(r'\s*\S+|\s+$', text):
+            word = word.strip() or ' '
+            pieces += [word[i:i + 4] for i in range(0, len(word), 4)]
+        return ['<s>'] + pieces + ['</s>']
+
+    def __call__(self, text, **kwargs):
+        if isinstance(text, list):
+            return {"input_ids": [self._ids(t) for t in text]}
+        return {"input_ids": self._ids(text)}
+
+
+def _load_documents():
+    with open(WIKI_PATH, encoding="utf-8") as f:
+        docs = json.load(f)
+    return [d["content"] for d in docs if isinstance(d.get("content"), str) and len(d["content"].strip()) >= 10]
+
+
+@pytest.fixture(scope="module")
+def tokenizer():
+    return FakeTokenizer()
+
+
+@pytest.fixture(scope="module")
+def documents():
+    return _load_documents()
+
+
+def test_identical_to_legacy(tokenizer, documents):
+    """Test output giống hệt chunker cũ khi overlap=0"""
+    from chunker import TokenChunker, legacy_chunk_text
+
+    print("\n" + "="*80)
+    print("TEST: TokenChunker vs legacy chunk_text (overlap=0)")
+    print("="*80)
+
+    chunker = TokenChunker(tokenizer, MAX_TOKENS, MIN_REMAINING_TOKENS)
+
+    legacy_time, new_time, mismatches, total_chunks = 0.0, 0.0, [], 0
+    for i, text in enumerate(documents):
+        start = time.perf_counter()
+        expected = legacy_chunk_text(text, tokenizer, MAX_TOKENS, MIN_REMAINING_TOKENS)
+        legacy_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        actual = chunker.chunk(text)
+        new_time += time.perf_counter() - start
+
+        total_chunks += len(expected)
+        if actual != expected:
+            mismatches.append(i)
+
+    print(f"\n{len(documents)} documents, {total_chunks} chunks")
+    print(f"legacy: {legacy_time:.2f}s, TokenChunker: {new_time:.2f}s "
+          f"(x{legacy_time / new_time if new_time else 0:.1f})")
+
+    assert not mismatches, f"{len(mismatches)} documents differ, first: {mismatches[:5]}"
+    print("✓ Output identical")
+
+
+def test_overlap_within_limit(tokenizer, documents):
+    """Test chunk có overlap (tách câu tiếng Việt) không vượt max_tokens trừ câu đơn quá dài"""
+    from chunker import TokenChunker
+
+    print("\n" + "="*80)
+    print("TEST: overlap=128, splitter=vi")
+    print("="*80)
+
+    chunker = TokenChunker(tokenizer, MAX_TOKENS, MIN_REMAINING_TOKENS, overlap_tokens=128, splitter="vi")
+
+    total_chunks, oversized = 0, 0
+    for text in documents:
+        chunks = chunker.chunk(text)
+        total_chunks += len(chunks)
+        for chunk in chunks:
+            if chunker.count(chunk) > MAX_TOKENS:
+                # Chỉ hợp lệ khi chunk là 1 câu duy nhất dài hơn max_tokens
+                assert len(chunker.split(chunk)) == 1, "Multi-sentence chunk exceeds max_tokens"
+                oversized += 1
+
+    print(f"\n{total_chunks} chunks, {oversized} single-sentence chunks over {MAX_TOKENS} tokens")
+    print("✓ All multi-sentence chunks within limit")
+
+
+def main():
+    """Run all tests"""
+    try:
+        from transformers import AutoTokenizer
+
+        tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+        documents = _load_documents()
+
+        test_identical_to_legacy(tokenizer, documents)
+        test_overlap_within_limit(tokenizer, documents)
+        print("\n✅ ALL CHUNKER TESTS PASSED\n")
+    except Exception as e:
+        print(f"\n❌ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Test parity của các inference backend embedding (serve/embed_backends.py)
+So sánh cosine giữa torch fp32 và torch-int8 / onnx trên 1 tập query cố định
+"""
+
+import sys
+import os
+
+import numpy as np
+
+# serve/ chạy bằng `uvicorn embed_service:app` nên import phẳng
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'serve'))
+
+MODEL_NAME = "AITeamVN/Vietnamese_Embedding"
+MIN_COSINE = 0.98
+MEAN_COSINE = 0.995
+
+QUERIES = [
+    "Hồ Gươm",
+    "Lăng Chủ tịch Hồ Chí Minh",
+    "quán cafe gần Văn Miếu",
+    "nhà hàng phở ở Hoàn Kiếm",
+    "bảo tàng lịch sử Việt Nam",
+    "chợ Đồng Xuân mở cửa mấy giờ",
+    "khách sạn giá rẻ quận Ba Đình",
+    "Hoàng thành Thăng Long được UNESCO công nhận là di sản văn hóa thế giới năm 2010.",
+    "Where can I find street food near the Old Quarter?",
+    "Chùa Một Cột là ngôi chùa có kiến trúc độc đáo, được xây dựng vào thời Lý năm 1049.",
+]
+
+
+def _cosines(reference, candidate):
+    a = np.asarray(reference)
+    b = np.asarray(candidate)
+    return (a * b).sum(axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+
+
+def test_backend_parity():
+    """Test cosine agreement của từng backend với fp32"""
+    from embed_backends import EmbeddingBackend, BACKENDS
+
+    print("\n" + "="*80)
+    print("TEST: Embedding backend parity vs torch fp32")
+    print("="*80)
+
+    reference = EmbeddingBackend("torch", MODEL_NAME).encode(QUERIES)
+
+    failures = []
+    for name in BACKENDS:
+        if name == "torch":
+            continue
+        try:
+            backend = EmbeddingBackend(name, MODEL_NAME)
+        except ImportError as e:
+            print(f"\n⚠️  {name}: skipped ({e})")
+            continue
+
+        cosines = _cosines(reference, backend.encode(QUERIES))
+        ok = cosines.min() >= MIN_COSINE and cosines.mean() >= MEAN_COSINE
+        print(f"\n{'✓' if ok else '❌'} {name}: min cosine={cosines.min():.5f}, mean={cosines.mean():.5f}")
+        if not ok:
+            worst = int(cosines.argmin())
+            print(f"   worst query: '{QUERIES[worst]}'")
+            failures.append(name)
+
+    assert not failures, f"Backends below cosine threshold: {failures}"
+
+
+def main():
+    """Run all tests"""
+    try:
+        test_backend_parity()
+        print("\n✅ ALL BACKENDS MATCH FP32\n")
+    except Exception as e:
+        print(f"\n❌ Test failed with error: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
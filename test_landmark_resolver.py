@@ -0,0 +1,83 @@
+"""
+Test LandmarkResolver (app/database/neo4j/landmark_resolver.py)
+Chỉ trả Place khớp tin cậy, ở cả trie lẫn fallback full-text: tên landmark
+chỉ là 1 phần tên quán ("Hồ Gươm" trong "Daksh Yoga Studio Hồ Gươm") không
+được resolve thành quán đó
+
+pytest test_landmark_resolver.py: full-text dùng FakeDriver (không cần Neo4j)
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.database.neo4j.landmark_resolver import LandmarkResolver  # noqa: E402
+
+YOGA_STUDIO = {
+    'place_id': 'p1', 'name': 'Daksh Yoga Studio Hồ Gươm', 'address': 'Hàng Bạc',
+    'lat': 21.0338, 'lon': 105.8530, 'alt_names': None
+}
+HOAN_KIEM_LAKE = {
+    'place_id': 'p2', 'name': 'Hồ Hoàn Kiếm', 'address': 'Hoàn Kiếm',
+    'lat': 21.0287, 'lon': 105.8523, 'alt_names': 'Hồ Gươm;Hoan Kiem Lake'
+}
+
+
+class FakeDriver:
+    """Driver trả sẵn danh sách record cho câu query full-text"""
+
+    def __init__(self, records):
+        self.records = records
+        self.calls = 0
+
+    def session(self, database=None):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, **params):
+        self.calls += 1
+        return [dict(record) for record in self.records[:params.get('limit', 1)]]
+
+
+def test_trie_rejects_partial_name():
+    """Test trie: tên landmark nằm cuối tên quán không được chấp nhận"""
+    resolver = LandmarkResolver()
+    resolver.add_landmark('p1', YOGA_STUDIO['name'], YOGA_STUDIO['address'], YOGA_STUDIO['lat'], YOGA_STUDIO['lon'])
+
+    assert resolver.resolve("Hồ Gươm") is None
+
+    resolver.add_landmark(
+        'p2', HOAN_KIEM_LAKE['name'], HOAN_KIEM_LAKE['address'], HOAN_KIEM_LAKE['lat'], HOAN_KIEM_LAKE['lon'],
+        alt_names=HOAN_KIEM_LAKE['alt_names'].split(';')
+    )
+    assert resolver.resolve("Hồ Gươm")['place_id'] == 'p2'
+    assert resolver.resolve("ho guom")['place_id'] == 'p2'
+
+
+def test_fulltext_rejects_partial_name():
+    """Test full-text: hit điểm cao nhất nhưng không tin cậy -> None, không cache"""
+    driver = FakeDriver([YOGA_STUDIO])
+    resolver = LandmarkResolver(driver=driver)
+
+    assert resolver.resolve("Hồ Gươm") is None
+    assert resolver.resolve("Hồ Gươm") is None
+    assert driver.calls == 2
+
+
+def test_fulltext_skips_to_confident_candidate():
+    """Test full-text: bỏ qua ứng viên không tin cậy, lấy Place khớp alias"""
+    driver = FakeDriver([YOGA_STUDIO, HOAN_KIEM_LAKE])
+    resolver = LandmarkResolver(driver=driver)
+
+    landmark = resolver.resolve("Hồ Gươm")
+    assert landmark['place_id'] == 'p2'
+    assert 'alt_names' not in landmark
+
+    assert resolver.resolve("hồ gươm")['place_id'] == 'p2'
+    assert driver.calls == 1
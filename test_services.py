@@ -5,6 +5,7 @@ Chạy file này để test các API endpoints
 
 import requests # type: ignore
 import json
+import time
 
 BASE_URL = "http://localhost:8864/api/v1"
 
@@ -40,7 +41,49 @@ def test_agent_chat():
         print_response(f"AGENT CHAT {i}: {message}", response)
 
 
-def test_place_info():
+def test_agent_chat_session():
+    """Test Agent Chat có session_id - câu hỏi nối tiếp dùng lại kết quả lượt trước"""
+    session_id = f"test-{int(time.time())}"
+    test_messages = [
+        "Tìm quán cafe gần Hồ Gươm",
+        "Còn quán nào rẻ hơn không?",
+        "Thế còn nhà hàng thì sao?"
+    ]
+    
+    for i, message in enumerate(test_messages, 1):
+        payload = {"message": message, "session_id": session_id}
+        response = requests.post(f"{BASE_URL}/chat", json=payload)
+        print_response(f"AGENT CHAT SESSION {i}: {message}", response)
+    
+    response = requests.get(f"{BASE_URL}/chat/session/{session_id}")
+    print_response(f"SESSION STATE: {session_id}", response)
+    requests.delete(f"{BASE_URL}/chat/session/{session_id}")
+
+
+def test_agent_chat_stream():
+    """Test Agent Chat streaming (SSE) - câu trả lời LLM đến thành nhiều event token"""
+    payload = {"message": "Giới thiệu các quán cafe đẹp gần Hồ Gươm"}
+    response = requests.post(f"{BASE_URL}/chat/stream", json=payload, stream=True)
+    assert response.status_code == 200
+    
+    events = []
+    event = None
+    for line in response.iter_lines(decode_unicode=True):
+        if line.startswith("event: "):
+            event = line[len("event: "):]
+        elif line.startswith("data: ") and event:
+            events.append((event, json.loads(line[len("data: "):])))
+    
+    names = [name for name, _ in events]
+    tokens = [data["text"] for name, data in events if name == "token"]
+    print(f"Events: {names[:4]} ... {names[-1]} ({len(tokens)} token)")
+    print("".join(tokens))
+    assert names[0] == "start" and names[-1] == "done"
+    assert len(tokens) > 1, "summary phải được stream thành nhiều token"
+    assert "".join(tokens) == events[-1][1]["summary"]
+
+
+
     """Test lấy thông tin địa điểm"""
     payload = {
         "name": "Lăng Bác"
@@ -140,6 +183,8 @@ def run_all_tests():
         
         print("\n🤖 0. TEST AGENT CHAT (NATURAL LANGUAGE)")
         test_agent_chat()
+        test_agent_chat_session()
+        test_agent_chat_stream()
         
         print("\n📍 1. TEST THÔNG TIN ĐỊA ĐIỂM")
         test_place_info()
@@ -178,6 +223,7 @@ if __name__ == "__main__":
     # Hoặc chạy từng test riêng lẻ:
     # test_health()
     test_agent_chat()  # NEW: Test Agent Chat
+    # test_agent_chat_session()
     # test_place_info()
     # test_search_places()
     # test_nearby_landmark()
@@ -1,8 +1,9 @@
 import React, { useState, useRef, useEffect } from 'react';
-import axios from 'axios';
 import Message from './Message';
 import MessageInput from './MessageInput';
 
+const API_URL = 'http://localhost:8864/api/v1';
+
 // Helper functions to format different types of responses
 const formatPlacesList = (places, intent, summary = '') => {
   if (!places || places.length === 0) {
@@ -124,6 +125,58 @@ const formatRecommendations = (recommendations) => {
   return result;
 };
 
+// Format result of a chat response based on API structure (intent-specific fields)
+const formatResult = (result, intent) => {
+  if (result.itinerary !== undefined) {
+    // Plan itinerary intent
+    return result.itinerary;
+  } else if (result.response !== undefined) {
+    // General response
+    return result.response;
+  } else if (result.comparison !== undefined) {
+    // Compare places intent
+    return result.comparison;
+  } else if (result.nearby_places) {
+    // Nearby landmark - has summary and nearby_places
+    return formatPlacesList(result.nearby_places, intent, result.summary);
+  } else if (result.places) {
+    // Search/semantic places
+    return formatPlacesList(result.places, intent, result.recommendation || result.summary);
+  } else if (result.recommendations) {
+    // Recommend places
+    return formatRecommendations(result.recommendations);
+  }
+  // Fallback - try to display result as JSON
+  return JSON.stringify(result, null, 2);
+};
+
+// Read a Server-Sent Events stream from fetch (EventSource only supports GET)
+const readEventStream = async (response, onEvent) => {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const raw = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+
+      let event = 'message';
+      let data = '';
+      raw.split('\n').forEach(line => {
+        if (line.startsWith('event:')) event = line.slice(6).trim();
+        else if (line.startsWith('data:')) data += line.slice(5).trim();
+      });
+      if (data) onEvent(event, JSON.parse(data));
+    }
+  }
+};
+
 const ChatInterface = () => {
   const [messages, setMessages] = useState([
     {
@@ -135,6 +188,10 @@ const ChatInterface = () => {
   ]);
   const [isLoading, setIsLoading] = useState(false);
   const messagesEndRef = useRef(null);
+  // Server keeps intent, places and history per session (follow-ups like "còn quán nào rẻ hơn không?")
+  const sessionIdRef = useRef(
+    window.crypto?.randomUUID ? window.crypto.randomUUID() : `${Date.now()}-${Math.random().toString(16).slice(2)}`
+  );
 
   const scrollToBottom = () => {
     messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' });
@@ -156,79 +213,76 @@ const ChatInterface = () => {
     setMessages(prev => [...prev, newUserMessage]);
     setIsLoading(true);
 
+    // Assistant message is created on the first event and updated progressively
+    const assistantId = Date.now() + 1;
+    const upsertAssistant = (fields) => {
+      setMessages(prev => {
+        if (prev.some(m => m.id === assistantId)) {
+          return prev.map(m => (m.id === assistantId ? { ...m, ...fields } : m));
+        }
+        return [...prev, { id: assistantId, role: 'assistant', content: '', timestamp: new Date(), ...fields }];
+      });
+    };
+
     try {
-      const response = await axios.post('http://localhost:8864/api/v1/chat', {
-        message: userMessage
-      }, {
+      const response = await fetch(`${API_URL}/chat/stream`, {
+        method: 'POST',
         headers: {
           'Content-Type': 'application/json'
-        }
+        },
+        body: JSON.stringify({ message: userMessage, session_id: sessionIdRef.current })
       });
-
-      // Format response content based on API structure
-      let content = '';
-      const data = response.data;
-      
-      if (data.success && data.result) {
-        // Handle different intent types
-        if (data.result.itinerary) {
-          // Plan itinerary intent
-          content = data.result.itinerary;
-        } else if (data.result.response) {
-          // General response
-          content = data.result.response;
-        } else if (data.result.comparison) {
-          // Compare places intent
-          content = data.result.comparison;
-        } else if (data.result.nearby_places) {
-          // Nearby landmark - has summary and nearby_places
-          content = formatPlacesList(
-            data.result.nearby_places, 
-            data.intent, 
-            data.result.summary
-          );
-        } else if (data.result.places) {
-          // Search/semantic places
-          content = formatPlacesList(
-            data.result.places, 
-            data.intent,
-            data.result.recommendation || data.result.summary
-          );
-        } else if (data.result.recommendations) {
-          // Recommend places
-          content = formatRecommendations(data.result.recommendations);
-        } else {
-          // Fallback - try to display result as JSON
-          content = JSON.stringify(data.result, null, 2);
-        }
-      } else if (data.response) {
-        // Direct response field
-        content = data.response;
-      } else {
-        content = 'Xin lỗi, tôi không thể xử lý yêu cầu này.';
+      if (!response.ok || !response.body) {
+        throw new Error(`HTTP ${response.status}`);
       }
 
-      const assistantMessage = {
-        id: Date.now() + 1,
-        role: 'assistant',
-        content: content,
-        intent: data.intent,
-        confidence: data.confidence,
-        timestamp: new Date()
+      let intent = null;
+      let result = null;
+      let summaryField = null;
+      let summary = '';
+
+      const render = () => {
+        const current = summaryField ? { ...result, [summaryField]: summary } : result;
+        return formatResult(current, intent) || '✍️ ...';
       };
 
-      setMessages(prev => [...prev, assistantMessage]);
+      await readEventStream(response, (event, data) => {
+        switch (event) {
+          case 'intent':
+            intent = data.intent;
+            upsertAssistant({
+              content: '🔎 Đang tìm kiếm...',
+              intent: data.intent,
+              confidence: data.confidence
+            });
+            setIsLoading(false);
+            break;
+          case 'results':
+            result = data.result || {};
+            summaryField = data.summary_field;
+            upsertAssistant({ content: render() });
+            break;
+          case 'token':
+            summary += data.text;
+            if (result) upsertAssistant({ content: render() });
+            break;
+          case 'done':
+            summary = data.summary;
+            if (result) upsertAssistant({ content: render(), timings: data.metadata?.timings_ms });
+            break;
+          case 'error':
+            upsertAssistant({ content: data.message || 'Xin lỗi, tôi không thể xử lý yêu cầu này.' });
+            break;
+          default:
+            break;
+        }
+      });
     } catch (error) {
       console.error('Error sending message:', error);
       
-      const errorMessage = {
-        id: Date.now() + 1,
-        role: 'assistant',
-        content: `❌ Lỗi kết nối: ${error.message}\n\nVui lòng kiểm tra:\n- Server đang chạy ở http://localhost:8864\n- Các service (Neo4j, Qdrant, Embedding) đang hoạt động`,
-        timestamp: new Date()
-      };
-      
-      setMessages(prev => [...prev, errorMessage]);
+      upsertAssistant({
+        content: `❌ Lỗi kết nối: ${error.message}\n\nVui lòng kiểm tra:\n- Server đang chạy ở http://localhost:8864\n- Các service (Neo4j, Qdrant, Embedding) đang hoạt động`
+      });
     } finally {
       setIsLoading(false);
     }